@@ -2,13 +2,30 @@ import os
 from flask import Flask, request, abort, jsonify
 from datetime import datetime
 import json
-import threading
+import atexit
 from utils.blacklist import BlacklistManager
 from utils.line_bot import LineBotManager
 from utils.commands import CommandHandler
 from utils.admin import AdminManager
 from utils.warning import WarningManager
-from linebot.v3.webhook import WebhookHandler
+from utils.dispatcher import EventDispatcher, QueueFullError
+from utils.webhook import QueuedWebhookHandler
+from utils.dedup import EventDeduplicator, MemoryDedupBackend
+from utils.metrics import CONTENT_TYPE, MetricsRegistry, instrument, timed
+from utils.storage import create_store
+from utils.sqlite_store import SqliteRepository
+from utils.history import HistoryStore
+from utils.scheduler import Scheduler
+from utils.settings import GroupSettings
+from utils.sync import LeaderLease, LeaderScheduler, StateSync
+from utils.startup import StartupLoader
+from utils.response import ResponseContext
+from utils.line_api import DEFAULT_BASE_URL, AsyncLineClient
+from utils.membership import MembershipIndex
+from utils.sweep import BlacklistSweeper
+from utils.spam import SpamDetector, parse_window
+from utils.word_filter import WordFilterManager
+from utils.command_limit import CommandRateLimiter, MemoryRateLimitBackend, parse_limit, parse_limits
 from linebot.v3.exceptions import InvalidSignatureError
 from linebot.v3.webhooks import (
     MessageEvent,
@@ -40,20 +57,279 @@ if not CHANNEL_ACCESS_TOKEN or not CHANNEL_SECRET:
     print(f"LINE_CHANNEL_SECRET: {'已設定' if CHANNEL_SECRET else '未設定'}")
     sys.exit(1)
 
+# Webhook 非同步處理設定（WEBHOOK_WORKERS 為 0 時於請求中直接處理）
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '0'))
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+WEBHOOK_ENQUEUE_TIMEOUT = float(os.getenv('WEBHOOK_ENQUEUE_TIMEOUT', '0'))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', '10'))
+
+# Webhook 事件去重（LINE 重送時以 webhookEventId 略過已處理的事件）；多個 worker 時可用 sqlite 共用
+WEBHOOK_DEDUP = os.getenv('WEBHOOK_DEDUP', '1') == '1'
+WEBHOOK_DEDUP_BACKEND = os.getenv('WEBHOOK_DEDUP_BACKEND', 'memory')
+WEBHOOK_DEDUP_TTL = float(os.getenv('WEBHOOK_DEDUP_TTL', '86400'))
+WEBHOOK_DEDUP_SIZE = int(os.getenv('WEBHOOK_DEDUP_SIZE', '50000'))
+
+# Prometheus 格式的 /metrics；停用時不包裝任何函式，熱路徑沒有額外成本
+METRICS = os.getenv('METRICS', '1') == '1'
+
+# 訊息合併發送設定（同一目標在時間窗內的訊息合併為一次請求，0 表示停用）
+LINE_OUTBOX_WINDOW = float(os.getenv('LINE_OUTBOX_WINDOW', '0'))
+
+# 非同步 LINE API 用戶端設定（連線池、限流與自動重試）
+LINE_ASYNC_CLIENT = os.getenv('LINE_ASYNC_CLIENT', '0') == '1'
+LINE_API_POOL_SIZE = int(os.getenv('LINE_API_POOL_SIZE', '32'))
+LINE_API_MAX_RETRIES = int(os.getenv('LINE_API_MAX_RETRIES', '3'))
+# LINE API 網址（壓力測試時指向本地的模擬伺服器）
+LINE_API_ENDPOINT = os.getenv('LINE_API_ENDPOINT', DEFAULT_BASE_URL)
+
+# 群組成員資料快取設定
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', '10000'))
+PROFILE_CACHE_TTL = float(os.getenv('PROFILE_CACHE_TTL', '3600'))
+
+# 黑名單掃描設定（SWEEP_INTERVAL 為定期掃描所有群組、通知管理員黑名單成員的秒數，0 表示停用）
+SWEEP_INTERVAL = float(os.getenv('SWEEP_INTERVAL', '0'))
+
+# 指令限流設定（格式為「次數/秒數」，空字串表示不限制）
+COMMAND_RATE_LIMIT_BACKEND = os.getenv('COMMAND_RATE_LIMIT_BACKEND', 'memory')
+COMMAND_USER_LIMIT = os.getenv('COMMAND_USER_LIMIT', '10/60')
+COMMAND_GROUP_LIMIT = os.getenv('COMMAND_GROUP_LIMIT', '30/60')
+COMMAND_COOLDOWNS = os.getenv('COMMAND_COOLDOWNS', '!blacklist=1/30,!warnings=3/30,!help=1/10,!status=1/10,!sweep=1/60')
+COMMAND_LIMIT_NOTICE = os.getenv('COMMAND_LIMIT_NOTICE', '1') == '1'
+
+# 超過一頁的黑名單/警告列表是否以 Flex carousel 顯示
+LIST_FLEX = os.getenv('LIST_FLEX', '1') == '1'
+
+# 洗版偵測設定（需以 SPAM_DETECTION=1 啟用，格式為「次數/秒數」）；
+# SPAM_ACTION 為 warn（警告，累計 3 次加入黑名單）或 kick（直接加入黑名單），邀請連結也依此處理
+SPAM_DETECTION = os.getenv('SPAM_DETECTION', '0') == '1'
+SPAM_FLOOD_LIMIT = os.getenv('SPAM_FLOOD_LIMIT', '8/10')
+SPAM_DUPLICATE_LIMIT = os.getenv('SPAM_DUPLICATE_LIMIT', '4/60')
+SPAM_LINK_LIMIT = os.getenv('SPAM_LINK_LIMIT', '5/60')
+SPAM_BLOCK_INVITES = os.getenv('SPAM_BLOCK_INVITES', '1') == '1'
+SPAM_ACTION = os.getenv('SPAM_ACTION', 'warn')
+
+# 違禁詞過濾設定（各群組以 !filter 指令管理違禁詞）
+WORD_FILTER = os.getenv('WORD_FILTER', '1') == '1'
+
+# 警告有效天數（0 表示永久有效，各群組可用 !warnexpiry 覆寫）
+WARNING_EXPIRY_DAYS = float(os.getenv('WARNING_EXPIRY_DAYS', '0'))
+
+# 資料儲存設定（json 為各自的 JSON 檔案；sqlite 為共用的 SQLite 資料庫，適合多個 worker）
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'data/bot.db')
+
+# 黑名單儲存設定
+BLACKLIST_FILE = 'data/blacklist.json'
+BLACKLIST_STORE = os.getenv('BLACKLIST_STORE', 'json')
+BLACKLIST_BLOOM = os.getenv('BLACKLIST_BLOOM', '0') == '1'
+# 黑名單範圍：global（群組中的封鎖適用於所有群組）或 group（只適用於該群組，可用 !blacklist federation 與其他群組共享）
+BLACKLIST_SCOPE = os.getenv('BLACKLIST_SCOPE', 'global')
+
+# 黑名單操作歷史設定（json 模式依月份分段存放，超過保留天數的分段壓縮封存）
+HISTORY_DIR = os.getenv('HISTORY_DIR', 'data/history')
+HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', '180'))
+
+# 多個 worker 的資料同步：每隔幾秒檢查其他 worker 是否寫入過（0 表示停用，gunicorn.conf.py 會在多 worker 時啟用）
+STATE_SYNC_INTERVAL = float(os.getenv('STATE_SYNC_INTERVAL', '0'))
+# 多個 worker 時只由持有租約的 worker 執行到期解除與定期掃描，持有者結束後最多 LEADER_LEASE_TTL 秒由其他 worker 接手
+LEADER_LEASE_TTL = float(os.getenv('LEADER_LEASE_TTL', '15'))
+
+# 啟動設定：資料在背景載入，就緒前 /status 回傳 503，/callback 最多等待 STARTUP_WAIT 秒（逾時回傳 503 讓 LINE 重送）
+BACKGROUND_LOAD = os.getenv('BACKGROUND_LOAD', '1') == '1'
+STARTUP_WAIT = float(os.getenv('STARTUP_WAIT', '5'))
+BLACKLIST_STORE_OPTIONS = {}
+if BLACKLIST_STORE == 'journal':
+    BLACKLIST_STORE_OPTIONS = {
+        'fsync': os.getenv('BLACKLIST_FSYNC', 'interval'),
+        'fsync_interval': float(os.getenv('BLACKLIST_FSYNC_INTERVAL', '1')),
+        'compact_every': int(os.getenv('BLACKLIST_COMPACT_EVERY', '1000'))
+    }
+
 app = Flask(__name__)
 
+# 初始化事件分派器
+event_dispatcher = None
+if WEBHOOK_WORKERS > 0:
+    event_dispatcher = EventDispatcher(WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, WEBHOOK_ENQUEUE_TIMEOUT)
+    event_dispatcher.start()
+
+# 初始化排程器（警告到期、暫時封鎖到期、定期掃描）
+scheduler = Scheduler()
+# 多個 worker 共用 SQLite 時，到期與掃描只在持有租約的 worker 執行（資料同步仍由每個 worker 各自排程）
+leader_lease = None
+job_scheduler = scheduler
+if STATE_SYNC_INTERVAL > 0 and STORAGE_BACKEND == 'sqlite':
+    leader_lease = LeaderLease(SqliteRepository(SQLITE_PATH).lease_backend(), scheduler, LEADER_LEASE_TTL)
+    job_scheduler = LeaderScheduler(scheduler, leader_lease)
+
+# 初始化指標（停用時各指標為 None，timed/instrument 不做任何事）
+metrics = MetricsRegistry(METRICS)
+webhook_latency = metrics.histogram('linebot_webhook_seconds', 'Webhook 處理時間', ('stage',))
+storage_latency = metrics.histogram('linebot_storage_seconds', '資料寫入時間', ('store', 'operation'))
+
 # 初始化各個管理器
-line_bot = LineBotManager(CHANNEL_ACCESS_TOKEN)
-webhook_handler = WebhookHandler(CHANNEL_SECRET)
-blacklist_manager = BlacklistManager()
-admin_manager = AdminManager()
-warning_manager = WarningManager(blacklist_manager)
-command_handler = CommandHandler(line_bot, blacklist_manager, admin_manager, warning_manager)
+line_api_client = None
+if LINE_ASYNC_CLIENT:
+    line_api_client = AsyncLineClient(
+        CHANNEL_ACCESS_TOKEN,
+        base_url=LINE_API_ENDPOINT,
+        pool_size=LINE_API_POOL_SIZE,
+        max_retries=LINE_API_MAX_RETRIES
+    )
+line_bot = LineBotManager(
+    CHANNEL_ACCESS_TOKEN,
+    LINE_OUTBOX_WINDOW,
+    line_api_client,
+    PROFILE_CACHE_SIZE,
+    PROFILE_CACHE_TTL,
+    metrics,
+    LINE_API_ENDPOINT
+)
+event_deduplicator = None
+if WEBHOOK_DEDUP:
+    if WEBHOOK_DEDUP_BACKEND == 'sqlite':
+        dedup_backend = SqliteRepository(SQLITE_PATH).dedup_backend(WEBHOOK_DEDUP_TTL)
+    else:
+        dedup_backend = MemoryDedupBackend(WEBHOOK_DEDUP_TTL, WEBHOOK_DEDUP_SIZE)
+    event_deduplicator = EventDeduplicator(dedup_backend)
+webhook_handler = QueuedWebhookHandler(CHANNEL_SECRET, event_dispatcher, event_deduplicator)
+# request：驗證簽章與排入佇列；event：處理單一事件（一般聊天另以 chatter 記錄）
+instrument(webhook_handler, 'handle', webhook_latency, ('request',))
+instrument(webhook_handler, 'dispatch', webhook_latency, ('event',))
+if STORAGE_BACKEND == 'sqlite':
+    repository = SqliteRepository(SQLITE_PATH)
+    group_settings = GroupSettings(repository.settings_store(), autoload=not BACKGROUND_LOAD)
+    blacklist_manager = BlacklistManager(
+        BLACKLIST_FILE,
+        repository.blacklist_store(),
+        BLACKLIST_BLOOM,
+        repository.history_store(),
+        job_scheduler,
+        group_settings,
+        BLACKLIST_SCOPE == 'group',
+        autoload=not BACKGROUND_LOAD
+    )
+    admin_manager = AdminManager(repository.admin_store(), autoload=not BACKGROUND_LOAD)
+    warning_manager = WarningManager(
+        blacklist_manager,
+        repository.warning_store(),
+        group_settings,
+        job_scheduler,
+        WARNING_EXPIRY_DAYS,
+        autoload=not BACKGROUND_LOAD
+    )
+    word_filter = WordFilterManager(repository.filter_store(), autoload=not BACKGROUND_LOAD) if WORD_FILTER else None
+else:
+    group_settings = GroupSettings(autoload=not BACKGROUND_LOAD)
+    blacklist_manager = BlacklistManager(
+        BLACKLIST_FILE,
+        create_store(BLACKLIST_STORE, BLACKLIST_FILE, **BLACKLIST_STORE_OPTIONS),
+        BLACKLIST_BLOOM,
+        HistoryStore(HISTORY_DIR, HISTORY_RETENTION_DAYS),
+        job_scheduler,
+        group_settings,
+        BLACKLIST_SCOPE == 'group',
+        autoload=not BACKGROUND_LOAD
+    )
+    admin_manager = AdminManager(autoload=not BACKGROUND_LOAD)
+    warning_manager = WarningManager(
+        blacklist_manager,
+        None,
+        group_settings,
+        job_scheduler,
+        WARNING_EXPIRY_DAYS,
+        autoload=not BACKGROUND_LOAD
+    )
+    word_filter = WordFilterManager(autoload=not BACKGROUND_LOAD) if WORD_FILTER else None
+# 記錄三個管理器寫入異動（append）與完整快照（compact）的時間
+for store_name, manager in (('blacklist', blacklist_manager), ('warnings', warning_manager), ('admins', admin_manager)):
+    for operation in ('append', 'compact'):
+        instrument(manager.store, operation, storage_latency, (store_name, operation))
+
+def reload_settings() -> bool:
+    """重新載入群組設定，並依新的設定更新黑名單的聯盟索引與警告的到期排程"""
+    if not group_settings.reload():
+        return False
+    blacklist_manager.refresh_federations()
+    warning_manager.reschedule()
+    return True
+
+state_sync = None
+if STATE_SYNC_INTERVAL > 0:
+    state_sync = StateSync(scheduler, STATE_SYNC_INTERVAL)
+    state_sync.register('settings', group_settings.store, reload_settings)
+    state_sync.register('blacklist', blacklist_manager.store, blacklist_manager.reload)
+    state_sync.register('warnings', warning_manager.store, warning_manager.reload)
+    state_sync.register('admins', admin_manager.store, admin_manager.reload)
+    if word_filter:
+        state_sync.register('filters', word_filter.store, word_filter.reload)
+if leader_lease:
+    # 接手時重新排定前任持有者尚未執行的到期（已到期的會立即解除）
+    leader_lease.on_acquire(blacklist_manager.reschedule)
+    leader_lease.on_acquire(warning_manager.reschedule)
+
+# 背景載入：群組設定最先載入（黑名單聯盟與警告期限會用到），同步 SDK 在就緒後才預先載入
+startup = StartupLoader()
+if BACKGROUND_LOAD:
+    startup.add('settings', group_settings.load)
+    startup.add('blacklist', blacklist_manager.load)
+    startup.add('warnings', warning_manager.load)
+    startup.add('admins', admin_manager.load)
+    if word_filter:
+        startup.add('filters', word_filter.load)
+if not line_api_client:
+    startup.add('line_sdk', line_bot.warm_up, required=False)
+startup.start()
+membership_index = MembershipIndex()
+sweeper = BlacklistSweeper(line_bot, blacklist_manager, admin_manager, membership_index)
+if COMMAND_RATE_LIMIT_BACKEND == 'sqlite':
+    # 多個 worker 共用同一份限流狀態
+    rate_limit_backend = SqliteRepository(SQLITE_PATH).rate_limit_backend()
+else:
+    rate_limit_backend = MemoryRateLimitBackend()
+command_rate_limiter = CommandRateLimiter(
+    rate_limit_backend,
+    parse_limit(COMMAND_USER_LIMIT) if COMMAND_USER_LIMIT else None,
+    parse_limit(COMMAND_GROUP_LIMIT) if COMMAND_GROUP_LIMIT else None,
+    parse_limits(COMMAND_COOLDOWNS),
+    COMMAND_LIMIT_NOTICE
+)
+command_handler = CommandHandler(
+    line_bot,
+    blacklist_manager,
+    admin_manager,
+    warning_manager,
+    sweeper,
+    command_rate_limiter,
+    word_filter,
+    LIST_FLEX,
+    metrics
+)
+spam_detector = None
+if SPAM_DETECTION:
+    spam_detector = SpamDetector(
+        parse_window(SPAM_FLOOD_LIMIT),
+        parse_window(SPAM_DUPLICATE_LIMIT),
+        parse_window(SPAM_LINK_LIMIT),
+        SPAM_BLOCK_INVITES
+    )
+
+def shutdown():
+    """關閉服務：先處理完佇列中的事件，再送出待發送訊息並關閉儲存"""
+    scheduler.stop()
+    if leader_lease:
+        leader_lease.release()
+    if event_dispatcher:
+        event_dispatcher.shutdown(WEBHOOK_DRAIN_TIMEOUT)
+    line_bot.close()
+    blacklist_manager.close()
+
+atexit.register(shutdown)
 
 def handle_violation(group_id: str, user_id: str, violation_type: str, details: str):
     """處理違規行為"""
     # 加入黑名單
-    blacklist_manager.add_to_blacklist(user_id, f"違規行為: {violation_type}", None)
+    blacklist_manager.add_to_blacklist(user_id, f"違規行為: {violation_type}", None, group_id=group_id)
     
     # 發送警告通知
     message = f"""
@@ -62,12 +338,62 @@ def handle_violation(group_id: str, user_id: str, violation_type: str, details:
 違規類型: {violation_type}
 詳細資訊: {details}
 時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-已自動加入黑名單並踢出群組
+已自動加入黑名單，機器人無法將成員移出群組，請管理員手動移除
 """
     line_bot.send_alert(group_id, message)
-    
-    # 踢出用戶
-    line_bot.kick_user(group_id, user_id)
+
+def issue_auto_warning(group_id: str, user_id: str, details: str) -> None:
+    """自動發出警告，達到最大警告次數時加入黑名單並通知管理員"""
+    result = warning_manager.add_warning(group_id, user_id, f"自動偵測: {details}", None)
+    if result['status'] == 'blacklisted':
+        message = f"""
+⛔ 用戶已被自動加入黑名單
+-------------------
+用戶: {user_id}
+原因: 達到最大警告次數 ({warning_manager.max_warnings}次)
+最後警告原因: {details}
+時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+機器人無法將成員移出群組，請管理員手動移除
+"""
+        line_bot.send_alert(group_id, message)
+    else:
+        message = f"""
+⚠️ 警告通知
+-------------------
+警告對象: {user_id}
+警告原因: {details}
+警告次數: {result['warning_count']}/{warning_manager.max_warnings}
+時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+"""
+        line_bot.send_alert(group_id, message)
+
+def check_spam(group_id: str, user_id: str, text: str) -> None:
+    """將訊息交給洗版偵測器，超過門檻時警告或加入黑名單"""
+    if spam_detector is None or not group_id or not user_id:
+        return
+    verdict = spam_detector.check(group_id, user_id, text)
+    if verdict is None or admin_manager.is_admin(group_id, user_id):
+        return
+
+    violation_type, details = verdict
+    if SPAM_ACTION == 'kick':
+        handle_violation(group_id, user_id, violation_type, details)
+        return
+    issue_auto_warning(group_id, user_id, details)
+
+def check_word_filter(group_id: str, user_id: str, text: str) -> bool:
+    """
+    檢查訊息是否包含群組的違禁詞，符合時自動警告（管理員不受限制）
+    :return: 是否包含違禁詞
+    """
+    if word_filter is None or not group_id or not user_id:
+        return False
+    term = word_filter.check(group_id, text)
+    if term is None or admin_manager.is_admin(group_id, user_id):
+        return False
+    issue_auto_warning(group_id, user_id, f"使用違禁詞「{term}」")
+    return True
 
 @app.route("/")
 def home():
@@ -77,13 +403,17 @@ def home():
         'message': 'LINE Bot Server is running',
         'endpoints': {
             '/callback': 'LINE Webhook endpoint',
-            '/status': 'Server status endpoint'
+            '/status': 'Server status endpoint',
+            '/metrics': 'Prometheus metrics endpoint'
         }
     })
 
 @app.route("/callback", methods=['POST'])
 def callback():
     """LINE Bot Webhook 回調"""
+    if not startup.wait(STARTUP_WAIT):
+        # 資料尚未載入完成，回傳 503 讓 LINE 稍後重送
+        abort(503)
     signature = request.headers['X-Line-Signature']
     body = request.get_data(as_text=True)
 
@@ -91,19 +421,54 @@ def callback():
         webhook_handler.handle(body, signature)
     except InvalidSignatureError:
         abort(400)
+    except QueueFullError:
+        # 回傳 503 讓 LINE 稍後重送
+        abort(503)
 
     return 'OK'
 
+@webhook_handler.chatter
+@timed(webhook_latency, ('chatter',))
+def handle_chatter(event: dict):
+    """
+    處理一般聊天（非指令的文字訊息）
+    直接讀取原始 JSON 事件，不建立 SDK 的事件模型
+    """
+    source = event.get('source', {})
+    group_id = source.get('groupId')
+    user_id = source.get('userId')
+
+    # 發言者必定是群組成員
+    if group_id and user_id and not membership_index.is_member(group_id, user_id):
+        membership_index.add_members(group_id, [user_id])
+
+    if user_id and blacklist_manager.is_blacklisted(user_id, group_id):
+        return
+    text = event['message']['text']
+    if check_word_filter(group_id, user_id, text):
+        return
+    check_spam(group_id, user_id, text)
+
 @webhook_handler.add(MessageEvent, message=TextMessageContent)
 def handle_text_message(event):
     """處理文字訊息"""
     text = event.message.text
     user_id = event.source.user_id
     
+    # 發言者必定是群組成員
+    group_id = getattr(event.source, 'group_id', None)
+    if group_id and user_id and not membership_index.is_member(group_id, user_id):
+        membership_index.add_members(group_id, [user_id])
+    
     # 檢查是否在黑名單中
-    if blacklist_manager.is_blacklisted(user_id):
+    if blacklist_manager.is_blacklisted(user_id, group_id):
         return
     
+    # 違禁詞檢查在指令處理之前
+    if check_word_filter(group_id, user_id, text):
+        return
+    check_spam(group_id, user_id, text)
+
     # 處理指令
     if text.startswith('!'):
         command_handler.handle_command(event)
@@ -116,6 +481,7 @@ def handle_join(event):
     
     # 將邀請機器人的人設為管理員
     admin_manager.initialize_group(group_id, user_id)
+    membership_index.add_members(group_id, [user_id] if user_id else [])
     
     welcome_message = """
 👋 大家好！我是群組管理機器人
@@ -123,32 +489,51 @@ def handle_join(event):
 - 監控群組活動
 - 管理黑名單
 - 警告系統
-- 踢出違規用戶
+- 封鎖違規用戶
 
 輸入 !help 查看更多功能
 """
-    line_bot.send_message(group_id, welcome_message)
+    ctx = ResponseContext(line_bot, event)
+    ctx.send(welcome_message)
+    ctx.flush()
+
+@webhook_handler.add(LeaveEvent)
+def handle_leave(event):
+    """處理機器人離開群組事件"""
+    membership_index.drop_group(event.source.group_id)
 
 @webhook_handler.add(MemberJoinedEvent)
 def handle_member_joined(event):
     """處理新成員加入事件"""
     group_id = event.source.group_id
-    for member in event.joined.members:
-        # 檢查是否在黑名單中
-        if blacklist_manager.is_blacklisted(member.user_id):
-            profile = line_bot.get_group_member_profile(group_id, member.user_id)
-            handle_violation(
-                group_id,
-                member.user_id,
-                "黑名單成員加入",
-                f"用戶名稱: {profile['display_name'] if profile else '未知'}"
-            )
+    membership_index.add_members(group_id, [member.user_id for member in event.joined.members])
+    if line_bot.profile_cache:
+        for member in event.joined.members:
+            line_bot.profile_cache.invalidate(group_id, member.user_id)
+
+    # 檢查是否在黑名單中，並一次取得所有黑名單成員的資料
+    blacklisted = [member.user_id for member in event.joined.members
+                   if blacklist_manager.is_blacklisted(member.user_id, group_id)]
+    profiles = line_bot.prefetch_group_member_profiles(group_id, blacklisted)
+    for user_id in blacklisted:
+        profile = profiles.get(user_id)
+        handle_violation(
+            group_id,
+            user_id,
+            "黑名單成員加入",
+            f"用戶名稱: {profile['display_name'] if profile else '未知'}"
+        )
 
 @webhook_handler.add(MemberLeftEvent)
 def handle_member_left(event):
     """處理成員離開事件"""
     group_id = event.source.group_id
+    membership_index.remove_members(group_id, [member.user_id for member in event.left.members])
     for member in event.left.members:
+        if line_bot.profile_cache:
+            line_bot.profile_cache.invalidate(group_id, member.user_id)
+        if spam_detector:
+            spam_detector.forget(group_id, member.user_id)
         line_bot.send_message(
             group_id,
             f"👋 成員 {member.user_id} 已離開群組"
@@ -156,25 +541,85 @@ def handle_member_left(event):
 
 @app.route("/status", methods=['GET'])
 def status():
-    """檢查服務狀態"""
-    return {
+    """檢查服務狀態（資料載入完成前回傳 503）"""
+    if not startup.ready:
+        return {'status': 'starting', 'startup': startup.stats()}, 503
+    result = {
         'status': 'running',
         'blacklist_count': len(blacklist_manager.get_blacklist()),
+        'blacklist': blacklist_manager.counts(),
         'timestamp': datetime.now().isoformat()
     }
+    result['webhook'] = webhook_handler.stats()
+    if event_dispatcher:
+        result['event_queue'] = event_dispatcher.stats()
+    if line_bot.outbox:
+        result['outbox'] = line_bot.outbox.stats()
+    result['delivery'] = dict(line_bot.delivery_stats)
+    if line_api_client:
+        result['line_api'] = line_api_client.stats()
+    if line_bot.profile_cache:
+        result['profile_cache'] = line_bot.profile_cache.stats()
+    result['membership'] = membership_index.stats()
+    result['command_rate_limit'] = command_rate_limiter.stats()
+    if spam_detector:
+        result['spam'] = spam_detector.stats()
+    result['scheduler'] = scheduler.stats()
+    result['startup'] = startup.stats()
+    if state_sync:
+        result['state_sync'] = state_sync.stats()
+    if leader_lease:
+        result['leader_lease'] = leader_lease.stats()
+    return result
+
+# 佇列深度與各元件既有的統計在輸出 /metrics 時才讀取
+metrics.callback('linebot_webhook_events_total', '收到的 Webhook 事件數', lambda: webhook_handler.events, 'counter')
+metrics.callback('linebot_scheduler_pending', '排程中的工作數', lambda: len(scheduler))
+
+def blacklist_entries() -> dict:
+    counts = blacklist_manager.counts()
+    return {('global',): counts['global'], ('group',): counts['group_entries']}
+
+metrics.callback('linebot_blacklist_entries', '各層黑名單筆數', blacklist_entries, label_names=('tier',))
+if event_dispatcher:
+    metrics.callback('linebot_event_queue_depth', '事件佇列中等待處理的事件數', event_dispatcher.depth)
+    metrics.callback('linebot_event_queue_rejected_total', '佇列已滿而拒絕的事件數',
+                     lambda: event_dispatcher.rejected, 'counter')
+if line_bot.outbox:
+    metrics.callback('linebot_outbox_pending', '合併發送佇列中的訊息數', lambda: line_bot.outbox.stats()['pending'])
+if event_deduplicator:
+    metrics.callback('linebot_webhook_duplicates_total', '略過的重送事件數',
+                     lambda: event_deduplicator.duplicates, 'counter')
+
+@app.route("/metrics", methods=['GET'])
+def metrics_endpoint():
+    """Prometheus 格式的指標"""
+    if not metrics.enabled:
+        abort(404)
+    return metrics.render(), 200, {'Content-Type': CONTENT_TYPE}
+
+def run_sweep():
+    """定期掃描所有群組的黑名單成員並通知管理員"""
+    results = sweeper.sweep_all(refresh=True)
+    total = sum(len(result.get('matched', [])) for result in results)
+    print(f"定期掃描完成：{len(results)} 個群組，發現 {total} 位黑名單成員")
 
 def start_monitoring():
-    """啟動監控"""
+    """啟動排程器（警告到期、定期掃描與多 worker 的資料同步、排程租約）"""
     try:
-        # 在這裡添加監控邏輯
-        pass
+        if SWEEP_INTERVAL > 0:
+            job_scheduler.schedule_every('sweep', SWEEP_INTERVAL, run_sweep)
+        if state_sync:
+            state_sync.start()
+        if leader_lease:
+            leader_lease.start()
+        scheduler.start()
     except Exception as e:
         print(f"監控啟動失敗: {e}")
 
 if __name__ == "__main__":
     # 在背景執行監控
-    monitor_thread = threading.Thread(target=start_monitoring, daemon=True)
-    monitor_thread.start()
+    start_monitoring()
     
     # 啟動 Flask 應用
     app.run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.blacklist_index import BlacklistIndex
+
+# 黑名單索引直接查詢黑名單字典（不另存精簡的 ID）；比較直接查詢與先經過 Bloom filter 時的額外記憶體與查詢延遲
+parser = argparse.ArgumentParser(description='黑名單索引效能測試')
+parser.add_argument('--size', type=int, default=200000, help='黑名單筆數')
+parser.add_argument('--lookups', type=int, default=1000000, help='查詢次數')
+args = parser.parse_args()
+
+
+def make_user_id() -> str:
+    return 'U' + uuid.uuid4().hex
+
+
+def measure(build):
+    """回傳 (結果, 建立時配置的記憶體 bytes)"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def bench_lookup(contains, keys) -> float:
+    """回傳平均每次查詢的奈秒數"""
+    started = time.perf_counter()
+    for key in keys:
+        contains(key)
+    return (time.perf_counter() - started) / len(keys) * 1e9
+
+
+user_ids, ids_memory = measure(lambda: [make_user_id() for _ in range(args.size)])
+blacklist, dict_memory = measure(lambda: {
+    user_id: {'reason': '違規行為: 洗版', 'timestamp': '2026-01-01T00:00:00', 'reporter_id': None}
+    for user_id in user_ids
+})
+index, index_memory = measure(lambda: BlacklistIndex(blacklist))
+bloom_index, bloom_memory = measure(lambda: BlacklistIndex(blacklist, use_bloom=True))
+
+# 一般訊息的發言者幾乎都不在黑名單中，以 99% 未命中模擬
+misses = [make_user_id() for _ in range(args.lookups)]
+keys = [user_ids[i % args.size] if i % 100 == 0 else misses[i] for i in range(args.lookups)]
+
+print(f"黑名單筆數: {args.size}，查詢次數: {args.lookups}（1% 命中）")
+print(f"用戶 ID 字串本身: {ids_memory / 1024 / 1024:.1f} MiB")
+print(f"黑名單字典（含原因等資料，索引共用）: {dict_memory / 1024 / 1024:.1f} MiB")
+print(f"{'查詢方式':<24}{'額外記憶體':>12}{'查詢延遲':>12}")
+for name, contains, memory in (
+    ('BlacklistIndex', index.contains, index_memory),
+    ('BlacklistIndex + Bloom', bloom_index.contains, bloom_memory)
+):
+    print(f"{name:<24}{memory / 1024 / 1024:>9.1f} MiB{bench_lookup(contains, keys):>9.0f} ns")
+
+false_positives = sum(1 for key in misses[:100000] if key in bloom_index._bloom)
+print(f"Bloom filter 大小: {bloom_index._bloom.memory_bytes() / 1024:.0f} KiB，"
+      f"誤判率: {false_positives / 100000:.2%}")
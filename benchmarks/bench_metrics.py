@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import MetricsRegistry, timed
+
+# 比較未包裝、指標停用、指標啟用時每次呼叫的額外成本
+parser = argparse.ArgumentParser(description='指標裝飾器效能測試')
+parser.add_argument('--calls', type=int, default=1000000, help='呼叫次數')
+args = parser.parse_args()
+
+
+def handler(x):
+    return x + 1
+
+
+def bench(func) -> float:
+    """回傳每次呼叫的平均奈秒數"""
+    started = time.perf_counter()
+    for i in range(args.calls):
+        func(i)
+    return (time.perf_counter() - started) / args.calls * 1e9
+
+
+disabled = MetricsRegistry(False)
+enabled = MetricsRegistry(True)
+variants = (
+    ('未包裝', handler),
+    ('指標停用', timed(disabled.histogram('bench_seconds', 'bench', ('stage',)), ('x',))(handler)),
+    ('指標啟用', timed(enabled.histogram('bench_seconds', 'bench', ('stage',)), ('x',))(handler)),
+)
+
+print(f"呼叫次數: {args.calls:,}")
+baseline = None
+for name, func in variants:
+    cost = bench(func)
+    baseline = cost if baseline is None else baseline
+    print(f"{name:<10}{cost:>10.1f} ns/次（額外 {cost - baseline:>6.1f} ns）")
+print(f"停用時回傳原函式: {variants[1][1] is handler}")
@@ -0,0 +1,64 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.spam import SpamDetector
+
+# 以合成訊息流測試洗版偵測器的每則訊息成本與記憶體上限
+parser = argparse.ArgumentParser(description='洗版偵測效能測試')
+parser.add_argument('--messages', type=int, default=500000, help='訊息數')
+parser.add_argument('--users', type=int, default=100000, help='發言用戶數')
+parser.add_argument('--groups', type=int, default=200, help='群組數')
+parser.add_argument('--max-users', type=int, default=50000, help='最多追蹤的用戶數')
+parser.add_argument('--spammers', type=float, default=0.01, help='洗版用戶的比例')
+args = parser.parse_args()
+
+random.seed(1)
+groups = ['C' + uuid.uuid4().hex for _ in range(args.groups)]
+users = [(random.choice(groups), 'U' + uuid.uuid4().hex) for _ in range(args.users)]
+spammers = users[:max(1, int(args.users * args.spammers))]
+texts = ['早安', '今天要開會嗎？', '好喔 👍', '晚點再說', '有人要一起吃飯嗎', '看看這個 https://example.com/a']
+
+# 先產生訊息流：洗版用戶連續快速發送相同訊息，其他用戶隨機發言
+stream = []
+now = 0.0
+while len(stream) < args.messages:
+    now += 0.001
+    if random.random() < 0.05:
+        group_id, user_id = random.choice(spammers)
+        for _ in range(5):
+            stream.append((group_id, user_id, '加我好友領獎品!!!', now))
+    else:
+        group_id, user_id = random.choice(users)
+        stream.append((group_id, user_id, random.choice(texts), now))
+stream = stream[:args.messages]
+
+
+def run(detector) -> float:
+    check = detector.check
+    started = time.perf_counter()
+    for group_id, user_id, text, at in stream:
+        check(group_id, user_id, text, at)
+    return time.perf_counter() - started
+
+
+elapsed = run(SpamDetector(max_users=args.max_users))
+
+# 記憶體另外量測，避免 tracemalloc 影響計時
+tracemalloc.start()
+detector = SpamDetector(max_users=args.max_users)
+run(detector)
+current, _ = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+
+stats = detector.stats()
+print(f"訊息數: {len(stream)}，用戶數: {args.users}，最多追蹤 {args.max_users} 位")
+print(f"每則訊息: {elapsed / len(stream) * 1e6:.2f} µs（{len(stream) / elapsed:,.0f} msg/s）")
+print(f"追蹤中的用戶: {stats['tracked_users']}，偵測器記憶體: {current / 1024 / 1024:.1f} MiB")
+print(f"偵測結果: {stats['detections']}")
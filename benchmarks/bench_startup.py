@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 比較同步載入與背景載入資料時的啟動時間：
+# 匯入 app（可以開始接受請求）、資料載入完成（就緒）、預先載入同步 SDK 完成
+parser = argparse.ArgumentParser(description='啟動時間測試')
+parser.add_argument('--entries', type=int, default=100000, help='黑名單筆數')
+parser.add_argument('--warnings', type=int, default=10000, help='警告筆數')
+parser.add_argument('--runs', type=int, default=5, help='每種設定的執行次數（取中位數）')
+args = parser.parse_args()
+
+# 在子行程中執行，每次都是冷啟動（模組尚未匯入）
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, %r)
+import app
+imported = time.perf_counter() - started
+app.startup.wait()
+ready = time.perf_counter() - started
+while 'line_sdk' not in app.startup.durations:
+    time.sleep(0.001)
+warm = time.perf_counter() - started
+print(json.dumps({'import': imported, 'ready': ready, 'warm': warm}))
+""" % ROOT
+
+
+def seed(directory: str) -> None:
+    """產生測試用的資料檔"""
+    data_dir = os.path.join(directory, 'data')
+    os.makedirs(data_dir)
+    blacklist = {
+        f'U{i:032x}': {'reason': '測試', 'timestamp': '2024-01-01T00:00:00', 'reporter_id': None}
+        for i in range(args.entries)
+    }
+    warnings = {}
+    for i in range(args.warnings):
+        warnings.setdefault(f'C{i % 100:032x}', {}).setdefault(f'U{i:032x}', []).append(
+            {'reason': '測試', 'warned_by': None, 'timestamp': '2024-01-01T00:00:00'})
+    admins = {f'C{i:032x}': [f'U{i:032x}'] for i in range(100)}
+    for name, data in (('blacklist', {'blacklist': blacklist, 'groups': {}}), ('warnings', warnings),
+                       ('admins', admins)):
+        with open(os.path.join(data_dir, f'{name}.json'), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+
+def run(directory: str, background: bool) -> dict:
+    env = dict(os.environ, LINE_CHANNEL_ACCESS_TOKEN='bench-token', LINE_CHANNEL_SECRET='bench-secret',
+               BACKGROUND_LOAD='1' if background else '0', HISTORY_DIR=os.path.join(directory, 'data', 'history'))
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=directory, env=env, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+directory = tempfile.mkdtemp(prefix='linebot-startup-')
+seed(directory)
+print(f"黑名單 {args.entries:,} 筆，警告 {args.warnings:,} 筆，每種設定執行 {args.runs} 次（中位數）")
+print(f"{'設定':<12}{'匯入 app':>12}{'資料就緒':>12}{'SDK 載入完成':>14}")
+for name, background in (('同步載入', False), ('背景載入', True)):
+    results = [run(directory, background) for _ in range(args.runs)]
+    medians = {key: statistics.median(result[key] for result in results) for key in ('import', 'ready', 'warm')}
+    print(f"{name:<12}{medians['import'] * 1000:>10.0f}ms{medians['ready'] * 1000:>10.0f}ms"
+          f"{medians['warm'] * 1000:>12.0f}ms")
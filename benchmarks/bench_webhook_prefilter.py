@@ -0,0 +1,97 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from linebot.v3.webhook import WebhookHandler
+from linebot.v3.webhooks import MessageEvent, TextMessageContent
+from utils.dedup import EventDeduplicator, MemoryDedupBackend
+from utils.webhook import QueuedWebhookHandler
+
+# 比較 Webhook 事件解析：完整建立 SDK 事件模型 vs 先以原始 JSON 過濾一般聊天
+parser = argparse.ArgumentParser(description='Webhook 預先過濾效能測試')
+parser.add_argument('--requests', type=int, default=2000, help='Webhook 請求數')
+parser.add_argument('--events', type=int, default=10, help='每個請求的事件數')
+parser.add_argument('--command-ratio', type=float, default=0.01, help='指令訊息的比例')
+args = parser.parse_args()
+
+SECRET = 'benchmark-secret'
+
+
+def make_event(text: str) -> dict:
+    return {
+        'type': 'message',
+        'mode': 'active',
+        'timestamp': int(time.time() * 1000),
+        'webhookEventId': uuid.uuid4().hex.upper(),
+        'deliveryContext': {'isRedelivery': False},
+        'replyToken': uuid.uuid4().hex,
+        'source': {'type': 'group', 'groupId': 'C' + '0' * 32, 'userId': 'U' + uuid.uuid4().hex},
+        'message': {'id': str(uuid.uuid4().int)[:18], 'type': 'text', 'quoteToken': uuid.uuid4().hex,
+                    'text': text}
+    }
+
+
+def sign(body: str) -> str:
+    digest = hmac.new(SECRET.encode(), body.encode(), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+every = max(1, round(1 / args.command_ratio)) if args.command_ratio > 0 else 0
+bodies = []
+counter = 0
+for _ in range(args.requests):
+    events = []
+    for _ in range(args.events):
+        is_command = every and counter % every == 0
+        events.append(make_event('!status' if is_command else '今天天氣真好，大家晚餐吃什麼？'))
+        counter += 1
+    body = json.dumps({'destination': 'U' + '1' * 32, 'events': events})
+    bodies.append((body, sign(body)))
+
+handled = {'command': 0, 'chatter': 0}
+
+
+def on_text(event):
+    # 與 handle_text_message 相同：只有指令需要進一步處理
+    handled['command' if event.message.text.startswith('!') else 'chatter'] += 1
+
+
+def on_chatter(event):
+    handled['chatter'] += 1
+
+
+baseline = WebhookHandler(SECRET)
+baseline.add(MessageEvent, message=TextMessageContent)(on_text)
+
+prefiltered = QueuedWebhookHandler(SECRET)
+prefiltered.add(MessageEvent, message=TextMessageContent)(on_text)
+prefiltered.chatter(on_chatter)
+
+# 加上 webhookEventId 去重（每個事件一次 OrderedDict 查詢與寫入）
+deduplicated = QueuedWebhookHandler(SECRET, deduplicator=EventDeduplicator(MemoryDedupBackend()))
+deduplicated.add(MessageEvent, message=TextMessageContent)(on_text)
+deduplicated.chatter(on_chatter)
+
+
+def bench(handler) -> float:
+    """回傳每秒處理的事件數"""
+    started = time.perf_counter()
+    for body, signature in bodies:
+        handler.handle(body, signature)
+    return len(bodies) * args.events / (time.perf_counter() - started)
+
+
+print(f"請求數: {args.requests}，每個請求 {args.events} 個事件，指令比例 {args.command_ratio:.0%}")
+for name, handler in (('完整事件模型', baseline), ('原始 JSON 預先過濾', prefiltered),
+                      ('預先過濾 + 事件去重', deduplicated)):
+    handled.update(command=0, chatter=0)
+    rate = bench(handler)
+    print(f"{name:<20}{rate:>12,.0f} events/s（指令 {handled['command']}，聊天 {handled['chatter']}）")
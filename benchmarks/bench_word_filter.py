@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.word_filter import AhoCorasick, normalize
+
+# 比較違禁詞比對方式：逐一 re.search、合併成一個正規表示式、Aho-Corasick 自動機
+parser = argparse.ArgumentParser(description='違禁詞過濾效能測試')
+parser.add_argument('--terms', type=int, default=5000, help='違禁詞數量')
+parser.add_argument('--messages', type=int, default=2000, help='訊息數')
+parser.add_argument('--hit-ratio', type=float, default=0.01, help='包含違禁詞的訊息比例')
+args = parser.parse_args()
+
+random.seed(1)
+CHARS = '的一是不了人我在有他這為之大來以個中上們到說國和地也子時道出而要於就下得可你年生abcdefghijklmnopqrstuvwxyz'
+
+
+def random_text(length: int) -> str:
+    return ''.join(random.choice(CHARS) for _ in range(length))
+
+
+terms = list({random_text(random.randint(3, 6)) for _ in range(args.terms)})
+messages = []
+for i in range(args.messages):
+    text = random_text(random.randint(10, 80))
+    if random.random() < args.hit_ratio:
+        position = random.randint(0, len(text))
+        text = text[:position] + random.choice(terms) + text[position:]
+    messages.append(text)
+
+started = time.perf_counter()
+patterns = [re.compile(re.escape(term)) for term in terms]
+naive_build = time.perf_counter() - started
+
+started = time.perf_counter()
+combined = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)))
+combined_build = time.perf_counter() - started
+
+started = time.perf_counter()
+automaton = AhoCorasick(normalize(term) for term in terms)
+automaton_build = time.perf_counter() - started
+
+
+def naive(text):
+    for pattern in patterns:
+        if pattern.search(text):
+            return True
+    return False
+
+
+def bench(match) -> tuple:
+    started = time.perf_counter()
+    hits = sum(1 for text in messages if match(text))
+    return (time.perf_counter() - started) / len(messages) * 1e6, hits
+
+
+print(f"違禁詞: {len(terms)} 個，訊息: {len(messages)} 則（{args.hit_ratio:.0%} 含違禁詞）")
+print(f"{'方式':<20}{'建立時間':>10}{'每則訊息':>12}{'命中':>8}")
+for name, build, match in (
+    ('逐一 re.search', naive_build, naive),
+    ('合併正規表示式', combined_build, lambda text: combined.search(text) is not None),
+    ('Aho-Corasick', automaton_build, lambda text: automaton.search(normalize(text)) is not None)
+):
+    per_message, hits = bench(match)
+    print(f"{name:<20}{build * 1000:>8.1f} ms{per_message:>9.1f} µs{hits:>8}")
@@ -0,0 +1,154 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+# 模擬的 LINE Messaging API 端點：(方法, 路徑規則, 端點名稱)
+ROUTES = [
+    ('POST', re.compile(r'^/v2/bot/message/push$'), 'push'),
+    ('POST', re.compile(r'^/v2/bot/message/reply$'), 'reply'),
+    ('GET', re.compile(r'^/v2/bot/group/(?P<group_id>[^/]+)/member/(?P<user_id>[^/]+)$'), 'profile'),
+    ('GET', re.compile(r'^/v2/bot/group/(?P<group_id>[^/]+)/members/ids$'), 'members_ids'),
+    ('POST', re.compile(r'^/v2/bot/group/(?P<group_id>[^/]+)/leave$'), 'leave'),
+]
+
+
+class LineApiStub:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limit_ratio: float = 0.0, retry_after: Optional[float] = 0, members: int = 50):
+        """
+        本地的 LINE Messaging API 模擬伺服器：記錄所有呼叫，可注入延遲與 429
+        :param port: 監聽埠號，0 表示自動選擇
+        :param latency: 每個請求的固定延遲秒數
+        :param jitter: 額外的隨機延遲秒數上限
+        :param rate_limit_ratio: 回傳 429 的機率
+        :param retry_after: 429 回應的 Retry-After 秒數（None 表示不帶此標頭）
+        :param members: 查詢群組成員 ID 時每個群組回傳的成員數
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.members = members
+        self.calls = Counter()         # 端點 -> 呼叫次數（含 429）
+        self.rate_limited = Counter()  # 端點 -> 回傳 429 的次數
+        self.messages = 0              # push/reply 送出的訊息則數
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'LineApiStub':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='line-api-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.calls)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.rate_limited.clear()
+            self.messages = 0
+
+    def _respond(self, method: str, path: str, body: bytes):
+        """回傳 (狀態碼, 回應內容, 額外標頭)"""
+        path = path.split('?', 1)[0]
+        for route_method, pattern, endpoint in ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            return 404, {'message': 'Not found'}, {}
+
+        delay = self.latency + (random.random() * self.jitter if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        with self._lock:
+            self.calls[endpoint] += 1
+            if self.rate_limit_ratio and random.random() < self.rate_limit_ratio:
+                self.rate_limited[endpoint] += 1
+                headers = {'Retry-After': str(self.retry_after)} if self.retry_after is not None else {}
+                return 429, {'message': 'The API rate limit has been exceeded. Try again later.'}, headers
+            if endpoint in ('push', 'reply'):
+                sent = len(json.loads(body or b'{}').get('messages', []))
+                self.messages += sent
+
+        params = match.groupdict()
+        if endpoint in ('push', 'reply'):
+            # SDK 會驗證回應格式：每則送出的訊息都需要一筆 sentMessages
+            return 200, {'sentMessages': [{'id': str(random.getrandbits(60)), 'quoteToken': 'q'}
+                                          for _ in range(sent)]}, {}
+        if endpoint == 'profile':
+            return 200, {'userId': params['user_id'], 'displayName': f"user-{params['user_id'][-6:]}",
+                         'pictureUrl': 'https://example.com/p.png'}, {}
+        if endpoint == 'members_ids':
+            return 200, {'memberIds': [f"U{params['group_id'][-8:]}{i:024d}" for i in range(self.members)]}, {}
+        return 200, {}, {}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, payload, headers = stub._respond(self.command, self.path, body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    # 單獨啟動模擬伺服器（例如讓 gunicorn 啟動的機器人以 LINE_API_ENDPOINT 指向此處）
+    parser = argparse.ArgumentParser(description='LINE Messaging API 模擬伺服器')
+    parser.add_argument('--port', type=int, default=8081, help='監聽埠號')
+    parser.add_argument('--latency', type=float, default=20, help='每個請求的延遲（毫秒）')
+    parser.add_argument('--jitter', type=float, default=10, help='額外的隨機延遲上限（毫秒）')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='回傳 429 的機率')
+    args = parser.parse_args()
+
+    stub = LineApiStub(port=args.port, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                       rate_limit_ratio=args.rate_limit).start()
+    print(f"LINE API 模擬伺服器：{stub.url}（Ctrl+C 結束）")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"呼叫次數：{stub.snapshot()}，429：{dict(stub.rate_limited)}")
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,302 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import http.client
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from line_api_stub import LineApiStub
+
+# 壓力測試：以正確簽章的 Webhook 請求（一般聊天、指令、成員加入/離開的突發）打 Flask 應用，
+# LINE API 由本地的模擬伺服器回應（可注入延遲與 429），
+# 回報延遲 p50/p99、每秒事件數，以及每個事件平均呼叫幾次 LINE API
+parser = argparse.ArgumentParser(description='Webhook 壓力測試')
+parser.add_argument('--requests', type=int, default=2000, help='Webhook 請求數')
+parser.add_argument('--duration', type=float, default=0, help='測試秒數（需搭配 --rate，會取代 --requests）')
+parser.add_argument('--rate', type=float, default=0, help='每秒送出的請求數，0 表示盡快送出')
+parser.add_argument('--concurrency', type=int, default=8, help='同時送出請求的連線數')
+parser.add_argument('--events', type=int, default=1, help='每個請求的事件數')
+parser.add_argument('--mix', default='chatter=90,command=6,join=2,leave=2',
+                    help='事件種類的比例（chatter、command、join、leave）')
+parser.add_argument('--burst', type=int, default=5, help='每次成員加入/離開連續送出的事件數')
+parser.add_argument('--groups', type=int, default=20, help='群組數')
+parser.add_argument('--users', type=int, default=200, help='每個群組的成員數')
+parser.add_argument('--blacklisted', type=float, default=0.1, help='加入的成員中黑名單成員的比例')
+parser.add_argument('--api-latency', type=float, default=20, help='LINE API 模擬延遲（毫秒）')
+parser.add_argument('--api-jitter', type=float, default=10, help='LINE API 額外的隨機延遲上限（毫秒）')
+parser.add_argument('--api-429', type=float, default=0.0, help='LINE API 回傳 429 的機率')
+parser.add_argument('--retry-after', type=float, default=0, help='429 回應的 Retry-After 秒數')
+parser.add_argument('--workers', type=int, default=None, help='設定 WEBHOOK_WORKERS（預設沿用環境變數）')
+parser.add_argument('--no-limits', action='store_true', help='停用指令頻率限制與冷卻時間')
+parser.add_argument('--target', default=None,
+                    help='改打外部啟動的機器人（例如 http://127.0.0.1:8000/callback），'
+                         '該機器人需以 LINE_API_ENDPOINT 指向 --stub-port')
+parser.add_argument('--secret', default='load-test-secret', help='Channel secret（--target 時需與機器人相同）')
+parser.add_argument('--stub-port', type=int, default=0, help='模擬伺服器埠號，0 表示自動選擇')
+parser.add_argument('--seed', type=int, default=1, help='亂數種子')
+parser.add_argument('--verbose', action='store_true', help='顯示應用程式本身的輸出')
+args = parser.parse_args()
+
+KINDS = ('chatter', 'command', 'join', 'leave')
+CHATTER = ('今天天氣真好', '大家晚餐吃什麼？', '明天幾點集合', '收到', '哈哈哈', '這週末有人要去爬山嗎',
+           '剛剛的會議紀錄在哪裡', '謝謝大家', '晚安', '我到了')
+COMMANDS = ('!status', '!help', '!blacklist', '!warnings')
+DESTINATION = 'U' + '1' * 32
+
+rng = random.Random(args.seed)
+
+
+def parse_mix(text: str) -> dict:
+    weights = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in KINDS:
+            parser.error(f'未知的事件種類: {kind}')
+        weights[kind] = float(weight)
+    return weights
+
+
+def user_id(prefix: str, group_index: int, index: int) -> str:
+    return f'U{prefix}{group_index:04d}{index:026x}'
+
+
+groups = [f'C{i:032x}' for i in range(args.groups)]
+members = [[user_id('0', g, i) for i in range(args.users)] for g in range(args.groups)]
+admins = [group_members[0] for group_members in members]
+blacklisted = [user_id('b', 0, i) for i in range(max(1, args.groups * 5))]
+newcomers = itertools.count()
+
+
+def base_event(event_type: str, group_index: int, reply: bool = True) -> dict:
+    event = {
+        'type': event_type,
+        'mode': 'active',
+        'timestamp': int(time.time() * 1000),
+        'webhookEventId': uuid.UUID(int=rng.getrandbits(128)).hex.upper(),
+        'deliveryContext': {'isRedelivery': False},
+        'source': {'type': 'group', 'groupId': groups[group_index]}
+    }
+    if reply:
+        event['replyToken'] = uuid.UUID(int=rng.getrandbits(128)).hex
+    return event
+
+
+def message_event(group_index: int, sender: str, text: str) -> dict:
+    event = base_event('message', group_index)
+    event['source']['userId'] = sender
+    event['message'] = {'id': str(rng.getrandbits(60)), 'type': 'text',
+                        'quoteToken': uuid.UUID(int=rng.getrandbits(128)).hex, 'text': text}
+    return event
+
+
+def make_events(kind: str) -> list:
+    """產生一種事件；成員加入/離開會連續產生 --burst 個事件（模擬大量加入或離開）"""
+    g = rng.randrange(args.groups)
+    if kind == 'chatter':
+        text = f'{rng.choice(CHATTER)} {rng.randrange(10000)}'
+        return [message_event(g, rng.choice(members[g]), text)]
+    if kind == 'command':
+        command = rng.choice(COMMANDS)
+        if command == '!warnings':
+            command += f' @{rng.choice(members[g])}'
+        sender = admins[g] if command != '!help' else rng.choice(members[g])
+        return [message_event(g, sender, command)]
+
+    events = []
+    for _ in range(args.burst):
+        if kind == 'join':
+            event = base_event('memberJoined', g)
+            joined = (rng.choice(blacklisted) if rng.random() < args.blacklisted
+                      else user_id('n', g, next(newcomers)))
+            event['joined'] = {'members': [{'type': 'user', 'userId': joined}]}
+        else:
+            event = base_event('memberLeft', g, reply=False)
+            event['left'] = {'members': [{'type': 'user', 'userId': rng.choice(members[g][1:])}]}
+        events.append(event)
+    return events
+
+
+def sign(body: str) -> str:
+    digest = hmac.new(args.secret.encode(), body.encode(), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+def build_payloads(total: int) -> tuple:
+    """預先產生並簽章所有請求，避免產生請求的時間算進延遲"""
+    weights = parse_mix(args.mix)
+    kinds, kind_weights = zip(*weights.items())
+    pending = []
+    payloads = []
+    kind_counts = Counter()
+    while len(payloads) < total:
+        events = []
+        while len(events) < args.events:
+            if not pending:
+                kind = rng.choices(kinds, kind_weights)[0]
+                generated = make_events(kind)
+                kind_counts[kind] += len(generated)
+                pending.extend(generated)
+            events.append(pending.pop(0))
+        body = json.dumps({'destination': DESTINATION, 'events': events})
+        payloads.append((body, sign(body), len(events)))
+    return payloads, kind_counts
+
+
+def percentile(values: list, ratio: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(ratio * len(values))) - 1))]
+
+
+# 啟動 LINE API 模擬伺服器
+stub = LineApiStub(port=args.stub_port, latency=args.api_latency / 1000, jitter=args.api_jitter / 1000,
+                   rate_limit_ratio=args.api_429, retry_after=args.retry_after, members=args.users).start()
+
+real_stdout = sys.stdout
+quiet = open(os.devnull, 'w') if not args.verbose else real_stdout
+bot = None
+server = None
+if args.target:
+    target = args.target
+    print(f"LINE API 模擬伺服器：{stub.url}（機器人需設定 LINE_API_ENDPOINT={stub.url}）")
+else:
+    # 在暫存目錄中載入應用程式，資料檔不會影響既有資料
+    os.environ['LINE_CHANNEL_ACCESS_TOKEN'] = 'load-test-token'
+    os.environ['LINE_CHANNEL_SECRET'] = args.secret
+    os.environ['LINE_API_ENDPOINT'] = stub.url
+    if args.workers is not None:
+        os.environ['WEBHOOK_WORKERS'] = str(args.workers)
+    if args.no_limits:
+        for name in ('COMMAND_USER_LIMIT', 'COMMAND_GROUP_LIMIT', 'COMMAND_COOLDOWNS'):
+            os.environ[name] = ''
+    os.chdir(tempfile.mkdtemp(prefix='linebot-load-'))
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    sys.stdout = quiet
+    import app as bot
+    bot.startup.wait()
+    for g, group_id in enumerate(groups):
+        bot.admin_manager.initialize_group(group_id, admins[g])
+        bot.membership_index.add_members(group_id, members[g])
+    for blacklisted_user in blacklisted:
+        bot.blacklist_manager.add_to_blacklist(blacklisted_user, '壓力測試')
+    bot.scheduler.start()
+    sys.stdout = real_stdout
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, bot.app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, name='load-test-app', daemon=True).start()
+    target = f'http://127.0.0.1:{server.server_port}/callback'
+
+total = int(args.rate * args.duration) if args.duration and args.rate else args.requests
+payloads, kind_counts = build_payloads(total)
+url = urlsplit(target)
+
+latencies = []
+statuses = Counter()
+results_lock = threading.Lock()
+next_index = itertools.count()
+
+
+def worker(started: float) -> None:
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    local_latencies = []
+    local_statuses = Counter()
+    while True:
+        i = next(next_index)
+        if i >= len(payloads):
+            break
+        body, signature, _ = payloads[i]
+        # 固定速率時從預定送出時間開始計時，伺服器跟不上時排隊的時間也會算進延遲
+        scheduled = started + i / args.rate if args.rate else time.perf_counter()
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            connection.request('POST', url.path or '/callback', body.encode('utf-8'),
+                               {'Content-Type': 'application/json', 'X-Line-Signature': signature})
+            response = connection.getresponse()
+            response.read()
+            local_statuses[response.status] += 1
+        except (OSError, http.client.HTTPException) as e:
+            local_statuses[type(e).__name__] += 1
+            connection.close()
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        local_latencies.append(time.perf_counter() - scheduled)
+    connection.close()
+    with results_lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def wait_for_drain(timeout: float = 60) -> None:
+    """等待佇列中的事件處理完畢，且 LINE API 呼叫不再增加（非同步用戶端在背景送出）"""
+    deadline = time.monotonic() + timeout
+    dispatcher = bot.event_dispatcher if bot else None
+    while dispatcher and time.monotonic() < deadline:
+        stats = dispatcher.stats()
+        if stats['queue_depth'] == 0 and stats['processed'] + stats['failed'] >= stats['enqueued']:
+            break
+        time.sleep(0.05)
+    settle = max(0.2, 3 * (args.api_latency + args.api_jitter) / 1000 + args.retry_after)
+    last = stub.total_calls()
+    while time.monotonic() < deadline:
+        time.sleep(settle)
+        current = stub.total_calls()
+        if current == last:
+            break
+        last = current
+
+
+print(f"請求數: {len(payloads):,}，事件: {dict(kind_counts)}，連線數: {args.concurrency}，"
+      f"速率: {f'{args.rate:g}/秒' if args.rate else '不限'}")
+stub.reset()
+sys.stdout = quiet
+started = time.perf_counter()
+threads = [threading.Thread(target=worker, args=(started,)) for _ in range(args.concurrency)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+sent = time.perf_counter() - started
+wait_for_drain()
+elapsed = time.perf_counter() - started
+sys.stdout = real_stdout
+
+events = sum(count for _, _, count in payloads)
+latencies.sort()
+api_calls = stub.snapshot()
+api_total = sum(api_calls.values())
+print(f"送出耗時: {sent:.2f} 秒（{len(payloads) / sent:,.0f} 請求/秒），處理完畢: {elapsed:.2f} 秒")
+print(f"吞吐量: {events / elapsed:,.0f} 事件/秒")
+print(f"狀態碼: {dict(statuses)}")
+print(f"延遲: p50 {percentile(latencies, 0.5) * 1000:.1f} ms，p90 {percentile(latencies, 0.9) * 1000:.1f} ms，"
+      f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms，最大 {latencies[-1] * 1000 if latencies else 0:.1f} ms")
+print(f"LINE API 呼叫: {api_total:,}（每事件 {api_total / events:.3f} 次），"
+      f"429: {sum(stub.rate_limited.values()):,}，送出訊息: {stub.messages:,} 則")
+for endpoint, count in sorted(api_calls.items()):
+    print(f"  {endpoint:<12}{count:>8,}（每事件 {count / events:.3f} 次）")
+
+if server:
+    server.shutdown()
+stub.stop()
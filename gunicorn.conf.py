@@ -0,0 +1,39 @@
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+# 正式環境的 gunicorn 設定：gunicorn -c gunicorn.conf.py app:app
+# 設定檔在 master 行程中執行，先載入 .env 才能依 STORAGE_BACKEND 決定 worker 數量
+load_dotenv()
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+
+# 多個 worker 必須共用 SQLite：JSON 檔案每次寫入整份資料，各 worker 會以自己記憶體中的資料互相覆寫
+SHARED_STORAGE = os.getenv('STORAGE_BACKEND', 'json') == 'sqlite'
+workers = int(os.getenv('WEB_CONCURRENCY', '0')) or (multiprocessing.cpu_count() * 2 + 1 if SHARED_STORAGE else 1)
+if workers > 1 and not SHARED_STORAGE:
+    print("警告：多個 worker 需要 STORAGE_BACKEND=sqlite，已改為單一 worker")
+    workers = 1
+
+# Webhook 處理時大部分時間在等待 LINE API，每個 worker 以多個執行緒處理請求
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = 30
+# 關閉時保留時間讓事件佇列清空（見 WEBHOOK_DRAIN_TIMEOUT）
+graceful_timeout = float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', '10')) + 5
+
+# 應用程式在載入時就啟動背景執行緒（事件分派器、非同步 API 用戶端）並開啟 SQLite 連線，
+# 這些都不能跨 fork 使用，因此不預先載入，由每個 worker 各自載入
+preload_app = False
+
+if workers > 1:
+    # 各 worker 共用限流與事件去重的狀態，並定期載入其他 worker 寫入的異動
+    os.environ.setdefault('STATE_SYNC_INTERVAL', '2')
+    os.environ.setdefault('COMMAND_RATE_LIMIT_BACKEND', 'sqlite')
+    os.environ.setdefault('WEBHOOK_DEDUP_BACKEND', 'sqlite')
+
+
+def post_worker_init(worker):
+    """worker 載入應用程式後啟動自己的排程器（資料同步；警告與暫時封鎖到期、定期掃描只在持有排程租約的 worker 執行）"""
+    import app
+    app.start_monitoring()
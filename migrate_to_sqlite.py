@@ -0,0 +1,27 @@
+import argparse
+from utils.sqlite_store import SqliteRepository
+
+# 將 data/*.json 的資料轉移到 SQLite 資料庫
+parser = argparse.ArgumentParser(description='將 JSON 資料轉移到 SQLite')
+parser.add_argument('--db', default='data/bot.db', help='SQLite 資料庫路徑')
+parser.add_argument('--blacklist', default='data/blacklist.json', help='黑名單檔案')
+parser.add_argument('--warnings', default='data/warnings.json', help='警告檔案')
+parser.add_argument('--admins', default='data/admins.json', help='管理員檔案')
+parser.add_argument('--filters', default='data/filters.json', help='違禁詞檔案')
+parser.add_argument('--settings', default='data/settings.json', help='群組設定檔案')
+parser.add_argument('--history', default='data/history', help='操作歷史目錄')
+args = parser.parse_args()
+
+repository = SqliteRepository(args.db)
+counts = repository.migrate_from_json(args.blacklist, args.warnings, args.admins, args.filters,
+                                      args.settings, args.history)
+
+print('=== 資料轉移完成 ===')
+print(f"黑名單: {counts['blacklist']} 筆")
+if 'history' in counts:
+    print(f"操作歷史: {counts['history']} 筆")
+print(f"警告: {counts['warnings']} 筆")
+print(f"管理員: {counts['admins']} 筆")
+print(f"違禁詞: {counts['filters']} 筆")
+print(f"群組設定: {counts['settings']} 筆")
+print('請在 .env 檔案中設定 STORAGE_BACKEND=sqlite')
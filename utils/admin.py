@@ -1,62 +1,93 @@
-from typing import Dict, Set, Optional
-import json
-import os
+from typing import Dict, List, Set, Optional
+import threading
 from datetime import datetime
+from utils.storage import JsonFileStore
 
 class AdminManager:
-    def __init__(self):
+    def __init__(self, store=None, autoload: bool = True):
         self.admin_file = "data/admins.json"
+        self.store = store or JsonFileStore(self.admin_file)
         self.admins: Dict[str, Set[str]] = {}  # group_id -> set of admin user_ids
-        self._load_admins()
+        self._lock = threading.RLock()
+        if autoload:
+            self.load()
+
+    def load(self) -> None:
+        """載入管理員資料（未在建立時載入時呼叫）"""
+        with self._lock:
+            self._load_admins()
 
     def _load_admins(self) -> None:
-        """從檔案載入管理員資料"""
+        """從儲存後端載入管理員資料"""
         try:
-            if os.path.exists(self.admin_file):
-                with open(self.admin_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.admins = {group_id: set(admins) for group_id, admins in data.items()}
+            self._restore(*self.store.load())
         except Exception as e:
             print(f"載入管理員資料時發生錯誤: {e}")
             self.admins = {}
 
+    def reload(self) -> bool:
+        """重新載入其他 worker 寫入的異動；讀取失敗時保留目前的資料"""
+        try:
+            data, records = self.store.load()
+        except Exception as e:
+            print(f"重新載入管理員資料時發生錯誤: {e}")
+            return False
+        with self._lock:
+            self._restore(data, records)
+        return True
+
+    def _restore(self, data, records: List[Dict]) -> None:
+        """以儲存後端的資料取代記憶體中的管理員資料"""
+        self.admins = {group_id: set(admins) for group_id, admins in (data or {}).items()}
+        for record in records:
+            self._apply(record)
+
     def _save_admins(self) -> None:
-        """儲存管理員資料到檔案"""
+        """儲存完整管理員資料"""
         try:
-            # 確保目錄存在
-            os.makedirs(os.path.dirname(self.admin_file), exist_ok=True)
-            
             # 將 set 轉換為 list 以便 JSON 序列化
             data = {group_id: list(admins) for group_id, admins in self.admins.items()}
-            
-            with open(self.admin_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.store.compact(data)
         except Exception as e:
             print(f"儲存管理員資料時發生錯誤: {e}")
 
+    def _apply(self, record: Dict) -> None:
+        """將一筆異動套用到記憶體中的管理員資料"""
+        if record['action'] == 'add':
+            self.admins.setdefault(record['group_id'], set()).add(record['user_id'])
+        elif record['action'] == 'remove':
+            self.admins.get(record['group_id'], set()).discard(record['user_id'])
+
+    def _commit(self, record: Dict) -> None:
+        """套用並寫入一筆異動"""
+        with self._lock:
+            self._apply(record)
+            try:
+                if self.store.append(record):
+                    self._save_admins()
+            except Exception as e:
+                print(f"儲存管理員資料時發生錯誤: {e}")
+
     def is_admin(self, group_id: str, user_id: str) -> bool:
         """檢查用戶是否為群組管理員"""
         return user_id in self.admins.get(group_id, set())
 
     def add_admin(self, group_id: str, user_id: str) -> bool:
         """新增群組管理員"""
-        if group_id not in self.admins:
-            self.admins[group_id] = set()
-        
-        if user_id in self.admins[group_id]:
-            return False
-        
-        self.admins[group_id].add(user_id)
-        self._save_admins()
+        with self._lock:
+            if user_id in self.admins.get(group_id, set()):
+                return False
+            
+            self._commit({'action': 'add', 'group_id': group_id, 'user_id': user_id})
         return True
 
     def remove_admin(self, group_id: str, user_id: str) -> bool:
         """移除群組管理員"""
-        if group_id not in self.admins or user_id not in self.admins[group_id]:
-            return False
-        
-        self.admins[group_id].remove(user_id)
-        self._save_admins()
+        with self._lock:
+            if group_id not in self.admins or user_id not in self.admins[group_id]:
+                return False
+            
+            self._commit({'action': 'remove', 'group_id': group_id, 'user_id': user_id})
         return True
 
     def get_admins(self, group_id: str) -> Set[str]:
@@ -65,6 +96,6 @@ class AdminManager:
 
     def initialize_group(self, group_id: str, creator_id: str) -> None:
         """初始化群組，將建立者設為管理員"""
-        if group_id not in self.admins:
-            self.admins[group_id] = {creator_id}
-            self._save_admins() 
\ No newline at end of file
+        with self._lock:
+            if group_id not in self.admins:
+                self._commit({'action': 'add', 'group_id': group_id, 'user_id': creator_id}) 
\ No newline at end of file
@@ -2,140 +2,555 @@ import json
 import os
 from datetime import datetime
 import logging
-from typing import List, Dict, Optional
+import sys
+import threading
+import time
+from itertools import chain, islice
+from typing import Iterable, List, Dict, Optional, Set, Tuple
+from utils.storage import JsonFileStore
+from utils.blacklist_index import BlacklistIndex
 
 logger = logging.getLogger('blacklist')
 
+# 暫時封鎖到期時寫入操作歷史的原因
+EXPIRED_REASON = '暫時封鎖到期'
+
+# 群組設定中黑名單聯盟的名稱
+FEDERATION_SETTING = 'blacklist_federation'
+
 class BlacklistManager:
-    def __init__(self, blacklist_file: str = 'data/blacklist.json'):
-        """初始化黑名單管理器"""
+    def __init__(self, blacklist_file: str = 'data/blacklist.json', store=None, use_bloom: bool = False,
+                 history_store=None, scheduler=None, settings=None, group_scoped: bool = False,
+                 autoload: bool = True):
+        """
+        初始化黑名單管理器
+        黑名單分為三層：群組黑名單、同一聯盟內各群組共享的黑名單、全域黑名單
+        :param blacklist_file: 黑名單檔案路徑
+        :param store: 儲存後端（可選），預設為整份 JSON 檔案
+        :param use_bloom: 黑名單查詢是否先經過 Bloom filter
+        :param history_store: 操作歷史的儲存（可選，例如 HistoryStore），未設定時歷史存於快照中
+        :param scheduler: 排程器（可選），設定後暫時封鎖會在到期時自動解除
+        :param settings: 群組設定（可選），用於各群組加入的黑名單聯盟
+        :param group_scoped: 群組中的封鎖是否只寫入該群組的黑名單（否則寫入全域黑名單）
+        :param autoload: 是否在建立時載入黑名單（否則需另外呼叫 load，例如在背景載入）
+        """
         self.blacklist_file = blacklist_file
-        self.blacklist: Dict[str, dict] = {}
-        self.history: List[dict] = []
-        
+        self.store = store or JsonFileStore(blacklist_file)
+        self.history_store = history_store
+        self.scheduler = scheduler
+        self.settings = settings
+        self.group_scoped = group_scoped
+        self.blacklist: Dict[str, dict] = {}  # 全域黑名單
+        self.group_blacklists: Dict[str, Dict[str, dict]] = {}  # group_id -> 群組黑名單
+        self.history: List[dict] = []  # 未設定 history_store 時使用
+        self.index = BlacklistIndex(self.blacklist, use_bloom=use_bloom)
+        # 各層依加入順序排列的用戶 ID（全域為 None），分頁時直接切片；解除時整層作廢，下次取頁時才重建
+        self.order: Dict[Optional[str], List[str]] = {}
+        # 群組 -> 聯盟名稱，與聯盟 -> 用戶 ID -> 封鎖此用戶的成員群組
+        self.federations: Dict[str, str] = {}
+        self.federation_index: Dict[str, Dict[str, Set[str]]] = {}
+        # (group_id，全域為 None, 用戶 ID) -> 暫時封鎖的到期時間（epoch 秒）
+        self.expires: Dict[Tuple[Optional[str], str], float] = {}
+        self._lock = threading.RLock()
+
         # 確保資料目錄存在
         os.makedirs(os.path.dirname(blacklist_file), exist_ok=True)
-        
-        # 載入黑名單
-        self.load_blacklist()
+
+        if autoload:
+            self.load()
+
+    def load(self) -> None:
+        """載入黑名單，並依群組設定建立聯盟索引、排定暫時封鎖的到期"""
+        with self._lock:
+            if self.settings is not None:
+                self.federations = dict(self.settings.groups_with(FEDERATION_SETTING))
+            self.load_blacklist()
+            self._schedule_all()
 
     def load_blacklist(self):
-        """從檔案載入黑名單"""
+        """從儲存後端載入黑名單，並重播尚未寫入快照的異動"""
+        with self._lock:
+            try:
+                self._restore(*self.store.load())
+            except Exception as e:
+                logger.error(f"載入黑名單失敗: {e}")
+                self.blacklist = {}
+                self.group_blacklists = {}
+                self.history = []
+                self._reorder()
+            self._rebuild_indexes()
+
+    def reload(self) -> bool:
+        """
+        重新載入其他 worker 寫入的異動（由 StateSync 在資料版本改變時呼叫）
+        讀取失敗時保留目前的黑名單
+        """
         try:
-            if os.path.exists(self.blacklist_file):
-                with open(self.blacklist_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.blacklist = data.get('blacklist', {})
-                    self.history = data.get('history', [])
+            data, records = self.store.load()
         except Exception as e:
-            logger.error(f"載入黑名單失敗: {e}")
-            self.blacklist = {}
-            self.history = []
+            logger.error(f"重新載入黑名單失敗: {e}")
+            return False
+        with self._lock:
+            if self.settings is not None:
+                self.federations = dict(self.settings.groups_with(FEDERATION_SETTING))
+            self._restore(data, records)
+            self._rebuild_indexes()
+            self._schedule_all()
+        return True
+
+    def _restore(self, data, records: List[dict]) -> None:
+        """以儲存後端的快照與異動取代記憶體中的黑名單"""
+        data = data or {}
+        # 用戶 ID 經過 intern，黑名單與歷史共用同一個字串物件
+        self.blacklist = {sys.intern(user_id): info for user_id, info in data.get('blacklist', {}).items()}
+        self.group_blacklists = {
+            group_id: {sys.intern(user_id): info for user_id, info in entries.items()}
+            for group_id, entries in data.get('groups', {}).items() if entries
+        }
+        self._reorder()
+        self.history = data.get('history', [])
+        for record in self.history:
+            record['user_id'] = sys.intern(record['user_id'])
+        for record in records:
+            self._apply(record)
+        if self.history_store is not None and 'history' in data:
+            self._migrate_history(records)
+
+    def _reorder(self) -> None:
+        """作廢各層的用戶 ID 列表（黑名單字典被取代時呼叫），取頁時再重建"""
+        self.order = {}
+
+    def _keys(self, group_id: Optional[str]) -> List[str]:
+        """取得單一層級依加入順序的用戶 ID 列表（需持有鎖）；已作廢時依黑名單字典的順序重建"""
+        keys = self.order.get(group_id)
+        if keys is None:
+            keys = self.order[group_id] = list(self._entries(group_id))
+        return keys
+
+    def _rebuild_indexes(self) -> None:
+        """重建全域索引（直接查詢全域黑名單字典）、聯盟索引與到期索引"""
+        self.index.rebuild(self.blacklist)
+        self.federation_index = {}
+        for group_id, entries in self.group_blacklists.items():
+            for user_id in entries:
+                self._federate(group_id, user_id, True)
+        self.expires = {
+            (info.get('group_id'), user_id): _deadline(info['expires_at'])
+            for entries in chain((self.blacklist,), self.group_blacklists.values())
+            for user_id, info in entries.items() if info.get('expires_at')
+        }
+
+    def _federate(self, group_id: str, user_id: str, banned: bool) -> None:
+        """更新群組所屬聯盟的共享索引"""
+        name = self.federations.get(group_id)
+        if name is None:
+            return
+        users = self.federation_index.setdefault(name, {})
+        if banned:
+            users.setdefault(user_id, set()).add(group_id)
+            return
+        groups = users.get(user_id)
+        if groups is not None:
+            groups.discard(group_id)
+            if not groups:
+                del users[user_id]
+        if not users:
+            del self.federation_index[name]
+
+    def _migrate_history(self, records: List[dict]) -> None:
+        """將快照中的舊歷史（及尚未寫入快照的異動）移到 history_store，之後的快照不再包含歷史"""
+        if not len(self.history_store):
+            self.history_store.extend(self.history + list(records))
+            logger.info(f"已將 {len(self.history) + len(records)} 筆操作歷史移到分段儲存")
+        self.history = []
+        self.save_blacklist()
 
     def save_blacklist(self):
-        """儲存黑名單到檔案"""
-        try:
-            data = {
-                'blacklist': self.blacklist,
-                'history': self.history
+        """儲存完整黑名單快照"""
+        with self._lock:
+            try:
+                data = {'blacklist': self.blacklist, 'groups': self.group_blacklists}
+                if self.history_store is None:
+                    data['history'] = self.history
+                self.store.compact(data)
+            except Exception as e:
+                logger.error(f"儲存黑名單失敗: {e}")
+
+    def _apply(self, record: dict) -> bool:
+        """
+        將一筆異動套用到記憶體中的黑名單
+        :return: 是否有異動（解除不在黑名單中的用戶時為 False）
+        """
+        user_id = record['user_id'] = sys.intern(record['user_id'])
+        group_id = record.get('group_id')  # 未指定時為全域黑名單
+        if group_id is None:
+            entries = self.blacklist
+        else:
+            entries = self.group_blacklists.setdefault(group_id, {})
+        if record['action'] == 'add':
+            info = {
+                'reason': record['reason'],
+                'timestamp': record['timestamp'],
+                'reporter_id': record.get('reporter_id')
             }
-            with open(self.blacklist_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"儲存黑名單失敗: {e}")
+            if group_id is not None:
+                info['group_id'] = group_id
+            expires_at = record.get('expires_at')
+            if expires_at:
+                info['expires_at'] = expires_at
+                self.expires[(group_id, user_id)] = _deadline(expires_at)
+            else:
+                self.expires.pop((group_id, user_id), None)
+            added = user_id not in entries
+            entries[user_id] = info
+            keys = self.order.get(group_id)
+            if added and keys is not None:
+                keys.append(user_id)
+            if group_id is None:
+                self.index.add(user_id)
+            elif added:
+                self._federate(group_id, user_id, True)
+        elif record['action'] == 'remove':
+            info = entries.get(user_id)
+            # 到期解除帶有當時的 expires_at，期間被重新封鎖（期限不同）時不解除
+            if info is None or ('expires_at' in record and info.get('expires_at') != record['expires_at']):
+                if group_id is not None and not entries:
+                    del self.group_blacklists[group_id]
+                return False
+            del entries[user_id]
+            self.expires.pop((group_id, user_id), None)
+            # 從列表中刪除需要線性搜尋，改為作廢整層（字典仍保有加入順序）
+            self.order.pop(group_id, None)
+            if group_id is None:
+                self.index.discard(user_id)
+            else:
+                self._federate(group_id, user_id, False)
+        if group_id is not None and not entries:
+            del self.group_blacklists[group_id]
+            self.order.pop(group_id, None)
+        # 使用 history_store 時歷史在 _commit 寫入，重播日誌時不會重複寫入
+        if self.history_store is None:
+            self.history.append(record)
+        return True
+
+    def _commit(self, record: dict) -> None:
+        """套用並寫入一筆異動，必要時寫入快照；沒有異動時（例如重複的解除）不寫入也不記錄歷史"""
+        with self._lock:
+            if not self._apply(record):
+                return
+            if self.store.append(record):
+                self.save_blacklist()
+            if self.history_store is not None:
+                try:
+                    self.history_store.append(record)
+                except Exception as e:
+                    logger.error(f"寫入操作歷史失敗: {e}")
+            self._schedule(record.get('group_id'), record['user_id'])
+
+    def _schedule(self, group_id: Optional[str], user_id: str) -> None:
+        """排定暫時封鎖的自動解除；永久封鎖或已解除時取消排程"""
+        if self.scheduler is None:
+            return
+        key = ('blacklist', group_id, user_id)
+        deadline = self.expires.get((group_id, user_id))
+        if deadline is None:
+            self.scheduler.cancel(key)
+        else:
+            self.scheduler.schedule(key, deadline, lambda: self.expire_entry(user_id, group_id))
+
+    def reschedule(self) -> None:
+        """重新排定所有暫時封鎖（例如多個 worker 時改由這個 worker 執行到期解除）"""
+        self._schedule_all()
+
+    def _schedule_all(self) -> None:
+        """啟動時依持久化的 expires_at 排定所有暫時封鎖（已到期的會立即解除）"""
+        with self._lock:
+            for group_id, user_id in list(self.expires):
+                self._schedule(group_id, user_id)
+
+    def expire_entry(self, user_id: str, group_id: Optional[str] = None) -> bool:
+        """解除已到期的暫時封鎖，並記錄操作歷史"""
+        with self._lock:
+            deadline = self.expires.get((group_id, user_id))
+            if deadline is None or deadline > time.time():
+                return False
+            record = {
+                'action': 'remove',
+                'user_id': user_id,
+                'reason': EXPIRED_REASON,
+                'remover_id': None,
+                'timestamp': datetime.now().isoformat()
+            }
+            if group_id is not None:
+                record['group_id'] = group_id
+                entries = self.group_blacklists.get(group_id, {})
+            else:
+                entries = self.blacklist
+            # 只解除這一次的暫時封鎖：其他 worker 已重新封鎖時，資料庫中的期限不同而不會刪除
+            record['expires_at'] = entries[user_id]['expires_at']
+            try:
+                self._commit(record)
+            except Exception as e:
+                logger.error(f"解除暫時封鎖失敗: {e}")
+                return False
+        logger.info(f"用戶 {user_id} 的暫時封鎖已到期")
+        return True
+
+    def _expired(self, group_id: Optional[str], user_id: str) -> bool:
+        """命中黑名單時檢查是否已到期，已到期則直接解除"""
+        deadline = self.expires.get((group_id, user_id))
+        if deadline is not None and deadline <= time.time():
+            self.expire_entry(user_id, group_id)
+            return True
+        return False
+
+    def close(self) -> None:
+        """關閉儲存後端"""
+        with self._lock:
+            self.store.close()
+            if self.history_store is not None:
+                self.history_store.close()
+
+    def _scope(self, group_id: Optional[str]) -> Optional[str]:
+        """群組中的封鎖寫入的層級：啟用群組黑名單時為該群組，否則為全域（None）"""
+        return group_id if self.group_scoped else None
 
-    def add_to_blacklist(self, user_id: str, reason: str, reporter_id: Optional[str] = None) -> bool:
+    def add_to_blacklist(self, user_id: str, reason: str, reporter_id: Optional[str] = None,
+                         duration: Optional[float] = None, group_id: Optional[str] = None) -> bool:
         """
         新增用戶到黑名單
         :param user_id: 用戶 ID
         :param reason: 封鎖原因
         :param reporter_id: 回報者 ID（可選）
+        :param duration: 封鎖秒數（可選），未設定時為永久封鎖
+        :param group_id: 發生的群組（可選），啟用群組黑名單時只封鎖於此群組
         :return: 是否成功
         """
         try:
-            timestamp = datetime.now().isoformat()
-            
-            # 新增到黑名單
-            self.blacklist[user_id] = {
-                'reason': reason,
-                'timestamp': timestamp,
-                'reporter_id': reporter_id
-            }
-            
-            # 記錄操作歷史
-            self.history.append({
+            now = datetime.now()
+            record = {
                 'action': 'add',
                 'user_id': user_id,
                 'reason': reason,
                 'reporter_id': reporter_id,
-                'timestamp': timestamp
-            })
-            
-            # 儲存變更
-            self.save_blacklist()
+                'timestamp': now.isoformat()
+            }
+            scope = self._scope(group_id)
+            if scope is not None:
+                record['group_id'] = scope
+            if duration:
+                record['expires_at'] = datetime.fromtimestamp(now.timestamp() + duration).isoformat()
+            # 新增到黑名單並記錄操作歷史
+            self._commit(record)
             logger.info(f"已將用戶 {user_id} 加入黑名單")
             return True
-            
+
         except Exception as e:
             logger.error(f"新增黑名單失敗: {e}")
             return False
 
-    def remove_from_blacklist(self, user_id: str, reason: str, remover_id: Optional[str] = None) -> bool:
+    def remove_from_blacklist(self, user_id: str, reason: str, remover_id: Optional[str] = None,
+                              group_id: Optional[str] = None) -> bool:
         """
         從黑名單移除用戶
         :param user_id: 用戶 ID
         :param reason: 解除原因
         :param remover_id: 解除者 ID（可選）
+        :param group_id: 發生的群組（可選），啟用群組黑名單時只從此群組的黑名單移除
         :return: 是否成功
         """
         try:
-            if user_id in self.blacklist:
-                # 從黑名單移除
-                del self.blacklist[user_id]
-                
-                # 記錄操作歷史
-                self.history.append({
+            scope = self._scope(group_id)
+            if user_id in self._entries(scope):
+                record = {
                     'action': 'remove',
                     'user_id': user_id,
                     'reason': reason,
                     'remover_id': remover_id,
                     'timestamp': datetime.now().isoformat()
-                })
-                
-                # 儲存變更
-                self.save_blacklist()
+                }
+                if scope is not None:
+                    record['group_id'] = scope
+                # 從黑名單移除並記錄操作歷史
+                self._commit(record)
                 logger.info(f"已將用戶 {user_id} 從黑名單移除")
                 return True
-            
+
             return False
-            
+
         except Exception as e:
             logger.error(f"移除黑名單失敗: {e}")
             return False
 
-    def is_blacklisted(self, user_id: str) -> bool:
-        """檢查用戶是否在黑名單中"""
-        return user_id in self.blacklist
+    def _entries(self, group_id: Optional[str]) -> Dict[str, dict]:
+        """取得單一層級的黑名單（None 為全域）"""
+        if group_id is None:
+            return self.blacklist
+        return self.group_blacklists.get(group_id, {})
+
+    def is_blacklisted(self, user_id: str, group_id: Optional[str] = None) -> bool:
+        """
+        檢查用戶是否在黑名單中（每則訊息都會呼叫）
+        依序查詢全域、群組、聯盟，每一層都是一次雜湊查詢；命中時才檢查到期時間，
+        排程尚未處理的已到期封鎖在此直接解除
+        :param group_id: 所在群組（可選），未指定時只查詢全域黑名單
+        """
+        if self.index.contains(user_id) and not self._expired(None, user_id):
+            return True
+        if group_id is None:
+            return False
+        entries = self.group_blacklists.get(group_id)
+        if entries is not None and user_id in entries and not self._expired(group_id, user_id):
+            return True
+        name = self.federations.get(group_id)
+        if name is not None:
+            groups = self.federation_index.get(name, {}).get(user_id)
+            if groups:
+                return any(not self._expired(banned_in, user_id) for banned_in in list(groups))
+        return False
+
+    def blacklisted_members(self, group_id: str, user_ids: Iterable[str]) -> Set[str]:
+        """找出指定成員中在此群組被封鎖的用戶（例如掃描群組時）"""
+        return {user_id for user_id in user_ids if self.is_blacklisted(user_id, group_id)}
+
+    def get_federation(self, group_id: str) -> Optional[str]:
+        """取得群組加入的黑名單聯盟"""
+        return self.federations.get(group_id)
+
+    def set_federation(self, group_id: str, name: Optional[str]) -> None:
+        """
+        加入或退出黑名單聯盟；同一聯盟的群組共享彼此的群組黑名單
+        :param name: 聯盟名稱，None 表示退出
+        """
+        if self.settings is not None:
+            if name is None:
+                self.settings.unset(group_id, FEDERATION_SETTING)
+            else:
+                self.settings.set(group_id, FEDERATION_SETTING, name)
+        with self._lock:
+            entries = self.group_blacklists.get(group_id, {})
+            for user_id in entries:
+                self._federate(group_id, user_id, False)
+            if name is None:
+                self.federations.pop(group_id, None)
+            else:
+                self.federations[group_id] = name
+            for user_id in entries:
+                self._federate(group_id, user_id, True)
+
+    def refresh_federations(self) -> None:
+        """依群組設定重新整理各群組所屬的聯盟（其他 worker 變更聯盟後由 StateSync 呼叫）"""
+        if self.settings is None:
+            return
+        with self._lock:
+            federations = dict(self.settings.groups_with(FEDERATION_SETTING))
+            if federations == self.federations:
+                return
+            self.federations = federations
+            self.federation_index = {}
+            for group_id, entries in self.group_blacklists.items():
+                for user_id in entries:
+                    self._federate(group_id, user_id, True)
+
+    def counts(self, group_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        各層黑名單的筆數（只讀取索引大小，不複製黑名單）
+        :param group_id: 群組（可選），指定時包含該群組與其聯盟的筆數
+        """
+        result = {'global': len(self.blacklist)}
+        if group_id is None:
+            result['groups'] = len(self.group_blacklists)
+            result['group_entries'] = sum(len(entries) for entries in self.group_blacklists.values())
+            result['federations'] = len(self.federation_index)
+        else:
+            result['group'] = len(self.group_blacklists.get(group_id, {}))
+            name = self.federations.get(group_id)
+            result['federation'] = len(self.federation_index.get(name, {})) if name else 0
+        return result
 
     def get_blacklist(self) -> Dict[str, dict]:
-        """取得完整黑名單"""
+        """取得完整的全域黑名單"""
         return self.blacklist
 
-    def get_blacklist_reason(self, user_id: str) -> Optional[str]:
+    def get_page(self, offset: int, limit: int, group_id: Optional[str] = None) -> Tuple[int, List[Tuple[str, dict]]]:
+        """
+        取得一頁黑名單（群組黑名單在前，接著是全域黑名單，各自依加入順序），
+        以各層的用戶 ID 列表切片，不必從頭略過前面的頁數（解除後第一次取頁時重建該層的列表）
+        :param group_id: 群組（可選），未指定時只列出全域黑名單
+        :return: (總筆數, 此頁的 (user_id, 資料) 列表)
+        """
+        with self._lock:
+            group_keys = self._keys(group_id) if group_id is not None else []
+            global_keys = self._keys(None)
+            page = [(user_id, self.group_blacklists[group_id][user_id])
+                    for user_id in group_keys[offset:offset + limit]]
+            if len(page) < limit:
+                start = max(0, offset - len(group_keys))
+                page.extend((user_id, self.blacklist[user_id])
+                            for user_id in global_keys[start:start + limit - len(page)])
+            return len(group_keys) + len(global_keys), page
+
+    def search(self, query: str, limit: int, group_id: Optional[str] = None) -> Tuple[List[Tuple[str, dict]], bool]:
+        """
+        以用戶 ID 片段搜尋黑名單
+        :param group_id: 群組（可選），指定時一併搜尋該群組的黑名單
+        :return: (最多 limit 筆結果, 是否還有更多結果)
+        """
+        with self._lock:
+            layers = [self.blacklist]
+            if group_id is not None and group_id in self.group_blacklists:
+                layers.insert(0, self.group_blacklists[group_id])
+            exact = [(query, entries[query]) for entries in layers if query in entries]
+            if exact:
+                return exact, False
+            matches = list(islice(
+                ((user_id, info) for entries in layers for user_id, info in entries.items() if query in user_id),
+                limit + 1
+            ))
+        return matches[:limit], len(matches) > limit
+
+    def get_entry(self, user_id: str, group_id: Optional[str] = None) -> Optional[dict]:
+        """取得用戶在群組（或全域）黑名單中的資料"""
+        scope = self._scope(group_id)
+        info = self._entries(scope).get(user_id)
+        if info is None and scope is not None:
+            info = self.blacklist.get(user_id)
+        return info
+
+    def get_expires_at(self, user_id: str, group_id: Optional[str] = None) -> Optional[str]:
+        """取得用戶暫時封鎖的到期時間，永久封鎖時回傳 None"""
+        info = self.get_entry(user_id, group_id)
+        return info.get('expires_at') if info else None
+
+    def get_blacklist_reason(self, user_id: str, group_id: Optional[str] = None) -> Optional[str]:
         """取得用戶被加入黑名單的原因"""
-        if user_id in self.blacklist:
-            return self.blacklist[user_id]['reason']
-        return None
+        info = self.get_entry(user_id, group_id)
+        return info['reason'] if info else None
 
-    def get_history(self, limit: int = None) -> List[dict]:
+    def get_history(self, limit: int = None, since=None, until=None, user_id: Optional[str] = None) -> List[dict]:
         """
         取得操作歷史
-        :param limit: 限制回傳數量（可選）
-        :return: 操作歷史列表
+        :param limit: 限制回傳數量（可選），只回傳最新的幾筆
+        :param since: 起始時間（可選，含）
+        :param until: 結束時間（可選，不含）
+        :param user_id: 只查詢此用戶（可選）
+        :return: 依時間排序的操作歷史列表
         """
+        if self.history_store is not None:
+            return self.history_store.query(since, until, user_id, limit)
+        history = self.history
+        if since is not None or until is not None or user_id is not None:
+            since = since.isoformat() if isinstance(since, datetime) else since
+            until = until.isoformat() if isinstance(until, datetime) else until
+            history = [
+                record for record in history
+                if (since is None or record['timestamp'] >= since)
+                and (until is None or record['timestamp'] < until)
+                and (user_id is None or record['user_id'] == user_id)
+            ]
         if limit:
-            return self.history[-limit:]
-        return self.history
+            return history[-limit:]
+        return history
 
     def export_blacklist(self, output_file: str) -> bool:
         """匯出黑名單到指定檔案"""
@@ -143,7 +558,8 @@ class BlacklistManager:
             with open(output_file, 'w', encoding='utf-8') as f:
                 json.dump({
                     'blacklist': self.blacklist,
-                    'history': self.history
+                    'groups': self.group_blacklists,
+                    'history': self.get_history()
                 }, f, ensure_ascii=False, indent=2)
             return True
         except Exception as e:
@@ -155,10 +571,28 @@ class BlacklistManager:
         try:
             with open(input_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                self.blacklist.update(data.get('blacklist', {}))
-                self.history.extend(data.get('history', []))
-            self.save_blacklist()
+            with self._lock:
+                self.blacklist.update(
+                    (sys.intern(user_id), info) for user_id, info in data.get('blacklist', {}).items()
+                )
+                for group_id, entries in data.get('groups', {}).items():
+                    self.group_blacklists.setdefault(group_id, {}).update(
+                        (sys.intern(user_id), dict(info, group_id=group_id)) for user_id, info in entries.items()
+                    )
+                if self.history_store is not None:
+                    self.history_store.extend(data.get('history', []))
+                else:
+                    self.history.extend(data.get('history', []))
+                self._reorder()
+                self._rebuild_indexes()
+                self.save_blacklist()
+            self._schedule_all()
             return True
         except Exception as e:
             logger.error(f"匯入黑名單失敗: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+
+def _deadline(expires_at: str) -> float:
+    """將 ISO 格式的到期時間轉為 epoch 秒"""
+    return datetime.fromisoformat(expires_at).timestamp()
@@ -0,0 +1,115 @@
+import math
+import sys
+import threading
+from typing import Dict, Optional
+
+_HASH_MASK = (1 << 64) - 1
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        初始化 Bloom filter
+        :param capacity: 預計存放的項目數
+        :param error_rate: 可接受的誤判率
+        """
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, item: str) -> None:
+        h = hash(item) & _HASH_MASK
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        # 以 double hashing 由一次 hash() 推導出所有位置，不建立額外物件
+        h = hash(item) & _HASH_MASK
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self.bits)
+
+
+class BlacklistIndex:
+    def __init__(self, entries: Optional[Dict[str, dict]] = None, use_bloom: bool = False, error_rate: float = 0.01):
+        """
+        初始化黑名單查詢：直接查詢黑名單字典本身（唯一的資料來源），可選擇先經過 Bloom filter
+        不另外保存精簡的 ID 集合：原因等資料仍在同一個字典中（JSON 儲存以它寫入快照，get_blacklist 也回傳它），
+        因此不會減少黑名單本身的記憶體
+        :param entries: 黑名單字典（用戶 ID -> 資料），由呼叫端維護內容
+        :param use_bloom: 是否在查詢字典前先經過 Bloom filter
+        :param error_rate: Bloom filter 誤判率
+        """
+        self.use_bloom = use_bloom
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        self._bloom = None
+        self._removed = 0
+        self.contains = self._entries.__contains__
+        self.rebuild(entries if entries is not None else {})
+
+    def rebuild(self, entries: Dict[str, dict]) -> None:
+        """改為查詢新的黑名單字典，並重建 Bloom filter"""
+        with self._lock:
+            self._rebuild(entries)
+
+    def _rebuild(self, entries: Dict[str, dict]) -> None:
+        """重建索引（需持有鎖）；先複製 ID 再建立 Bloom filter，避免迭代時字典被修改"""
+        bloom = None
+        if self.use_bloom:
+            user_ids = list(entries)
+            bloom = BloomFilter(max(1024, len(user_ids) * 2), self.error_rate)
+            for user_id in user_ids:
+                bloom.add(user_id)
+        self._entries = entries
+        self._bloom = bloom
+        self._removed = 0
+        # 熱路徑：未啟用 Bloom 時直接綁定字典的 C 實作，不經過 Python 函式呼叫
+        self.contains = entries.__contains__ if bloom is None else self.__contains__
+
+    def add(self, user_id: str) -> None:
+        """用戶已加入黑名單字典後呼叫，更新 Bloom filter"""
+        if self._bloom is None:
+            return
+        with self._lock:
+            self._bloom.add(user_id)
+            if self._bloom.count > self._bloom.capacity:
+                self._rebuild(self._entries)
+
+    def discard(self, user_id: str) -> None:
+        """用戶已從黑名單字典移除後呼叫"""
+        # Bloom filter 無法刪除，已刪除的 ID 會通過 Bloom 再由字典排除；累積過多時重建
+        if self._bloom is None:
+            return
+        with self._lock:
+            self._removed += 1
+            if self._removed > self._bloom.capacity // 2:
+                self._rebuild(self._entries)
+
+    def __contains__(self, user_id: str) -> bool:
+        bloom = self._bloom
+        if bloom is not None and user_id not in bloom:
+            return False
+        return user_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def memory_bytes(self) -> int:
+        """索引本身佔用的記憶體（黑名單字典與 ID 字串不計入）"""
+        return self._bloom.memory_bytes() if self._bloom is not None else 0
@@ -0,0 +1,127 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 記憶體後端最多保留的鍵數，超過時清除已回滿的權杖桶
+MAX_IDLE_KEYS = 10000
+
+
+def parse_limit(spec: str) -> Tuple[float, float]:
+    """
+    解析限制設定
+    :param spec: 「次數/秒數」，例如 1/30 表示 30 秒內最多 1 次
+    :return: (每秒補充的權杖數, 桶容量)
+    """
+    count, seconds = spec.split('/')
+    count, seconds = float(count), float(seconds)
+    return count / seconds, count
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """解析以逗號分隔的「指令=次數/秒數」設定，例如 !blacklist=1/30,!warnings=2/30"""
+    limits = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if item:
+            command, limit = item.split('=')
+            limits[command.strip().lower()] = parse_limit(limit)
+    return limits
+
+
+class MemoryRateLimitBackend:
+    def __init__(self):
+        """單一行程內的權杖桶狀態"""
+        self._buckets: Dict[str, list] = {}  # 鍵 -> [權杖數, 更新時間, 是否已通知]
+        self._lock = threading.Lock()
+
+    def hit_all(self, limits: List[Tuple[str, float, float]]) -> Tuple[bool, bool]:
+        """
+        同時向多個權杖桶各取用一個權杖；任一桶不足時都不取用
+        :param limits: (鍵, 每秒補充的權杖數, 桶容量) 列表
+        :return: (是否允許, 是否為這次超過限制後的第一次拒絕)
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = []
+            for key, rate, capacity in limits:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    if len(self._buckets) >= MAX_IDLE_KEYS:
+                        self._prune(now)
+                    bucket = self._buckets[key] = [capacity, now, False]
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                buckets.append(bucket)
+            for bucket in buckets:
+                if bucket[0] < 1:
+                    first = not bucket[2]
+                    bucket[2] = True
+                    return False, first
+            for bucket in buckets:
+                bucket[0] -= 1
+                bucket[2] = False
+            return True, False
+
+    def _prune(self, now: float) -> None:
+        """清除閒置已久的鍵（需持有鎖）；閒置一小時內必定已回滿"""
+        for key in [key for key, bucket in self._buckets.items() if now - bucket[1] > 3600]:
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class CommandRateLimiter:
+    def __init__(self, backend, user_limit: Optional[Tuple[float, float]] = None,
+                 group_limit: Optional[Tuple[float, float]] = None,
+                 command_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 notice: bool = True):
+        """
+        初始化指令限流器
+        :param backend: 權杖桶狀態的存放位置（MemoryRateLimitBackend 或 SqliteRateLimitBackend）
+        :param user_limit: 每位用戶在每個群組的指令總量限制 (每秒權杖數, 容量)
+        :param group_limit: 每個群組的指令總量限制
+        :param command_limits: 個別指令對每位用戶的冷卻限制，鍵為指令名稱
+        :param notice: 超過限制時是否回覆一次提示（之後直到恢復前都不再回覆）
+        """
+        self.backend = backend
+        self.user_limit = user_limit
+        self.group_limit = group_limit
+        self.command_limits = command_limits or {}
+        self.notice = notice
+
+        # 統計資料
+        self.allowed = 0
+        self.dropped = 0
+        self.notices = 0
+
+    def check(self, group_id: Optional[str], user_id: Optional[str], command: Optional[str]) -> Tuple[bool, bool]:
+        """
+        檢查指令是否可執行
+        :param command: 指令名稱（未知指令為 None，只套用總量限制）
+        :return: (是否允許, 是否需要回覆超過限制的提示)
+        """
+        scope = group_id or user_id or ''
+        checks = []
+        limit = self.command_limits.get(command) if command else None
+        if limit:
+            checks.append((f"c:{scope}:{user_id}:{command}", limit))
+        if self.user_limit:
+            checks.append((f"u:{scope}:{user_id}", self.user_limit))
+        if self.group_limit and group_id:
+            checks.append((f"g:{group_id}", self.group_limit))
+
+        # 先檢查所有限制再取用，被後面的限制拒絕時不會消耗前面的額度
+        allowed, first = self.backend.hit_all([(key, rate, capacity) for key, (rate, capacity) in checks])
+        if not allowed:
+            self.dropped += 1
+            notify = self.notice and first
+            if notify:
+                self.notices += 1
+            return False, notify
+        self.allowed += 1
+        return True, False
+
+    def stats(self) -> Dict[str, int]:
+        """取得限流統計資料"""
+        return {'allowed': self.allowed, 'dropped': self.dropped, 'notices': self.notices}
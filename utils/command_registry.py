@@ -0,0 +1,190 @@
+import itertools
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 依宣告順序排列指令（用於產生說明文字）
+_declaration_order = itertools.count()
+
+# 期限參數的單位（秒）與上限（一年）
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+MAX_DURATION = 365 * 86400
+_DURATION_PATTERN = re.compile(r'(\d+)([smhdw])')
+
+
+class UsageError(Exception):
+    """指令參數不符合格式"""
+
+
+def parse_duration(text: str) -> Optional[int]:
+    """
+    解析期限，例如 30m、12h、1d、1d12h
+    :return: 秒數，格式不符時回傳 None
+    :raises UsageError: 超過期限上限（MAX_DURATION）
+    """
+    text = text.lower()
+    parts = _DURATION_PATTERN.findall(text)
+    if not parts or ''.join(number + unit for number, unit in parts) != text:
+        return None
+    seconds = sum(int(number) * DURATION_UNITS[unit] for number, unit in parts)
+    if seconds > MAX_DURATION:
+        raise UsageError('期限')
+    return seconds or None
+
+
+class Arg:
+    __slots__ = ('name', 'label', 'kind', 'required')
+
+    def __init__(self, name: str, label: str, kind: str = 'word', required: bool = True):
+        """
+        指令參數
+        :param name: 參數名稱（傳給處理函式的鍵）
+        :param label: 說明文字中顯示的名稱
+        :param kind: word（單一詞）、int（整數）、duration（期限，格式不符時視為未提供）或 text（剩餘的所有文字）
+        :param required: 是否必填
+        """
+        self.name = name
+        self.label = label
+        self.kind = kind
+        self.required = required
+
+
+class CommandSpec:
+    def __init__(self, name: str, description: str, args: Sequence[Arg] = (), admin: bool = False,
+                 aliases: Sequence[str] = (), parent: Optional[str] = None, hidden: bool = False):
+        self.name = name
+        self.description = description
+        self.args = tuple(args)
+        self.admin = admin
+        self.aliases = tuple(aliases)
+        self.parent = parent
+        self.hidden = hidden
+        self.order = next(_declaration_order)
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.parent} {self.name}" if self.parent else self.name
+
+    def usage(self) -> str:
+        """由參數定義產生使用方式"""
+        return ' '.join([self.full_name] + [f"[{arg.label}]" for arg in self.args])
+
+
+def command(name: str, description: str, args: Sequence[Arg] = (), admin: bool = False,
+            aliases: Sequence[str] = (), hidden: bool = False) -> Callable:
+    """
+    宣告指令
+    :param hidden: 不列在說明文字中（例如只用來顯示子指令用法的上層指令）
+    """
+    def decorator(func):
+        func._command_spec = CommandSpec(name, description, args, admin, aliases, hidden=hidden)
+        return func
+    return decorator
+
+
+def subcommand(parent: str, name: str, description: str, args: Sequence[Arg] = (),
+               admin: Optional[bool] = None) -> Callable:
+    """宣告子指令（admin 未指定時沿用上層指令的設定）"""
+    def decorator(func):
+        func._command_spec = CommandSpec(name, description, args, admin, parent=parent)
+        return func
+    return decorator
+
+
+class Route:
+    __slots__ = ('spec', 'func', 'subroutes')
+
+    def __init__(self, spec: CommandSpec, func: Callable):
+        self.spec = spec
+        self.func = func
+        self.subroutes: Dict[str, 'Route'] = {}
+
+    def parse(self, tokens: List[str]) -> Dict[str, Any]:
+        """依參數定義一次解析所有參數"""
+        values = {}
+        position = 0
+        for arg in self.spec.args:
+            if arg.kind == 'text':
+                value = ' '.join(tokens[position:]) or None
+                position = len(tokens)
+            elif arg.kind == 'duration':
+                value = parse_duration(tokens[position]) if position < len(tokens) else None
+                if value is not None:
+                    position += 1
+            elif position < len(tokens):
+                value = tokens[position]
+                position += 1
+                if arg.kind == 'int':
+                    try:
+                        value = int(value)
+                    except ValueError:
+                        raise UsageError(arg.label)
+            else:
+                value = None
+            if value is None and arg.required:
+                raise UsageError(arg.label)
+            values[arg.name] = value
+        return values
+
+
+class CommandRegistry:
+    def __init__(self, handler):
+        """
+        掃描處理器上以 @command/@subcommand 宣告的方法，編譯成路由表
+        :param handler: 指令處理器實例
+        """
+        specs: List[Tuple[CommandSpec, Callable]] = []
+        for cls in reversed(type(handler).__mro__):
+            for attr in vars(cls).values():
+                spec = getattr(attr, '_command_spec', None)
+                if spec is not None:
+                    specs.append((spec, attr.__get__(handler)))
+        specs.sort(key=lambda item: item[0].order)
+
+        self.routes: Dict[str, Route] = {}   # 指令名稱與別名 -> 路由
+        self.commands: List[Route] = []      # 依宣告順序排列的上層指令
+        for spec, func in specs:
+            if spec.parent is None:
+                route = Route(spec, func)
+                self.commands.append(route)
+                for name in (spec.name,) + spec.aliases:
+                    self.routes[name.lower()] = route
+        for spec, func in specs:
+            if spec.parent is not None:
+                parent = self.routes[spec.parent]
+                if spec.admin is None:
+                    spec.admin = parent.spec.admin
+                parent.subroutes[spec.name.lower()] = Route(spec, func)
+
+    def resolve(self, text: str) -> Tuple[Optional[Route], List[str]]:
+        """
+        找出指令對應的路由
+        :return: (路由, 剩餘的參數)，找不到指令時路由為 None
+        """
+        tokens = text.split()
+        if not tokens:
+            return None, tokens
+        route = self.routes.get(tokens[0].lower())
+        if route is None:
+            return None, tokens
+        if route.subroutes and len(tokens) > 1:
+            sub = route.subroutes.get(tokens[1].lower())
+            if sub is not None:
+                return sub, tokens[2:]
+        return route, tokens[1:]
+
+    def usage(self, route: Route) -> str:
+        """指令的使用方式（有子指令時列出所有子指令）"""
+        lines = [] if route.spec.hidden else [route.spec.usage()]
+        lines.extend(sub.spec.usage() for sub in route.subroutes.values())
+        return '\n'.join(lines)
+
+    def help_lines(self, admin: bool) -> List[str]:
+        """產生一般或管理員指令的說明文字"""
+        lines = []
+        for route in self.commands:
+            if not route.spec.hidden and route.spec.admin == admin:
+                lines.append(f"{route.spec.usage()} - {route.spec.description}")
+            for sub in route.subroutes.values():
+                if sub.spec.admin == admin:
+                    lines.append(f"{sub.spec.usage()} - {sub.spec.description}")
+        return lines
@@ -1,208 +1,253 @@
-from typing import Dict, Callable, List, Optional
+from typing import Optional
 from datetime import datetime
+import threading
+from utils.response import ResponseContext
+from utils.sweep import format_sweep_summary
+from utils.command_registry import Arg, CommandRegistry, UsageError, command, subcommand
+from utils.metrics import timed
+from utils.render import PAGE_SIZE, Page, page_footer, page_offset, render_block, render_carousel, render_text
+
+# 常用參數
+USER = Arg('user_id', '@用戶')
+REASON = Arg('reason', '原因', kind='text')
+PAGE = Arg('page', '頁數', kind='int', required=False)
+DURATION = Arg('duration', '期限', kind='duration', required=False)
 
 class CommandHandler:
-    def __init__(self, line_bot, blacklist_manager, admin_manager, warning_manager):
+    def __init__(self, line_bot, blacklist_manager, admin_manager, warning_manager, sweeper=None,
+                 rate_limiter=None, word_filter=None, flex_lists: bool = True, metrics=None):
         self.line_bot = line_bot
         self.blacklist_manager = blacklist_manager
         self.admin_manager = admin_manager
         self.warning_manager = warning_manager
-        self.commands: Dict[str, Callable] = {
-            # 一般指令
-            '!help': self.cmd_help,
-            '!status': self.cmd_status,
-            '!report': self.cmd_report,
-            
-            # 管理員指令
-            '!admin': self.cmd_admin,
-            '!blacklist': self.cmd_blacklist,
-            '!warn': self.cmd_warn,
-            '!unwarn': self.cmd_unwarn,
-            '!kick': self.cmd_kick,
-            '!warnings': self.cmd_warnings
-        }
-
-    def handle_command(self, event) -> None:
-        """處理指令"""
-        text = event.message.text.split()
-        command = text[0].lower()
-        args = text[1:] if len(text) > 1 else []
-
-        if command not in self.commands:
-            self.line_bot.send_message(
-                event.source.group_id,
-                "❌ 未知的指令。輸入 !help 查看可用指令。"
+        self.sweeper = sweeper
+        self.rate_limiter = rate_limiter
+        self.word_filter = word_filter
+        self.flex_lists = flex_lists  # 超過一頁的列表改用 Flex carousel 顯示
+
+        # 啟動時將 @command 宣告編譯成路由表
+        self.registry = CommandRegistry(self)
+
+        # 記錄各指令的執行時間（未啟用指標時不包裝）
+        if metrics is not None:
+            latency = metrics.histogram('linebot_command_seconds', '指令執行時間', ('command',))
+            for route in self.registry.commands:
+                for target in [route] + list(route.subroutes.values()):
+                    target.func = timed(latency, (target.spec.full_name,))(target.func)
+
+    def handle_command(self, event, ctx: Optional[ResponseContext] = None) -> None:
+        """
+        處理指令
+        :param event: 訊息事件
+        :param ctx: 回應內容（可選），未提供時自動建立並於指令結束後送出
+        """
+        owns_ctx = ctx is None
+        if owns_ctx:
+            ctx = ResponseContext(self.line_bot, event)
+        try:
+            self._dispatch(ctx, event.message.text)
+        finally:
+            if owns_ctx:
+                ctx.flush()
+
+    def _dispatch(self, ctx: ResponseContext, text: str) -> None:
+        """解析並執行指令"""
+        route, tokens = self.registry.resolve(text)
+
+        # 檢查使用頻率（未知指令同樣計入總量，避免以錯誤指令洗版）
+        if self.rate_limiter is not None:
+            allowed, notify = self.rate_limiter.check(
+                ctx.group_id, ctx.user_id, route.spec.full_name.lower() if route else None
             )
+            if not allowed:
+                if notify:
+                    ctx.send("⏳ 指令使用過於頻繁，請稍後再試。")
+                return
+
+        if route is None:
+            ctx.send("❌ 未知的指令。輸入 !help 查看可用指令。")
             return
 
         # 檢查管理員權限
-        admin_commands = {'!admin', '!blacklist', '!warn', '!unwarn', '!kick'}
-        if command in admin_commands:
-            if not self.admin_manager.is_admin(event.source.group_id, event.source.user_id):
-                self.line_bot.send_message(
-                    event.source.group_id,
-                    "❌ 權限不足。此指令僅限管理員使用。"
-                )
-                return
+        if route.spec.admin and not self.admin_manager.is_admin(ctx.group_id, ctx.user_id):
+            ctx.send("❌ 權限不足。此指令僅限管理員使用。")
+            return
 
-        # 執行指令
-        self.commands[command](event, args)
-
-    def cmd_warnings(self, event, args) -> None:
-        """查看用戶警告"""
-        if not args:
-            self.line_bot.send_message(
-                event.source.group_id,
-                "❌ 使用方式：!warnings [@用戶]"
-            )
+        try:
+            args = route.parse(tokens)
+        except UsageError:
+            ctx.send(f"❌ 使用方式：{self.registry.usage(route)}")
             return
 
-        user_id = args[0]
-        warnings = self.warning_manager.get_warnings(event.source.group_id, user_id)
+        # 執行指令
+        route.func(ctx, args)
+
+    @command('!warnings', '查看用戶警告記錄', args=[USER, PAGE])
+    def cmd_warnings(self, ctx, args) -> None:
+        """查看用戶警告（分頁顯示）"""
+        user_id = args['user_id']
+        warnings = self.warning_manager.get_warnings(ctx.group_id, user_id)
         
         if not warnings:
-            self.line_bot.send_message(
-                event.source.group_id,
-                f"✅ {user_id} 目前沒有警告記錄"
-            )
+            ctx.send(f"✅ {user_id} 目前沒有警告記錄")
             return
 
-        message = f"""
-⚠️ 警告記錄 - {user_id}
--------------------
-警告次數: {len(warnings)}
-"""
-        for i, warning in enumerate(warnings, 1):
-            message += f"\n#{i}"
-            message += f"\n原因: {warning['reason']}"
-            message += f"\n警告者: {warning['warned_by']}"
-            message += f"\n時間: {warning['timestamp']}\n"
+        number, offset = page_offset(args['page'], len(warnings))
+        page = Page(list(enumerate(warnings, 1))[offset:offset + PAGE_SIZE], number, len(warnings))
+        self._send_page(
+            ctx, f"⚠️ 警告記錄 - {user_id}", page, f"!warnings {user_id}",
+            lambda item: (('編號', f"#{item[0]}"), ('原因', item[1]['reason']),
+                          ('警告者', item[1]['warned_by']), ('時間', item[1]['timestamp'])),
+            header=f"\n⚠️ 警告記錄 - {user_id}\n-------------------\n警告次數: {len(warnings)}"
+        )
 
-        self.line_bot.send_message(event.source.group_id, message)
+    def _send_page(self, ctx, title: str, page: Page, command: str, fields, header: str = None) -> None:
+        """
+        送出一頁列表：超過一頁且啟用 Flex 時使用 carousel，否則以文字顯示並限制長度
+        :param fields: 將一筆資料轉成 (欄位名稱, 內容) 列表
+        """
+        if self.flex_lists and page.pages > 1:
+            ctx.send_flex(f"{title}（第 {page.number}/{page.pages} 頁）", render_carousel(title, page, fields, command))
+            return
+        blocks = (render_block(fields(item)) for item in page.items)
+        ctx.send(render_text(header or title, blocks, page_footer(page, command) if page.pages > 1 else ''))
 
-    def cmd_help(self, event, args) -> None:
-        """顯示幫助訊息"""
-        is_admin = self.admin_manager.is_admin(event.source.group_id, event.source.user_id)
+    @command('!help', '顯示此幫助訊息')
+    def cmd_help(self, ctx, args) -> None:
+        """顯示幫助訊息（由指令宣告產生）"""
+        is_admin = self.admin_manager.is_admin(ctx.group_id, ctx.user_id)
         
-        help_message = """
-📖 指令列表：
-
-一般指令：
-!help - 顯示此幫助訊息
-!status - 查看機器人狀態
-!report [@用戶] [原因] - 回報違規用戶
-"""
+        help_message = "\n📖 指令列表：\n\n一般指令：\n" + "\n".join(self.registry.help_lines(admin=False)) + "\n"
 
         if is_admin:
+            help_message += "\n管理員指令：\n" + "\n".join(self.registry.help_lines(admin=True)) + "\n"
             help_message += """
-管理員指令：
-!admin list - 查看管理員列表
-!admin add [@用戶] - 新增管理員
-!admin remove [@用戶] - 移除管理員
-!blacklist - 查看黑名單
-!warn [@用戶] [原因] - 對用戶發出警告
-!unwarn [@用戶] - 移除用戶警告
-!warnings [@用戶] - 查看用戶警告記錄
-!kick [@用戶] [原因] - 將用戶踢出群組
-
 注意：
 - 用戶ID請使用 @ 標註
-- 警告累計3次將自動加入黑名單並踢出群組
-- 被踢出的用戶會自動加入黑名單
+- 警告累計3次將自動加入黑名單，請管理員手動移出群組
+- !kick 的用戶會加入黑名單，機器人無法移出成員，請管理員手動移除
 """
 
-        self.line_bot.send_message(event.source.group_id, help_message)
+        ctx.send(help_message)
 
-    def cmd_status(self, event, args) -> None:
+    @command('!status', '查看機器人狀態')
+    def cmd_status(self, ctx, args) -> None:
         """查看機器人狀態"""
-        admin_count = len(self.admin_manager.get_admins(event.source.group_id))
+        admin_count = len(self.admin_manager.get_admins(ctx.group_id))
+        counts = self.blacklist_manager.counts(ctx.group_id)
         status_message = f"""
 ℹ️ 機器人狀態
 -------------------
 運行狀態: 正常
 管理員數量: {admin_count}
-黑名單數量: {len(self.blacklist_manager.get_blacklist())}
+黑名單數量: {counts['global']}
+本群組黑名單: {counts['group']}
+聯盟黑名單: {counts['federation']}
 更新時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
-        self.line_bot.send_message(event.source.group_id, status_message)
-
-    def cmd_admin(self, event, args) -> None:
-        """管理員相關指令"""
-        if not args:
-            self.line_bot.send_message(
-                event.source.group_id,
-                "❌ 使用方式：\n!admin list\n!admin add [@用戶]\n!admin remove [@用戶]"
-            )
-            return
+        ctx.send(status_message)
 
-        sub_command = args[0].lower()
-        
-        if sub_command == 'list':
-            admins = self.admin_manager.get_admins(event.source.group_id)
-            if not admins:
-                message = "👥 目前沒有管理員"
-            else:
-                message = "👥 管理員列表：\n"
-                for admin_id in admins:
-                    message += f"- {admin_id}\n"
-            self.line_bot.send_message(event.source.group_id, message)
-            
-        elif sub_command == 'add' and len(args) > 1:
-            target_user = args[1]
-            if self.admin_manager.add_admin(event.source.group_id, target_user):
-                self.line_bot.send_message(
-                    event.source.group_id,
-                    f"✅ 已新增管理員：{target_user}"
-                )
-            else:
-                self.line_bot.send_message(
-                    event.source.group_id,
-                    f"❌ {target_user} 已經是管理員"
-                )
-                
-        elif sub_command == 'remove' and len(args) > 1:
-            target_user = args[1]
-            if self.admin_manager.remove_admin(event.source.group_id, target_user):
-                self.line_bot.send_message(
-                    event.source.group_id,
-                    f"✅ 已移除管理員：{target_user}"
-                )
-            else:
-                self.line_bot.send_message(
-                    event.source.group_id,
-                    f"❌ {target_user} 不是管理員"
-                )
+    @command('!admin', '管理員相關指令', args=[Arg('sub_command', '子指令', required=False)],
+             admin=True, hidden=True)
+    def cmd_admin(self, ctx, args) -> None:
+        """管理員相關指令（未帶子指令或子指令無效時）"""
+        if args['sub_command'] is None:
+            ctx.send(f"❌ 使用方式：\n{self.registry.usage(self.registry.routes['!admin'])}")
         else:
-            self.line_bot.send_message(
-                event.source.group_id,
-                "❌ 無效的子指令"
-            )
+            ctx.send("❌ 無效的子指令")
 
-    def cmd_blacklist(self, event, args) -> None:
-        """查看黑名單"""
-        blacklist = self.blacklist_manager.get_blacklist()
-        if not blacklist:
-            message = "📋 黑名單為空"
+    @subcommand('!admin', 'list', '查看管理員列表')
+    def cmd_admin_list(self, ctx, args) -> None:
+        """查看管理員列表"""
+        admins = self.admin_manager.get_admins(ctx.group_id)
+        if not admins:
+            message = "👥 目前沒有管理員"
         else:
-            message = "📋 黑名單列表：\n"
-            for user_id, info in blacklist.items():
-                message += f"\n用戶ID: {user_id}"
-                message += f"\n原因: {info['reason']}"
-                message += f"\n時間: {info['timestamp']}\n"
-        
-        self.line_bot.send_message(event.source.group_id, message)
+            message = "👥 管理員列表：\n"
+            for admin_id in admins:
+                message += f"- {admin_id}\n"
+        ctx.send(message)
 
-    def cmd_report(self, event, args) -> None:
-        """回報違規用戶"""
-        if len(args) < 2:
-            self.line_bot.send_message(
-                event.source.group_id,
-                "❌ 使用方式：!report [@用戶] [原因]"
-            )
+    @subcommand('!admin', 'add', '新增管理員', args=[USER])
+    def cmd_admin_add(self, ctx, args) -> None:
+        """新增管理員"""
+        target_user = args['user_id']
+        if self.admin_manager.add_admin(ctx.group_id, target_user):
+            ctx.send(f"✅ 已新增管理員：{target_user}")
+        else:
+            ctx.send(f"❌ {target_user} 已經是管理員")
+
+    @subcommand('!admin', 'remove', '移除管理員', args=[USER])
+    def cmd_admin_remove(self, ctx, args) -> None:
+        """移除管理員"""
+        target_user = args['user_id']
+        if self.admin_manager.remove_admin(ctx.group_id, target_user):
+            ctx.send(f"✅ 已移除管理員：{target_user}")
+        else:
+            ctx.send(f"❌ {target_user} 不是管理員")
+
+    @command('!blacklist', '查看黑名單', args=[PAGE], admin=True)
+    def cmd_blacklist(self, ctx, args) -> None:
+        """查看黑名單（分頁顯示）"""
+        counts = self.blacklist_manager.counts(ctx.group_id)
+        total = counts['global'] + counts['group']
+        if not total:
+            ctx.send("📋 黑名單為空")
+            return
+
+        number, offset = page_offset(args['page'], total)
+        total, items = self.blacklist_manager.get_page(offset, PAGE_SIZE, ctx.group_id)
+        self._send_page(ctx, "📋 黑名單列表", Page(items, number, total), '!blacklist',
+                        self._blacklist_fields, header="📋 黑名單列表：")
+
+    @subcommand('!blacklist', 'search', '搜尋黑名單', args=[Arg('query', '用戶ID')])
+    def cmd_blacklist_search(self, ctx, args) -> None:
+        """以用戶 ID 搜尋黑名單"""
+        query = args['query']
+        matches, has_more = self.blacklist_manager.search(query, PAGE_SIZE, ctx.group_id)
+        if not matches:
+            ctx.send(f"🔍 黑名單中找不到 {query}")
+            return
+        blocks = (render_block(self._blacklist_fields(item)) for item in matches)
+        footer = f"\n只顯示前 {PAGE_SIZE} 筆，請輸入更完整的用戶ID" if has_more else ''
+        ctx.send(render_text(f"🔍 搜尋結果：{query}", blocks, footer))
+
+    @staticmethod
+    def _blacklist_fields(item):
+        user_id, info = item
+        fields = (('用戶ID', user_id), ('原因', info['reason']), ('時間', info['timestamp']))
+        if info.get('group_id'):
+            fields += (('範圍', '本群組'),)
+        if info.get('expires_at'):
+            fields += (('到期', info['expires_at']),)
+        return fields
+
+    @subcommand('!blacklist', 'federation', '查看或設定本群組加入的黑名單聯盟（off 為退出）',
+                args=[Arg('name', '聯盟名稱', required=False)])
+    def cmd_blacklist_federation(self, ctx, args) -> None:
+        """查看或設定黑名單聯盟"""
+        name = args['name']
+        if name is None:
+            current = self.blacklist_manager.get_federation(ctx.group_id)
+            if current:
+                count = self.blacklist_manager.counts(ctx.group_id)['federation']
+                ctx.send(f"🤝 本群組已加入黑名單聯盟：{current}（共享 {count} 筆）")
+            else:
+                ctx.send("🤝 本群組未加入黑名單聯盟")
             return
 
-        user_id = args[0]
-        reason = ' '.join(args[1:])
+        if name.lower() == 'off':
+            self.blacklist_manager.set_federation(ctx.group_id, None)
+            ctx.send("✅ 已退出黑名單聯盟")
+        else:
+            self.blacklist_manager.set_federation(ctx.group_id, name)
+            ctx.send(f"✅ 已加入黑名單聯盟：{name}，將與同一聯盟的群組共享黑名單")
+
+    @command('!report', '回報違規用戶', args=[USER, REASON])
+    def cmd_report(self, ctx, args) -> None:
+        """回報違規用戶"""
+        user_id = args['user_id']
+        reason = args['reason']
         
         # 記錄違規報告
         report_message = f"""
@@ -210,37 +255,28 @@ class CommandHandler:
 -------------------
 被檢舉者: {user_id}
 檢舉原因: {reason}
-檢舉者: {event.source.user_id}
+檢舉者: {ctx.user_id}
 時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
-        self.line_bot.send_message(event.source.group_id, report_message)
+        ctx.send(report_message)
 
-    def cmd_warn(self, event, args) -> None:
+    @command('!warn', '對用戶發出警告', args=[USER, REASON], admin=True)
+    def cmd_warn(self, ctx, args) -> None:
         """警告用戶"""
-        if len(args) < 2:
-            self.line_bot.send_message(
-                event.source.group_id,
-                "❌ 使用方式：!warn [@用戶] [原因]"
-            )
-            return
-
-        user_id = args[0]
-        reason = ' '.join(args[1:])
+        user_id = args['user_id']
+        reason = args['reason']
         
         # 檢查是否在黑名單中
-        if self.blacklist_manager.is_blacklisted(user_id):
-            self.line_bot.send_message(
-                event.source.group_id,
-                f"❌ {user_id} 已在黑名單中"
-            )
+        if self.blacklist_manager.is_blacklisted(user_id, ctx.group_id):
+            ctx.send(f"❌ {user_id} 已在黑名單中")
             return
 
         # 新增警告
         result = self.warning_manager.add_warning(
-            event.source.group_id,
+            ctx.group_id,
             user_id,
             reason,
-            event.source.user_id
+            ctx.user_id
         )
         
         if result['status'] == 'blacklisted':
@@ -250,90 +286,184 @@ class CommandHandler:
 用戶: {user_id}
 原因: 達到最大警告次數 (3次)
 最後警告原因: {reason}
-執行者: {event.source.user_id}
+執行者: {ctx.user_id}
 時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
-系統已自動將用戶踢出群組
+機器人無法將成員移出群組，請管理員手動移除
 """
-            # 踢出用戶
-            self.line_bot.kick_user(event.source.group_id, user_id)
         else:
             message = f"""
 ⚠️ 警告通知
 -------------------
 警告對象: {user_id}
 警告原因: {reason}
-執行者: {event.source.user_id}
+執行者: {ctx.user_id}
 警告次數: {result['warning_count']}/3
 時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
-        self.line_bot.send_message(event.source.group_id, message)
+        ctx.send(message)
 
-    def cmd_unwarn(self, event, args) -> None:
+    @command('!unwarn', '移除用戶警告', args=[USER], admin=True)
+    def cmd_unwarn(self, ctx, args) -> None:
         """移除警告"""
-        if len(args) < 1:
-            self.line_bot.send_message(
-                event.source.group_id,
-                "❌ 使用方式：!unwarn [@用戶]"
-            )
-            return
-
-        user_id = args[0]
-        if self.warning_manager.remove_warning(event.source.group_id, user_id):
-            remaining_warnings = len(self.warning_manager.get_warnings(event.source.group_id, user_id))
+        user_id = args['user_id']
+        if self.warning_manager.remove_warning(ctx.group_id, user_id):
+            remaining_warnings = len(self.warning_manager.get_warnings(ctx.group_id, user_id))
             message = f"""
 ✅ 警告移除
 -------------------
 用戶: {user_id}
-執行者: {event.source.user_id}
+執行者: {ctx.user_id}
 剩餘警告: {remaining_warnings}/3
 時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         else:
             message = f"❌ {user_id} 目前沒有警告記錄"
         
-        self.line_bot.send_message(event.source.group_id, message)
-
-    def cmd_kick(self, event, args) -> None:
-        """踢出用戶"""
-        if len(args) < 2:
-            self.line_bot.send_message(
-                event.source.group_id,
-                "❌ 使用方式：!kick [@用戶] [原因]"
-            )
+        ctx.send(message)
+
+    @command('!warnexpiry', '設定警告有效天數（0 為永久，default 為預設值）',
+             args=[Arg('days', '天數', required=False)], admin=True)
+    def cmd_warnexpiry(self, ctx, args) -> None:
+        """查看或設定群組的警告有效天數"""
+        days = args['days']
+        if days is None:
+            current = self.warning_manager.get_expiry_days(ctx.group_id)
+            ctx.send(f"⏱️ 警告有效天數：{current:g} 天" if current else "⏱️ 警告永久有效")
             return
 
-        user_id = args[0]
-        reason = ' '.join(args[1:])
+        if days.lower() == 'default':
+            self.warning_manager.set_expiry_days(ctx.group_id, None)
+        else:
+            try:
+                value = float(days)
+            except ValueError:
+                value = -1
+            if value < 0:
+                ctx.send(f"❌ 使用方式：{self.registry.usage(self.registry.routes['!warnexpiry'])}")
+                return
+            self.warning_manager.set_expiry_days(ctx.group_id, value)
+
+        current = self.warning_manager.get_expiry_days(ctx.group_id)
+        ctx.send(f"✅ 警告有效天數已設為 {current:g} 天" if current else "✅ 警告已設為永久有效")
+
+    @command('!kick', '將用戶加入黑名單並通知管理員移出群組（可指定封鎖期限，例如 1d、12h）',
+             args=[USER, DURATION, REASON], admin=True)
+    def cmd_kick(self, ctx, args) -> None:
+        """封鎖用戶（LINE Messaging API 無法將成員移出群組，由管理員手動移除）"""
+        user_id = args['user_id']
+        reason = args['reason']
+        duration = args['duration']
         
         # 檢查是否為管理員
-        if self.admin_manager.is_admin(event.source.group_id, user_id):
-            self.line_bot.send_message(
-                event.source.group_id,
-                "❌ 無法踢出管理員"
-            )
+        if self.admin_manager.is_admin(ctx.group_id, user_id):
+            ctx.send("❌ 無法封鎖管理員")
             return
         
-        # 踢出用戶
-        if self.line_bot.kick_user(event.source.group_id, user_id):
-            # 自動加入黑名單
-            self.blacklist_manager.add_to_blacklist(
-                user_id,
-                f"被管理員踢出：{reason}",
-                None
-            )
-            
-            message = f"""
-🚫 用戶已被踢出
+        # 加入黑名單
+        if not self.blacklist_manager.add_to_blacklist(
+            user_id,
+            f"被管理員封鎖：{reason}",
+            None,
+            duration,
+            ctx.group_id
+        ):
+            ctx.send("❌ 加入黑名單失敗")
+            return
+
+        expires_at = self.blacklist_manager.get_expires_at(user_id, ctx.group_id)
+        if expires_at:
+            notice = f"暫時封鎖，{datetime.fromisoformat(expires_at).strftime('%Y-%m-%d %H:%M:%S')} 自動解除"
+        else:
+            notice = "永久封鎖"
+
+        message = f"""
+⛔ 用戶已加入黑名單
 -------------------
 用戶: {user_id}
 原因: {reason}
-執行者: {event.source.user_id}
+執行者: {ctx.user_id}
 時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
-用戶已自動加入黑名單
+{notice}
+機器人無法將成員移出群組，請管理員手動移除
 """
+        ctx.send(message)
+
+    @command('!sweep', '掃描群組中的黑名單成員並通知管理員', admin=True)
+    def cmd_sweep(self, ctx, args) -> None:
+        """掃描群組中的黑名單成員（機器人無法移出成員，由管理員手動移除）"""
+        if self.sweeper is None:
+            ctx.send("❌ 掃描功能未啟用")
+            return
+
+        if self.sweeper.get_progress(ctx.group_id) is not None:
+            ctx.send("❌ 此群組正在掃描中，輸入 !sweep status 查看進度")
+            return
+
+        ctx.send("🔍 開始掃描黑名單成員，完成後將發送摘要")
+
+        # 讀取完整成員列表可能耗時較久，在背景執行並以 push 發送摘要
+        group_id = ctx.group_id
+        def run():
+            result = self.sweeper.sweep_group(group_id, refresh=True)
+            if result is not None:
+                self.line_bot.send_message(group_id, format_sweep_summary(result))
+        threading.Thread(target=run, name=f'sweep-{group_id}', daemon=True).start()
+
+    @subcommand('!sweep', 'status', '查看掃描進度')
+    def cmd_sweep_status(self, ctx, args) -> None:
+        """查看掃描進度"""
+        progress = self.sweeper.get_progress(ctx.group_id) if self.sweeper else None
+        if progress is None:
+            ctx.send("ℹ️ 目前沒有進行中的掃描")
         else:
-            message = "❌ 踢出用戶失敗"
-        
-        self.line_bot.send_message(event.source.group_id, message) 
\ No newline at end of file
+            ctx.send(f"🔍 掃描進度：已讀取 {progress['fetched']} 位成員")
+
+    @command('!filter', '違禁詞相關指令', args=[Arg('sub_command', '子指令', required=False)],
+             admin=True, hidden=True)
+    def cmd_filter(self, ctx, args) -> None:
+        """違禁詞相關指令（未帶子指令或子指令無效時）"""
+        if args['sub_command'] is None:
+            ctx.send(f"❌ 使用方式：\n{self.registry.usage(self.registry.routes['!filter'])}")
+        else:
+            ctx.send("❌ 無效的子指令")
+
+    @subcommand('!filter', 'list', '查看違禁詞列表')
+    def cmd_filter_list(self, ctx, args) -> None:
+        """查看違禁詞列表"""
+        if self.word_filter is None:
+            ctx.send("❌ 違禁詞功能未啟用")
+            return
+        terms = self.word_filter.get_terms(ctx.group_id)
+        if not terms:
+            ctx.send("📝 目前沒有違禁詞")
+            return
+        message = f"📝 違禁詞列表（共 {len(terms)} 個）：\n"
+        for term in terms:
+            message += f"- {term}\n"
+        ctx.send(message)
+
+    @subcommand('!filter', 'add', '新增違禁詞', args=[Arg('term', '詞', kind='text')])
+    def cmd_filter_add(self, ctx, args) -> None:
+        """新增違禁詞"""
+        if self.word_filter is None:
+            ctx.send("❌ 違禁詞功能未啟用")
+            return
+        term = args['term']
+        if self.word_filter.add_term(ctx.group_id, term):
+            ctx.send(f"✅ 已新增違禁詞：{term}")
+        else:
+            ctx.send(f"❌ 無法新增違禁詞：{term}（已存在或數量已達上限）")
+
+    @subcommand('!filter', 'remove', '移除違禁詞', args=[Arg('term', '詞', kind='text')])
+    def cmd_filter_remove(self, ctx, args) -> None:
+        """移除違禁詞"""
+        if self.word_filter is None:
+            ctx.send("❌ 違禁詞功能未啟用")
+            return
+        term = args['term']
+        if self.word_filter.remove_term(ctx.group_id, term):
+            ctx.send(f"✅ 已移除違禁詞：{term}")
+        else:
+            ctx.send(f"❌ {term} 不在違禁詞列表中")
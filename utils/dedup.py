@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+
+class MemoryDedupBackend:
+    def __init__(self, ttl: float = 86400, max_size: int = 50000):
+        """
+        單一行程內已處理的事件 ID（依加入順序排列，最舊的先過期）
+        :param ttl: 事件 ID 保留秒數
+        :param max_size: 最多保留筆數，超過時淘汰最舊的事件 ID
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._seen: 'OrderedDict[str, float]' = OrderedDict()  # 事件 ID -> 過期時間
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def add(self, event_id: str) -> bool:
+        """
+        記錄事件 ID
+        :return: 是否為第一次出現（已記錄且尚未過期時回傳 False）
+        """
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen
+            # TTL 固定，最舊的項目必定最先過期
+            while seen:
+                oldest, expires = next(iter(seen.items()))
+                if expires > now:
+                    break
+                del seen[oldest]
+            if event_id in seen:
+                return False
+            if len(seen) >= self.max_size:
+                seen.popitem(last=False)
+                self.evictions += 1
+            seen[event_id] = now + self.ttl
+            return True
+
+    def discard(self, event_id: str) -> None:
+        """移除事件 ID（處理失敗、需要接受重送時）"""
+        with self._lock:
+            self._seen.pop(event_id, None)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class EventDeduplicator:
+    def __init__(self, backend):
+        """
+        以 webhookEventId 略過 LINE 重送的事件
+        :param backend: 已處理事件 ID 的存放位置（MemoryDedupBackend 或 SqliteDedupBackend）
+        """
+        self.backend = backend
+
+        # 統計資料
+        self.checked = 0
+        self.duplicates = 0
+        self.redeliveries = 0
+        self.missing_id = 0
+
+    def is_duplicate(self, event: Dict) -> bool:
+        """檢查原始 JSON 事件是否已處理過（第一次出現時同時記錄）"""
+        self.checked += 1
+        if (event.get('deliveryContext') or {}).get('isRedelivery'):
+            self.redeliveries += 1
+        event_id = event.get('webhookEventId')
+        if not event_id:
+            self.missing_id += 1
+            return False
+        if self.backend.add(event_id):
+            return False
+        self.duplicates += 1
+        return True
+
+    def forget(self, event: Dict) -> None:
+        """事件未能處理時移除記錄，讓 LINE 的重送可以再次處理"""
+        event_id = event.get('webhookEventId')
+        if event_id:
+            self.backend.discard(event_id)
+
+    def stats(self) -> Dict[str, int]:
+        """取得去重統計資料"""
+        return {
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'redeliveries': self.redeliveries,
+            'missing_id': self.missing_id,
+            'size': len(self.backend)
+        }
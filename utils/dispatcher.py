@@ -0,0 +1,179 @@
+import threading
+import queue
+import logging
+import time
+import zlib
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger('dispatcher')
+
+# 工作執行緒結束用的哨兵
+_STOP = object()
+
+
+class QueueFullError(Exception):
+    """佇列已滿，事件無法排入"""
+
+
+class EventDispatcher:
+    def __init__(self, workers: int = 4, max_queue_size: int = 1000, enqueue_timeout: float = 0.0):
+        """
+        初始化事件分派器
+        :param workers: 工作執行緒數量
+        :param max_queue_size: 所有佇列合計的最大事件數
+        :param enqueue_timeout: 佇列已滿時等待的秒數（0 表示立即拒絕）
+        """
+        self.workers = max(1, workers)
+        self.enqueue_timeout = enqueue_timeout
+        self.per_worker = max(1, max_queue_size // self.workers)
+        self.max_queue_size = self.per_worker * self.workers
+
+        # 每個工作執行緒擁有自己的佇列，相同 key 的事件永遠進入同一個佇列，以維持順序
+        # 容量由 submit_all 在持有 _space 時檢查（一批事件全部排入或全部拒絕），佇列本身不設上限
+        self._queues: List[queue.Queue] = [queue.Queue() for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._space = threading.Condition()
+        self._waiting = 0
+        self._accepting = False
+
+        # 統計資料
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+
+    def start(self) -> None:
+        """啟動工作執行緒"""
+        with self._lock:
+            if self._accepting:
+                return
+            self._accepting = True
+            for index, q in enumerate(self._queues):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(q,),
+                    name=f'event-worker-{index}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, key: Optional[str], func: Callable, *args) -> None:
+        """
+        將工作排入佇列
+        :param key: 排序鍵（例如群組 ID），相同鍵的工作依序執行
+        :param func: 要執行的函式
+        :raises QueueFullError: 佇列已滿或分派器已停止
+        """
+        self.submit_all([(key, func, args)])
+
+    def submit_all(self, items: Iterable[Tuple[Optional[str], Callable, tuple]]) -> None:
+        """
+        將一批工作全部排入佇列，容量不足時一個都不排入（例如同一個 Webhook 請求的所有事件，
+        拒絕後 LINE 重送整個請求時不會重複處理已排入的事件）
+        :param items: (排序鍵, 函式, 參數) 列表
+        :raises QueueFullError: 佇列容量不足或分派器已停止
+        """
+        if not self._accepting:
+            raise QueueFullError('分派器未啟動')
+        items = [(self._queues[zlib.crc32((key or '').encode('utf-8')) % self.workers], func, args)
+                 for key, func, args in items]
+        if not items:
+            return
+        needed = Counter(q for q, _, _ in items)
+
+        deadline = time.monotonic() + self.enqueue_timeout
+        with self._space:
+            while not self._fits(needed):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    with self._lock:
+                        self.rejected += len(items)
+                    raise QueueFullError('事件佇列已滿')
+                self._waiting += 1
+                try:
+                    self._space.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            for q, func, args in items:
+                q.put_nowait((func, args))
+
+        with self._lock:
+            self.enqueued += len(items)
+            depth = self.depth()
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+    def _fits(self, needed: Counter) -> bool:
+        """各佇列是否容得下這批工作（需持有 _space）；單一佇列放不下的一批工作在該佇列清空時仍可排入"""
+        for q, count in needed.items():
+            size = q.qsize()
+            if size and size + count > self.per_worker:
+                return False
+        return True
+
+    def depth(self) -> int:
+        """目前排隊中的事件數"""
+        return sum(q.qsize() for q in self._queues)
+
+    def _worker(self, q: queue.Queue) -> None:
+        """工作執行緒主迴圈"""
+        while True:
+            item = q.get()
+            if self._waiting:
+                with self._space:
+                    self._space.notify_all()
+            try:
+                if item is _STOP:
+                    return
+                func, args = item
+                try:
+                    func(*args)
+                    with self._lock:
+                        self.processed += 1
+                except Exception as e:
+                    with self._lock:
+                        self.failed += 1
+                    logger.error(f"處理事件失敗: {e}")
+            finally:
+                q.task_done()
+
+    def shutdown(self, timeout: float = 10.0) -> bool:
+        """
+        停止接收新事件並等待佇列清空
+        :param timeout: 最長等待秒數
+        :return: 是否在時限內處理完畢
+        """
+        with self._lock:
+            if not self._accepting:
+                return True
+            self._accepting = False
+
+        for q in self._queues:
+            q.put(_STOP)
+
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+        drained = not any(thread.is_alive() for thread in self._threads)
+        if not drained:
+            logger.warning(f"關閉時仍有 {self.depth()} 個事件未處理")
+        return drained
+
+    def stats(self) -> Dict[str, int]:
+        """取得佇列統計資料"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self.depth(),
+                'queue_capacity': self.max_queue_size,
+                'max_depth': self.max_depth,
+                'enqueued': self.enqueued,
+                'processed': self.processed,
+                'failed': self.failed,
+                'rejected': self.rejected
+            }
@@ -0,0 +1,237 @@
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import logging
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger('history')
+
+TimeBound = Optional[Union[str, datetime]]
+
+
+def segment_key(timestamp: str) -> str:
+    """紀錄所屬的分段（以月份分段，例如 2026-10）"""
+    return timestamp[:7]
+
+
+def _to_iso(value: TimeBound) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class _Segment:
+    """單一分段的記憶體索引：依時間排序的紀錄，以及 user_id -> 紀錄位置"""
+    __slots__ = ('timestamps', 'records', 'by_user')
+
+    def __init__(self, records: List[dict]):
+        records.sort(key=lambda record: record['timestamp'])
+        self.records = records
+        self.timestamps = [record['timestamp'] for record in records]
+        self.by_user: Dict[str, List[int]] = {}
+        for position, record in enumerate(records):
+            self.by_user.setdefault(record['user_id'], []).append(position)
+
+    def append(self, record: dict) -> bool:
+        """加入一筆紀錄；時間早於最後一筆時回傳 False（需重建索引）"""
+        if self.timestamps and record['timestamp'] < self.timestamps[-1]:
+            return False
+        self.by_user.setdefault(record['user_id'], []).append(len(self.records))
+        self.records.append(record)
+        self.timestamps.append(record['timestamp'])
+        return True
+
+    def range(self, since: Optional[str], until: Optional[str], user_id: Optional[str]) -> List[dict]:
+        """以 bisect 找出 [since, until) 之間的紀錄"""
+        lo = bisect_left(self.timestamps, since) if since else 0
+        hi = bisect_left(self.timestamps, until) if until else len(self.records)
+        if user_id is None:
+            return self.records[lo:hi]
+        positions = self.by_user.get(user_id, [])
+        return [self.records[p] for p in positions[bisect_left(positions, lo):bisect_left(positions, hi)]]
+
+
+class HistoryStore:
+    def __init__(self, directory: str = 'data/history', retention_days: int = 180, max_loaded_segments: int = 6):
+        """
+        初始化依時間分段的操作歷史
+        :param directory: 分段檔案目錄，每個月一個 JSON Lines 檔案
+        :param retention_days: 超過天數的分段壓縮移到 archive/（仍可查詢），0 表示不壓縮
+        :param max_loaded_segments: 同時載入記憶體的分段數量（LRU）
+        """
+        self.directory = directory
+        self.archive_directory = os.path.join(directory, 'archive')
+        self.retention_days = retention_days
+        self.max_loaded_segments = max_loaded_segments
+        self._lock = threading.RLock()
+        self._loaded: 'OrderedDict[str, _Segment]' = OrderedDict()
+        self._file = None
+        self._file_key = None
+        os.makedirs(self.archive_directory, exist_ok=True)
+
+        # 啟動時只列出檔案，不讀取內容
+        self._segments: Dict[str, str] = {}  # 分段 -> 檔案路徑
+        for path in glob.glob(os.path.join(self.archive_directory, '*.jsonl.gz')):
+            self._segments[os.path.basename(path)[:-len('.jsonl.gz')]] = path
+        for path in glob.glob(os.path.join(directory, '*.jsonl')):
+            self._segments[os.path.basename(path)[:-len('.jsonl')]] = path
+        self.archive_old()
+
+    def __len__(self) -> int:
+        """分段數量"""
+        return len(self._segments)
+
+    def _segment_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.jsonl")
+
+    def append(self, record: dict) -> None:
+        """寫入一筆紀錄到所屬分段的檔案結尾"""
+        key = segment_key(record['timestamp'])
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            if key != self._file_key:
+                self._open_segment(key)
+            self._file.write(line)
+            self._file.flush()
+            segment = self._loaded.get(key)
+            if segment is not None and not segment.append(record):
+                del self._loaded[key]
+
+    def extend(self, records: Iterable[dict]) -> int:
+        """批次寫入多筆紀錄（匯入或轉移舊資料時使用）"""
+        grouped: Dict[str, List[str]] = {}
+        count = 0
+        for record in records:
+            grouped.setdefault(segment_key(record['timestamp']), []).append(json.dumps(record, ensure_ascii=False))
+            count += 1
+        with self._lock:
+            for key, lines in grouped.items():
+                path = self._segments.get(key)
+                if path is not None and path.endswith('.gz'):
+                    self._unarchive(key)
+                with open(self._segment_path(key), 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+                self._segments[key] = self._segment_path(key)
+                self._loaded.pop(key, None)
+        return count
+
+    def _open_segment(self, key: str) -> None:
+        """切換寫入中的分段（需持有鎖）；換月時順便壓縮過期的分段"""
+        rotated = self._file_key is not None
+        if self._file is not None:
+            self._file.close()
+        path = self._segments.get(key)
+        if path is not None and path.endswith('.gz'):
+            self._unarchive(key)
+        self._file = open(self._segment_path(key), 'a', encoding='utf-8')
+        self._file_key = key
+        self._segments[key] = self._segment_path(key)
+        if rotated:
+            self.archive_old()
+
+    def _load(self, key: str) -> _Segment:
+        """載入分段並建立索引（需持有鎖），最久未使用的分段會被釋放"""
+        segment = self._loaded.get(key)
+        if segment is not None:
+            self._loaded.move_to_end(key)
+            return segment
+        path = self._segments[key]
+        opener = gzip.open if path.endswith('.gz') else open
+        records = []
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"略過損毀的歷史紀錄：{path}")
+        segment = self._loaded[key] = _Segment(records)
+        while len(self._loaded) > self.max_loaded_segments:
+            self._loaded.popitem(last=False)
+        return segment
+
+    def query(self, since: TimeBound = None, until: TimeBound = None, user_id: Optional[str] = None,
+              limit: Optional[int] = None) -> List[dict]:
+        """
+        查詢操作歷史，只載入時間範圍內的分段
+        :param since: 起始時間（含）
+        :param until: 結束時間（不含）
+        :param user_id: 只查詢此用戶的紀錄（可選）
+        :param limit: 只回傳最新的幾筆（可選）
+        :return: 依時間排序的紀錄
+        """
+        since, until = _to_iso(since), _to_iso(until)
+        with self._lock:
+            keys = sorted(
+                key for key in self._segments
+                if (since is None or key >= segment_key(since)) and (until is None or key <= segment_key(until))
+            )
+            results: List[List[dict]] = []
+            found = 0
+            # 由新到舊讀取分段，取得足夠筆數即停止
+            for key in reversed(keys):
+                records = self._load(key).range(since, until, user_id)
+                if limit is not None and found + len(records) > limit:
+                    records = records[len(records) - (limit - found):]
+                results.append(records)
+                found += len(records)
+                if limit is not None and found >= limit:
+                    break
+        return [record for records in reversed(results) for record in records]
+
+    def archive_old(self) -> int:
+        """將超過保留天數的分段壓縮移到 archive/，回傳壓縮的分段數"""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = segment_key((datetime.now() - timedelta(days=self.retention_days)).isoformat())
+        archived = 0
+        with self._lock:
+            for key, path in list(self._segments.items()):
+                if key >= cutoff or key == self._file_key or path.endswith('.gz'):
+                    continue
+                archive_path = os.path.join(self.archive_directory, f"{key}.jsonl.gz")
+                try:
+                    with open(path, 'rb') as source, gzip.open(archive_path, 'wb') as target:
+                        shutil.copyfileobj(source, target)
+                    os.remove(path)
+                except OSError as e:
+                    logger.error(f"壓縮歷史分段 {key} 失敗: {e}")
+                    continue
+                self._segments[key] = archive_path
+                self._loaded.pop(key, None)
+                archived += 1
+        if archived:
+            logger.info(f"已壓縮 {archived} 個歷史分段")
+        return archived
+
+    def _unarchive(self, key: str) -> None:
+        """有新紀錄寫入已壓縮的分段時，先解壓回一般檔案（需持有鎖）"""
+        archive_path = self._segments[key]
+        with gzip.open(archive_path, 'rb') as source, open(self._segment_path(key), 'ab') as target:
+            shutil.copyfileobj(source, target)
+        os.remove(archive_path)
+        self._segments[key] = self._segment_path(key)
+        self._loaded.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """取得分段統計資料"""
+        with self._lock:
+            return {
+                'segments': len(self._segments),
+                'archived': sum(1 for path in self._segments.values() if path.endswith('.gz')),
+                'loaded': len(self._loaded)
+            }
+
+    def close(self) -> None:
+        """關閉寫入中的分段檔案"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._file_key = None
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+# aiohttp 在發送請求時才載入，未啟用非同步用戶端時不影響啟動時間
+if TYPE_CHECKING:
+    import aiohttp
+
+from utils.rate_limit import TokenBucket
+
+logger = logging.getLogger('line_api')
+
+DEFAULT_BASE_URL = 'https://api.line.me'
+
+# 各端點每秒請求上限（LINE Messaging API 文件的頻道上限）
+ENDPOINT_RATE_LIMITS = {
+    'push': 2000,
+    'reply': 2000,
+    'profile': 2000,
+    'members_ids': 2000
+}
+
+# 可重試的 HTTP 狀態碼
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LineApiError(Exception):
+    def __init__(self, status: int, body: str):
+        super().__init__(f"LINE API 錯誤 {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+class EndpointStats:
+    """單一端點的請求統計"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'avg_latency_ms': round(self.total_latency / self.requests * 1000, 2) if self.requests else 0,
+            'max_latency_ms': round(self.max_latency * 1000, 2)
+        }
+
+
+class AsyncLineClient:
+    def __init__(self, channel_access_token: str, base_url: str = DEFAULT_BASE_URL,
+                 pool_size: int = 32, keepalive_timeout: float = 30.0, timeout: float = 10.0,
+                 max_retries: int = 3, backoff: float = 0.5, rate_limits: Optional[Dict[str, float]] = None):
+        """
+        初始化非同步 LINE API 用戶端（在獨立的事件迴圈執行緒中運作）
+        :param channel_access_token: Channel 存取權杖
+        :param base_url: API 網址（可指向本地測試用的模擬伺服器）
+        :param pool_size: 連線池大小
+        :param keepalive_timeout: 閒置連線保留秒數
+        :param timeout: 單次請求逾時秒數
+        :param max_retries: 最多重試次數
+        :param backoff: 指數退避的基礎秒數
+        :param rate_limits: 各端點每秒請求上限，預設為 ENDPOINT_RATE_LIMITS
+        """
+        self.channel_access_token = channel_access_token
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.buckets = {
+            endpoint: TokenBucket(rate)
+            for endpoint, rate in dict(ENDPOINT_RATE_LIMITS, **(rate_limits or {})).items()
+        }
+        self.endpoint_stats: Dict[str, EndpointStats] = {}
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='line-api-loop', daemon=True)
+        self._thread.start()
+
+    def submit(self, coro) -> Future:
+        """在事件迴圈中執行協程，立即回傳 Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def call(self, coro, timeout: Optional[float] = None) -> Any:
+        """在事件迴圈中執行協程並等待結果"""
+        return self.submit(coro).result(timeout)
+
+    async def _get_session(self) -> 'aiohttp.ClientSession':
+        """建立共用的連線池（需在事件迴圈中呼叫）"""
+        import aiohttp
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Authorization': f'Bearer {self.channel_access_token}'}
+            )
+        return self._session
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        """計算重試等待秒數，優先採用 Retry-After"""
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    async def request(self, endpoint: str, method: str, path: str,
+                      payload: Optional[dict] = None, params: Optional[dict] = None,
+                      headers: Optional[dict] = None, max_retries: Optional[int] = None) -> Any:
+        """
+        發送請求，遇到 429/5xx 或連線錯誤時以指數退避重試
+        :param endpoint: 端點名稱（用於限流與統計）
+        :param payload: 請求的 JSON 內容
+        :param max_retries: 最多重試次數（可選），預設使用初始化時的設定
+        :return: 回應的 JSON 內容
+        :raises LineApiError: 請求最終失敗
+        """
+        import aiohttp
+        session = await self._get_session()
+        stats = self.endpoint_stats.setdefault(endpoint, EndpointStats())
+        bucket = self.buckets.get(endpoint)
+        if max_retries is None:
+            max_retries = self.max_retries
+
+        attempt = 0
+        while True:
+            if bucket:
+                await bucket.acquire_async()
+
+            started = time.monotonic()
+            retry_after = None
+            try:
+                async with session.request(method, self.base_url + path, json=payload,
+                                           params=params, headers=headers) as response:
+                    body = await response.text()
+                    status = response.status
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, body = 0, str(e)
+            finally:
+                latency = time.monotonic() - started
+                stats.requests += 1
+                stats.total_latency += latency
+                stats.max_latency = max(stats.max_latency, latency)
+
+            if 200 <= status < 300:
+                return json.loads(body) if body else {}
+
+            if status == 429:
+                stats.rate_limited += 1
+            if (status in RETRY_STATUSES or status == 0) and attempt < max_retries:
+                stats.retries += 1
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+                attempt += 1
+                continue
+
+            stats.errors += 1
+            raise LineApiError(status, body)
+
+    async def push_messages(self, to: str, messages: List[dict]) -> Any:
+        """發送 push 訊息（重試時帶相同的 Retry Key，避免重複發送）"""
+        return await self.request(
+            'push', 'POST', '/v2/bot/message/push',
+            payload={'to': to, 'messages': messages},
+            headers={'X-Line-Retry-Key': str(uuid.uuid4())}
+        )
+
+    async def reply_messages(self, reply_token: str, messages: List[dict]) -> Any:
+        """發送 reply 訊息（reply token 只能使用一次，不重試）"""
+        return await self.request(
+            'reply', 'POST', '/v2/bot/message/reply',
+            payload={'replyToken': reply_token, 'messages': messages},
+            max_retries=0
+        )
+
+    async def get_group_member_profile(self, group_id: str, user_id: str) -> dict:
+        """取得群組成員資料"""
+        return await self.request('profile', 'GET', f'/v2/bot/group/{group_id}/member/{user_id}')
+
+    async def get_group_members_ids(self, group_id: str, start: Optional[str] = None) -> dict:
+        """取得一頁群組成員 ID"""
+        params = {'start': start} if start else None
+        return await self.request('members_ids', 'GET', f'/v2/bot/group/{group_id}/members/ids', params=params)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """取得各端點統計資料"""
+        return {endpoint: stats.to_dict() for endpoint, stats in self.endpoint_stats.items()}
+
+    def close(self) -> None:
+        """等待進行中的請求完成後，關閉連線池與事件迴圈"""
+        async def _close():
+            pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            if pending:
+                await asyncio.wait(pending, timeout=self.timeout)
+            if self._session is not None:
+                await self._session.close()
+        try:
+            self.call(_close(), timeout=self.timeout + 5)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
@@ -1,40 +1,128 @@
-from linebot import LineBotApi
-from linebot.models import (
-    TextSendMessage,
-    StickerSendMessage,
-    ImageSendMessage,
-    TemplateSendMessage,
-    ButtonsTemplate,
-    MessageAction
-)
-from linebot.exceptions import LineBotApiError
 import logging
+import threading
+from collections import Counter
 from datetime import datetime
-from linebot.v3.messaging import (
-    Configuration,
-    ApiClient,
-    MessagingApi,
-    TextMessage,
-    PushMessageRequest,
-    ReplyMessageRequest
-)
+from typing import Dict, Iterator, List, Optional, Union
+from utils.metrics import instrument
+from utils.outbox import MessageOutbox, batch_texts
+from utils.profile_cache import ProfileCache
 
 logger = logging.getLogger('line_bot')
 
+# 訊息可以是文字，或是 Messaging API 的訊息 JSON（例如 Flex 訊息）
+OutgoingMessage = Union[str, dict]
+
+
+def to_message_json(message: OutgoingMessage) -> dict:
+    """轉換成 Messaging API 的訊息 JSON"""
+    return {'type': 'text', 'text': message} if isinstance(message, str) else message
+
+
+def to_sdk_message(message: OutgoingMessage):
+    """轉換成 SDK 的訊息物件"""
+    from linebot.v3.messaging import Message, TextMessage
+    return TextMessage(text=message) if isinstance(message, str) else Message.from_dict(message)
+
 class LineBotManager:
-    def __init__(self, channel_access_token: str):
-        """初始化 LINE Bot 管理器"""
-        configuration = Configuration(access_token=channel_access_token)
-        self.client = ApiClient(configuration)
-        self.api = MessagingApi(self.client)
+    def __init__(self, channel_access_token: str, outbox_window: float = 0, async_client=None,
+                 profile_cache_size: int = 10000, profile_cache_ttl: float = 3600, metrics=None,
+                 api_endpoint: Optional[str] = None):
+        """
+        初始化 LINE Bot 管理器
+        :param channel_access_token: Channel 存取權杖
+        :param outbox_window: 合併同一目標訊息的等待秒數（0 表示立即發送）
+        :param async_client: 非同步 API 用戶端（可選），設定後 push 不再阻塞呼叫端
+        :param profile_cache_size: 成員資料快取筆數（0 表示不快取）
+        :param profile_cache_ttl: 成員資料快取秒數
+        :param metrics: 指標註冊表（可選），記錄各端點的請求時間與錯誤次數
+        :param api_endpoint: API 網址（可選，例如本地測試用的模擬伺服器），預設為 SDK 的設定
+        """
+        # 同步 SDK 載入約需 1 秒，第一次使用（或 warm_up）時才載入；使用非同步用戶端時通常不需要
+        self.channel_access_token = channel_access_token
+        self.api_endpoint = api_endpoint
+        self.client = None
+        self._api = None
+        self._api_lock = threading.Lock()
+        self.async_client = async_client
+        self._api_latency = None
+        self._api_errors = None
+        if metrics is not None:
+            self._instrument(metrics)
+        self.profile_cache = None
+        if profile_cache_size > 0:
+            self.profile_cache = ProfileCache(
+                self._fetch_group_member_profile,
+                maxsize=profile_cache_size,
+                ttl=profile_cache_ttl
+            )
+        self.delivery_stats = Counter()
+        self._stats_lock = threading.Lock()
+        self.outbox = None
+        if outbox_window > 0:
+            self.outbox = MessageOutbox(self.push_messages, outbox_window)
+            self.outbox.start()
+
+    def _instrument(self, metrics) -> None:
+        """以端點名稱記錄 LINE API 的請求時間與錯誤（例外在此處的 try/except 吞掉前就會被記錄）"""
+        latency = metrics.histogram('linebot_line_api_seconds', 'LINE API 請求時間（含重試）', ('endpoint',))
+        errors = metrics.counter('linebot_line_api_errors_total', 'LINE API 請求失敗次數', ('endpoint',))
+        # 同步 SDK 的方法在建立用戶端時才包裝
+        self._api_latency = latency
+        self._api_errors = errors
+        if self.async_client:
+            instrument(self.async_client, 'request', latency, lambda endpoint, *args, **kwargs: (endpoint,), errors)
+
+    @property
+    def api(self):
+        """同步 SDK 的 MessagingApi（第一次使用時建立）"""
+        api = self._api
+        if api is None:
+            api = self.warm_up()
+        return api
+
+    def warm_up(self):
+        """載入同步 SDK 並建立用戶端（可在背景預先執行，避免第一個請求等待載入）"""
+        with self._api_lock:
+            if self._api is None:
+                from linebot.v3.messaging import ApiClient, Configuration, MessagingApi
+                configuration = Configuration(access_token=self.channel_access_token, host=self.api_endpoint)
+                self.client = ApiClient(configuration)
+                api = MessagingApi(self.client)
+                for method, endpoint in (('push_message', 'push'), ('reply_message', 'reply'),
+                                         ('get_group_member_profile', 'profile'),
+                                         ('get_group_members_ids', 'members_ids')):
+                    instrument(api, method, self._api_latency, (endpoint,), self._api_errors)
+                self._api = api
+            return self._api
+
+    def close(self) -> None:
+        """送出尚未發送的訊息並關閉連線"""
+        if self.outbox:
+            self.outbox.close()
+        if self.async_client:
+            self.async_client.close()
 
     def send_message(self, to: str, text: str) -> bool:
-        """發送訊息到指定目標"""
+        """發送訊息到指定目標（啟用合併發送時只排入佇列）"""
+        if self.outbox:
+            self.outbox.put(to, text)
+            return True
+        return all(self.push_messages(to, texts) for texts in batch_texts([text]))
+
+    def push_messages(self, to: str, texts: List[OutgoingMessage]) -> bool:
+        """以一次請求發送多則訊息（最多 5 則）"""
+        if self.async_client:
+            future = self.async_client.submit(
+                self.async_client.push_messages(to, [to_message_json(text) for text in texts])
+            )
+            future.add_done_callback(self._log_async_failure)
+            return True
         try:
+            from linebot.v3.messaging import PushMessageRequest
             self.api.push_message(
                 PushMessageRequest(
                     to=to,
-                    messages=[TextMessage(text=text)]
+                    messages=[to_sdk_message(text) for text in texts]
                 )
             )
             return True
@@ -44,11 +132,26 @@ class LineBotManager:
 
     def reply_message(self, reply_token: str, text: str) -> bool:
         """回覆訊息"""
+        return self.reply_messages(reply_token, [text])
+
+    def reply_messages(self, reply_token: str, texts: List[OutgoingMessage]) -> bool:
+        """以 reply token 回覆多則訊息（最多 5 則，不佔用 push 額度）"""
+        if self.async_client:
+            try:
+                self.async_client.call(
+                    self.async_client.reply_messages(reply_token, [to_message_json(text) for text in texts]),
+                    timeout=self.async_client.timeout
+                )
+                return True
+            except Exception as e:
+                print(f"回覆訊息失敗: {e}")
+                return False
         try:
+            from linebot.v3.messaging import ReplyMessageRequest
             self.api.reply_message(
                 ReplyMessageRequest(
                     reply_token=reply_token,
-                    messages=[TextMessage(text=text)]
+                    messages=[to_sdk_message(text) for text in texts]
                 )
             )
             return True
@@ -56,6 +159,18 @@ class LineBotManager:
             print(f"回覆訊息失敗: {e}")
             return False
 
+    @staticmethod
+    def _log_async_failure(future) -> None:
+        """記錄非同步發送的失敗"""
+        error = future.exception()
+        if error:
+            print(f"發送訊息失敗: {error}")
+
+    def record_delivery(self, via: str) -> None:
+        """記錄回應使用的發送方式"""
+        with self._stats_lock:
+            self.delivery_stats[via] += 1
+
     def send_warning(self, to: str, message: str) -> bool:
         """發送警告訊息"""
         warning_message = f"""
@@ -65,6 +180,9 @@ class LineBotManager:
 時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         try:
+            # 舊版（v2）SDK 的訊息類別很少用到，使用時才載入
+            from linebot.models import StickerSendMessage, TextSendMessage
+            from linebot.v3.messaging import PushMessageRequest
             messages = [
                 TextSendMessage(text=warning_message),
                 StickerSendMessage(
@@ -90,6 +208,8 @@ class LineBotManager:
     def send_confirmation(self, to: str, message: str, actions: list) -> bool:
         """發送確認按鈕訊息"""
         try:
+            from linebot.models import ButtonsTemplate, MessageAction, TemplateSendMessage
+            from linebot.v3.messaging import PushMessageRequest
             message_actions = [MessageAction(label=label, text=text) 
                              for label, text in actions]
             
@@ -114,18 +234,67 @@ class LineBotManager:
             print(f"發送確認訊息失敗: {e}")
             return False
 
+    def iter_group_member_ids(self, group_id: str) -> Iterator[str]:
+        """
+        逐頁讀取群組成員 ID（依 next 繼續讀取下一頁，讀到才發出請求）
+        :raises Exception: 查詢失敗
+        """
+        start = None
+        while True:
+            if self.async_client:
+                page = self.async_client.call(
+                    self.async_client.get_group_members_ids(group_id, start),
+                    timeout=self.async_client.timeout
+                )
+                member_ids, start = page.get('memberIds', []), page.get('next')
+            else:
+                page = self.api.get_group_members_ids(group_id, start=start)
+                member_ids, start = page.member_ids, page.next
+            yield from member_ids
+            if not start:
+                return
+
     def get_group_member_ids(self, group_id: str) -> list:
-        """獲取群組成員 ID 列表"""
+        """獲取群組成員 ID 列表（所有分頁）"""
         try:
-            member_ids = self.api.get_group_member_ids(group_id)
-            return member_ids
+            return list(self.iter_group_member_ids(group_id))
         except Exception as e:
             print(f"獲取群組成員失敗: {e}")
             return []
 
     def get_group_member_profile(self, group_id: str, user_id: str) -> dict:
-        """取得群組成員資料"""
+        """取得群組成員資料（有快取時優先使用快取）"""
+        if self.profile_cache:
+            return self.profile_cache.get(group_id, user_id)
+        try:
+            return self._fetch_group_member_profile(group_id, user_id)
+        except Exception as e:
+            print(f"取得群組成員資料失敗: {e}")
+            return None
+
+    def prefetch_group_member_profiles(self, group_id: str, user_ids: list) -> Dict[str, dict]:
+        """批次取得多位群組成員資料"""
+        if self.profile_cache:
+            return self.profile_cache.prefetch(group_id, user_ids)
+        return {user_id: self.get_group_member_profile(group_id, user_id) for user_id in user_ids}
+
+    def _fetch_group_member_profile(self, group_id: str, user_id: str) -> Optional[dict]:
+        """
+        向 LINE 查詢群組成員資料
+        :return: 成員資料，成員不存在（404）時回傳 None
+        :raises Exception: 其他查詢錯誤
+        """
         try:
+            if self.async_client:
+                profile = self.async_client.call(
+                    self.async_client.get_group_member_profile(group_id, user_id),
+                    timeout=self.async_client.timeout
+                )
+                return {
+                    'user_id': profile.get('userId'),
+                    'display_name': profile.get('displayName'),
+                    'picture_url': profile.get('pictureUrl')
+                }
             profile = self.api.get_group_member_profile(group_id, user_id)
             return {
                 'user_id': profile.user_id,
@@ -133,14 +302,7 @@ class LineBotManager:
                 'picture_url': profile.picture_url
             }
         except Exception as e:
+            if getattr(e, 'status', None) == 404:
+                return None
             print(f"取得群組成員資料失敗: {e}")
-            return None
-
-    def kick_user(self, group_id: str, user_id: str) -> bool:
-        """將用戶踢出群組"""
-        try:
-            self.api.leave_group_v2(group_id, user_id)
-            return True
-        except Exception as e:
-            print(f"踢出用戶失敗: {e}")
-            return False 
\ No newline at end of file
+            raise
@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+
+class MembershipIndex:
+    def __init__(self):
+        """
+        初始化群組成員索引
+        由成員加入/離開事件逐步維護；只有經過 sync 的群組才保證成員完整
+        """
+        self._members: Dict[str, Set[str]] = {}   # group_id -> set of user_ids
+        self._synced_at: Dict[str, float] = {}    # group_id -> 最後完整同步時間
+        self._lock = threading.Lock()
+
+    def add_members(self, group_id: str, user_ids: Iterable[str]) -> None:
+        """新增群組成員"""
+        with self._lock:
+            self._members.setdefault(group_id, set()).update(user_ids)
+
+    def remove_members(self, group_id: str, user_ids: Iterable[str]) -> None:
+        """移除群組成員"""
+        with self._lock:
+            members = self._members.get(group_id)
+            if members is not None:
+                members.difference_update(user_ids)
+
+    def drop_group(self, group_id: str) -> None:
+        """移除整個群組（機器人離開群組時）"""
+        with self._lock:
+            self._members.pop(group_id, None)
+            self._synced_at.pop(group_id, None)
+
+    def sync(self, group_id: str, user_ids: Iterable[str]) -> int:
+        """
+        以完整的成員列表取代索引內容
+        :param user_ids: 成員 ID（可為逐頁讀取的產生器）
+        :return: 成員數量
+        """
+        members = set(user_ids)
+        with self._lock:
+            self._members[group_id] = members
+            self._synced_at[group_id] = time.time()
+        return len(members)
+
+    def is_synced(self, group_id: str, max_age: Optional[float] = None) -> bool:
+        """群組是否已完整同步（且未超過 max_age 秒）"""
+        synced_at = self._synced_at.get(group_id)
+        if synced_at is None:
+            return False
+        return max_age is None or time.time() - synced_at <= max_age
+
+    def is_member(self, group_id: str, user_id: str) -> bool:
+        return user_id in self._members.get(group_id, ())
+
+    def member_count(self, group_id: str) -> int:
+        return len(self._members.get(group_id, ()))
+
+    def members(self, group_id: str) -> Set[str]:
+        """取得群組成員（複本）"""
+        with self._lock:
+            return set(self._members.get(group_id, ()))
+
+    def groups(self) -> Set[str]:
+        """取得所有已知群組"""
+        with self._lock:
+            return set(self._members)
+
+    def stats(self) -> Dict[str, int]:
+        """取得索引統計資料"""
+        with self._lock:
+            return {
+                'groups': len(self._members),
+                'synced_groups': len(self._synced_at),
+                'members': sum(len(members) for members in self._members.values())
+            }
@@ -0,0 +1,244 @@
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# 預設的延遲分桶（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheus 文字格式的 Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """只會增加的計數器"""
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: LabelValues = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.label_names, values)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        分桶統計（例如延遲）
+        :param buckets: 各分桶的上限，由小到大排列
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # 每個執行緒各自累計（熱路徑不需要鎖），輸出時才合併
+        # 各分片：標籤值 -> [各分桶次數..., +Inf 分桶次數, 總和, 次數]
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, list]] = []
+        self._lock = threading.Lock()
+
+    def _new_shard(self) -> Dict[LabelValues, list]:
+        shard = self._local.shard = {}
+        with self._lock:
+            self._shards.append(shard)
+        return shard
+
+    def observe(self, value: float, label_values: LabelValues = ()) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        child = shard.get(label_values)
+        if child is None:
+            child = shard[label_values] = [0] * (len(self.buckets) + 3)
+        # 只記錄落在哪一個分桶，輸出時才累加成 Prometheus 的累積分桶
+        child[bisect_left(self.buckets, value)] += 1
+        child[-2] += value
+        child[-1] += 1
+
+    def _merged(self) -> Dict[LabelValues, list]:
+        """合併所有執行緒的分片（dict.copy 與 list() 在 GIL 下不會讀到一半的資料）"""
+        with self._lock:
+            shards = list(self._shards)
+        merged: Dict[LabelValues, list] = {}
+        for shard in shards:
+            for values, child in shard.copy().items():
+                total = merged.get(values)
+                if total is None:
+                    merged[values] = list(child)
+                else:
+                    for i, count in enumerate(child):
+                        total[i] += count
+        return merged
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for values, child in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child):
+                cumulative += count
+                labels = _format_labels(self.label_names, values, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(child[-2])}')
+            lines.append(f'{self.name}_count{labels} {child[-1]}')
+        return '\n'.join(lines)
+
+
+class CallbackMetric:
+    def __init__(self, name: str, documentation: str, func: Callable, metric_type: str = 'gauge',
+                 label_names: Sequence[str] = ()):
+        """
+        輸出時才讀取的數值（例如佇列深度，或各元件已有的統計）
+        :param func: 回傳數值；有標籤時回傳 {標籤值 tuple: 數值}
+        :param metric_type: gauge 或 counter
+        """
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names)
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        value = self.func()
+        items = sorted(value.items()) if self.label_names else [((), value)]
+        for values, number in items:
+            lines.append(f'{self.name}{_format_labels(self.label_names, values)} {_format_value(number)}')
+        return '\n'.join(lines)
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        """
+        指標註冊表；停用時不建立任何指標，timed/instrument 也不會包裝函式
+        :param enabled: 是否啟用
+        """
+        self.enabled = enabled
+        self._metrics: Dict[str, Union[Counter, Histogram, CallbackMetric]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # 同名指標只建立一次（例如多個元件共用同一個直方圖）
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Optional[Counter]:
+        if not self.enabled:
+            return None
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Optional[Histogram]:
+        if not self.enabled:
+            return None
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def callback(self, name: str, documentation: str, func: Callable, metric_type: str = 'gauge',
+                 label_names: Sequence[str] = ()) -> None:
+        if self.enabled:
+            self._register(CallbackMetric(name, documentation, func, metric_type, label_names))
+
+    def render(self) -> str:
+        """輸出 Prometheus 文字格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+def timed(histogram: Optional[Histogram], labels: Union[LabelValues, Callable] = (),
+          errors: Optional[Counter] = None) -> Callable:
+    """
+    記錄函式執行時間的裝飾器；histogram 為 None（指標停用）時直接回傳原函式，沒有任何額外成本
+    :param labels: 標籤值，或由呼叫參數產生標籤值的函式
+    :param errors: 函式拋出例外時增加的計數器（可選）
+    """
+    def decorator(func):
+        if histogram is None:
+            return func
+        observe = histogram.observe
+        perf_counter = time.perf_counter
+
+        if callable(labels) or asyncio.iscoroutinefunction(func):
+            label_of = labels if callable(labels) else (lambda *args, **kwargs: labels)
+
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    started = perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception:
+                        if errors is not None:
+                            errors.inc(label_of(*args, **kwargs))
+                        raise
+                    finally:
+                        observe(perf_counter() - started, label_of(*args, **kwargs))
+                return async_wrapper
+
+            @functools.wraps(func)
+            def labeled_wrapper(*args, **kwargs):
+                started = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    if errors is not None:
+                        errors.inc(label_of(*args, **kwargs))
+                    raise
+                finally:
+                    observe(perf_counter() - started, label_of(*args, **kwargs))
+            return labeled_wrapper
+
+        # 固定標籤（最常見的情況）不需要每次呼叫都產生標籤值
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(labels)
+                raise
+            finally:
+                observe(perf_counter() - started, labels)
+        return wrapper
+    return decorator
+
+
+def instrument(obj, attr: str, histogram: Optional[Histogram], labels: Union[LabelValues, Callable] = (),
+               errors: Optional[Counter] = None) -> None:
+    """將物件的方法換成 timed 包裝後的版本（只影響此物件）；指標停用時不做任何事"""
+    if histogram is not None:
+        setattr(obj, attr, timed(histogram, labels, errors)(getattr(obj, attr)))
@@ -0,0 +1,141 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+logger = logging.getLogger('outbox')
+
+# LINE Messaging API 限制
+MAX_MESSAGES_PER_REQUEST = 5
+MAX_TEXT_LENGTH = 5000
+
+
+def split_text(text: str, limit: int = MAX_TEXT_LENGTH) -> List[str]:
+    """將過長的文字切成多段，盡量在換行處切開"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def batch_texts(texts: List) -> List[List]:
+    """將文字切段後依每次請求的訊息上限分組（非文字的訊息 JSON 原樣保留）"""
+    chunks = [chunk for text in texts for chunk in (split_text(text) if isinstance(text, str) else [text])]
+    return [chunks[i:i + MAX_MESSAGES_PER_REQUEST]
+            for i in range(0, len(chunks), MAX_MESSAGES_PER_REQUEST)]
+
+
+class MessageOutbox:
+    def __init__(self, send_batch: Callable[[str, List[str]], bool], window: float = 0.5):
+        """
+        初始化訊息發送佇列
+        :param send_batch: 實際發送函式，參數為 (目標, 最多 5 則文字)
+        :param window: 合併同一目標訊息的等待秒數
+        """
+        self.send_batch = send_batch
+        self.window = window
+        self._pending: Dict[str, List[str]] = OrderedDict()  # to -> 待發送的文字
+        self._deadlines: Dict[str, float] = {}                 # to -> 最晚發送時間
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        # 統計資料
+        self.messages = 0
+        self.requests = 0
+        self.failed_requests = 0
+
+    def start(self) -> None:
+        """啟動背景發送執行緒"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='message-outbox', daemon=True)
+        self._thread.start()
+
+    def put(self, to: str, text: str) -> None:
+        """排入一則訊息，同一目標的訊息會在時間窗內合併發送"""
+        chunks = split_text(text)
+        with self._cond:
+            if to not in self._pending:
+                self._pending[to] = []
+                self._deadlines[to] = time.monotonic() + self.window
+            self._pending[to].extend(chunks)
+            self.messages += len(chunks)
+            if len(self._pending[to]) >= MAX_MESSAGES_PER_REQUEST:
+                self._deadlines[to] = 0.0
+            self._cond.notify()
+
+    def _take_ready(self, now: float, force: bool = False) -> List[tuple]:
+        """取出已到期的批次（需持有鎖）"""
+        batches = []
+        for to in list(self._pending):
+            if not force and self._deadlines[to] > now:
+                continue
+            texts = self._pending.pop(to)
+            del self._deadlines[to]
+            for i in range(0, len(texts), MAX_MESSAGES_PER_REQUEST):
+                batches.append((to, texts[i:i + MAX_MESSAGES_PER_REQUEST]))
+        return batches
+
+    def _send(self, batches: List[tuple]) -> None:
+        """在鎖外發送批次"""
+        for to, texts in batches:
+            ok = False
+            try:
+                ok = self.send_batch(to, texts)
+            except Exception as e:
+                logger.error(f"發送訊息失敗: {e}")
+            with self._cond:
+                self.requests += 1
+                if not ok:
+                    self.failed_requests += 1
+
+    def _run(self) -> None:
+        """背景發送迴圈"""
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                now = time.monotonic()
+                earliest = min(self._deadlines.values())
+                if earliest > now:
+                    self._cond.wait(earliest - now)
+                    continue
+                batches = self._take_ready(now)
+            self._send(batches)
+
+    def flush(self) -> None:
+        """立即發送所有待發送訊息"""
+        with self._cond:
+            batches = self._take_ready(time.monotonic(), force=True)
+        self._send(batches)
+
+    def close(self) -> None:
+        """停止背景執行緒並送出剩餘訊息"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """取得發送統計資料"""
+        with self._cond:
+            return {
+                'messages': self.messages,
+                'requests': self.requests,
+                'failed_requests': self.failed_requests,
+                'pending': sum(len(texts) for texts in self._pending.values())
+            }
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# 查詢失敗（非 404）時不快取，等待中的呼叫者最多等這麼久
+INFLIGHT_TIMEOUT = 15.0
+
+
+class ProfileCache:
+    def __init__(self, fetch: Callable[[str, str], Optional[dict]], maxsize: int = 10000,
+                 ttl: float = 3600, negative_ttl: float = 300):
+        """
+        初始化群組成員資料快取（LRU + TTL）
+        :param fetch: 實際查詢函式，找不到成員時回傳 None，其他錯誤則拋出例外
+        :param maxsize: 最多快取筆數
+        :param ttl: 資料有效秒數
+        :param negative_ttl: 「找不到成員」結果的有效秒數
+        """
+        self.fetch = fetch
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[float, Optional[dict]]]' = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], threading.Event] = {}
+        self._lock = threading.Lock()
+
+        # 統計資料
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Tuple[str, str], now: float):
+        """查詢快取（需持有鎖），回傳 (是否命中, 資料)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, profile = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, profile
+
+    def _store(self, key: Tuple[str, str], profile: Optional[dict]) -> None:
+        """寫入快取並淘汰最久未使用的資料（需持有鎖）"""
+        ttl = self.ttl if profile is not None else self.negative_ttl
+        self._entries[key] = (time.monotonic() + ttl, profile)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, group_id: str, user_id: str) -> Optional[dict]:
+        """取得成員資料，同一成員同時只會有一個查詢"""
+        key = (group_id, user_id)
+        with self._lock:
+            hit, profile = self._lookup(key, time.monotonic())
+            if hit:
+                self.hits += 1
+                if profile is None:
+                    self.negative_hits += 1
+                return profile
+
+            event = self._inflight.get(key)
+            if event is None:
+                event = self._inflight[key] = threading.Event()
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+
+        if not owner:
+            event.wait(INFLIGHT_TIMEOUT)
+            with self._lock:
+                return self._lookup(key, time.monotonic())[1]
+
+        try:
+            profile = self.fetch(group_id, user_id)
+            with self._lock:
+                self._store(key, profile)
+            return profile
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def prefetch(self, group_id: str, user_ids: Iterable[str], max_workers: int = 8) -> Dict[str, Optional[dict]]:
+        """
+        批次預先載入多位成員的資料
+        :return: user_id -> 成員資料
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(user_ids))) as executor:
+            profiles = executor.map(lambda user_id: self.get(group_id, user_id), user_ids)
+            return dict(zip(user_ids, profiles))
+
+    def invalidate(self, group_id: str, user_id: str) -> None:
+        """移除單一成員的快取（例如成員加入或離開時）"""
+        with self._lock:
+            self._entries.pop((group_id, user_id), None)
+
+    def stats(self) -> Dict[str, float]:
+        """取得快取統計資料"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'negative_hits': self.negative_hits,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,116 @@
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+from utils.outbox import MAX_TEXT_LENGTH
+
+# 每頁顯示的筆數（Flex carousel 最多 12 個 bubble）
+PAGE_SIZE = 10
+
+# 單一欄位顯示的最大字數
+MAX_FIELD_LENGTH = 200
+
+TRUNCATED_NOTICE = '…（內容過長，已截斷）'
+
+
+class Page:
+    __slots__ = ('items', 'number', 'pages', 'total')
+
+    def __init__(self, items: List, number: int, total: int, page_size: int = PAGE_SIZE):
+        self.items = items
+        self.number = number
+        self.total = total
+        self.pages = max(1, -(-total // page_size))
+
+    @property
+    def has_next(self) -> bool:
+        return self.number < self.pages
+
+
+def page_offset(page: Optional[int], total: int, page_size: int = PAGE_SIZE) -> Tuple[int, int]:
+    """
+    將頁數限制在有效範圍內
+    :return: (頁數, 起始位置)
+    """
+    pages = max(1, -(-total // page_size))
+    number = min(max(1, page or 1), pages)
+    return number, (number - 1) * page_size
+
+
+def render_block(fields: Sequence[Tuple[str, str]]) -> str:
+    """將一筆資料的欄位轉成文字，過長的欄位會被截斷"""
+    return '\n' + '\n'.join(f"{label}: {str(value)[:MAX_FIELD_LENGTH]}" for label, value in fields)
+
+
+def render_text(header: str, blocks: Iterable[str], footer: str = '', limit: int = MAX_TEXT_LENGTH) -> str:
+    """
+    以 join 組合訊息，超過字數上限前停止並加上截斷提示
+    :param blocks: 每筆資料的文字
+    """
+    parts = [header]
+    budget = limit - len(header) - len(footer) - len(TRUNCATED_NOTICE) - 2
+    for block in blocks:
+        budget -= len(block) + 1
+        if budget < 0:
+            parts.append(TRUNCATED_NOTICE)
+            break
+        parts.append(block)
+    if footer:
+        parts.append(footer)
+    return '\n'.join(parts)
+
+
+def page_footer(page: Page, command: str) -> str:
+    """頁碼與下一頁的指令提示"""
+    footer = f"\n第 {page.number}/{page.pages} 頁，共 {page.total} 筆"
+    if page.has_next:
+        footer += f"\n輸入 {command} {page.number + 1} 查看下一頁"
+    return footer
+
+
+def render_carousel(title: str, page: Page, fields: Callable[[object], Sequence[Tuple[str, str]]],
+                    command: Optional[str] = None) -> dict:
+    """
+    將一頁資料轉成 Flex carousel，每筆資料一個 bubble
+    :param fields: 將一筆資料轉成 (欄位名稱, 內容) 列表
+    :param command: 下一頁的指令（可選），最後一個 bubble 會附上「下一頁」按鈕
+    """
+    bubbles = []
+    for i, item in enumerate(page.items, 1):
+        rows = [
+            {
+                'type': 'box',
+                'layout': 'baseline',
+                'spacing': 'sm',
+                'contents': [
+                    {'type': 'text', 'text': label, 'size': 'sm', 'color': '#888888', 'flex': 2},
+                    {'type': 'text', 'text': str(value)[:MAX_FIELD_LENGTH] or '-', 'size': 'sm',
+                     'wrap': True, 'flex': 5}
+                ]
+            }
+            for label, value in fields(item)
+        ]
+        bubbles.append({
+            'type': 'bubble',
+            'size': 'kilo',
+            'header': {
+                'type': 'box',
+                'layout': 'vertical',
+                'contents': [{'type': 'text', 'text': title, 'weight': 'bold'}]
+            },
+            'body': {'type': 'box', 'layout': 'vertical', 'spacing': 'sm', 'contents': rows}
+        })
+
+    if bubbles:
+        footer_text = f"第 {page.number}/{page.pages} 頁，共 {page.total} 筆"
+        footer = {
+            'type': 'box',
+            'layout': 'vertical',
+            'contents': [{'type': 'text', 'text': footer_text, 'size': 'xs', 'color': '#888888'}]
+        }
+        if command and page.has_next:
+            footer['contents'].append({
+                'type': 'button',
+                'style': 'link',
+                'height': 'sm',
+                'action': {'type': 'message', 'label': '下一頁', 'text': f"{command} {page.number + 1}"}
+            })
+        bubbles[-1]['footer'] = footer
+    return {'type': 'carousel', 'contents': bubbles}
@@ -0,0 +1,67 @@
+import time
+from typing import List, Optional, Union
+from utils.outbox import batch_texts
+
+# LINE 的 reply token 約一分鐘內有效，保留一些緩衝
+REPLY_TOKEN_TTL = 50
+
+
+class ResponseContext:
+    def __init__(self, line_bot, event, reply_ttl: float = REPLY_TOKEN_TTL):
+        """
+        初始化回應內容
+        :param line_bot: LINE Bot 管理器
+        :param event: 觸發回應的事件
+        :param reply_ttl: reply token 視為有效的秒數
+        """
+        self.line_bot = line_bot
+        self.event = event
+        self.group_id = event.source.group_id
+        self.user_id = event.source.user_id
+        self.reply_token = getattr(event, 'reply_token', None)
+        self.received_at = event.timestamp / 1000 if getattr(event, 'timestamp', None) else time.time()
+        self.reply_ttl = reply_ttl
+        self.reply_used = False
+        self.via: Optional[str] = None  # 實際使用的發送方式：reply、push 或 reply+push
+        self.messages: List[Union[str, dict]] = []
+
+    def send(self, text: str) -> None:
+        """加入一則回應訊息，於 flush 時一併送出"""
+        self.messages.append(text)
+
+    def send_flex(self, alt_text: str, contents: dict) -> None:
+        """加入一則 Flex 訊息"""
+        self.messages.append({'type': 'flex', 'altText': alt_text, 'contents': contents})
+
+    def can_reply(self) -> bool:
+        """reply token 是否仍可使用"""
+        return (self.reply_token is not None
+                and not self.reply_used
+                and time.time() - self.received_at < self.reply_ttl)
+
+    def flush(self) -> Optional[str]:
+        """
+        送出所有回應訊息：優先使用 reply，逾期、失敗或超過 5 則的部分改用 push
+        :return: 此次使用的發送方式
+        """
+        if not self.messages:
+            return None
+        texts, self.messages = self.messages, []
+        batches = batch_texts(texts)
+
+        via = None
+        if self.can_reply():
+            self.reply_used = True
+            if self.line_bot.reply_messages(self.reply_token, batches[0]):
+                batches.pop(0)
+                via = 'reply'
+
+        if batches:
+            # 已依每次請求的上限分組，每組以一次 push 送出
+            for batch in batches:
+                self.line_bot.push_messages(self.group_id, batch)
+            via = 'reply+push' if via else 'push'
+
+        self.via = via
+        self.line_bot.record_delivery(via)
+        return via
@@ -0,0 +1,117 @@
+import heapq
+import itertools
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger('scheduler')
+
+
+class Scheduler:
+    def __init__(self, workers: int = 2):
+        """
+        初始化排程器：以最小堆積依到期時間排序，新增與取消皆為 O(log n)
+        到期時間使用牆上時鐘（epoch 秒），可由持久化的時間戳記直接推算
+        :param workers: 執行到期工作的執行緒數量（避免長時間的工作延遲其他計時器）
+        """
+        self._heap = []  # (到期時間, 序號, 鍵)
+        self._jobs: Dict[Hashable, tuple] = {}  # 鍵 -> (到期時間, 序號, 工作)
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduler-job')
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+        # 統計資料
+        self.executed = 0
+        self.failed = 0
+
+    def schedule(self, key: Hashable, when: float, func: Callable[[], None]) -> None:
+        """
+        排定工作；同一個鍵已有排程時會被取代
+        :param when: 到期時間（epoch 秒）
+        """
+        with self._condition:
+            entry = (when, next(self._counter), func)
+            self._jobs[key] = entry
+            heapq.heappush(self._heap, (when, entry[1], key))
+            # 被取代或取消的項目過多時重建堆積，避免無限成長
+            if len(self._heap) > 2 * len(self._jobs) + 64:
+                self._heap = [(when, seq, key) for key, (when, seq, _) in self._jobs.items()]
+                heapq.heapify(self._heap)
+            # 新工作比目前等待的更早到期時喚醒排程執行緒
+            if self._heap[0][1] == entry[1]:
+                self._condition.notify()
+
+    def schedule_every(self, key: Hashable, interval: float, func: Callable[[], None]) -> None:
+        """定期執行工作（上一次執行結束後才排定下一次）"""
+        def run():
+            try:
+                func()
+            finally:
+                if not self._stopped:
+                    self.schedule(key, time.time() + interval, run)
+        self.schedule(key, time.time() + interval, run)
+
+    def cancel(self, key: Hashable) -> bool:
+        """取消工作；堆積中的項目在取出時才略過（延遲刪除）"""
+        with self._condition:
+            return self._jobs.pop(key, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def start(self) -> None:
+        """啟動排程執行緒"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    # 清除已取消或已被取代的項目
+                    while self._heap and self._jobs.get(self._heap[0][2], (None, None))[1] != self._heap[0][1]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if self._stopped:
+                    return
+                _, _, key = heapq.heappop(self._heap)
+                _, _, func = self._jobs.pop(key)
+            self._executor.submit(self._execute, key, func)
+
+    def _execute(self, key: Hashable, func: Callable[[], None]) -> None:
+        try:
+            func()
+            self.executed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"排程工作 {key} 執行失敗: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """取得排程統計資料"""
+        with self._condition:
+            return {
+                'pending': len(self._jobs),
+                'heap_size': len(self._heap),
+                'executed': self.executed,
+                'failed': self.failed
+            }
+
+    def stop(self) -> None:
+        """停止排程執行緒，等待執行中的工作結束"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(5)
+        self._executor.shutdown(wait=True)
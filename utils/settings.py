@@ -0,0 +1,86 @@
+import threading
+from typing import Any, Dict, List
+from utils.storage import JsonFileStore
+
+
+class GroupSettings:
+    def __init__(self, store=None, autoload: bool = True):
+        """
+        各群組的設定值（例如警告有效期限）
+        :param store: 儲存後端（可選），預設為 data/settings.json
+        :param autoload: 是否在建立時載入設定（否則需另外呼叫 load）
+        """
+        self.settings_file = "data/settings.json"
+        self.store = store or JsonFileStore(self.settings_file)
+        self.settings: Dict[str, Dict[str, Any]] = {}  # group_id -> 設定名稱 -> 值
+        self._lock = threading.RLock()
+        if autoload:
+            self.load()
+
+    def load(self) -> None:
+        """載入群組設定（未在建立時載入時呼叫）"""
+        with self._lock:
+            self._load_settings()
+
+    def _load_settings(self) -> None:
+        """從儲存後端載入群組設定"""
+        try:
+            self._restore(*self.store.load())
+        except Exception as e:
+            print(f"載入群組設定時發生錯誤: {e}")
+            self.settings = {}
+
+    def reload(self) -> bool:
+        """重新載入其他 worker 寫入的異動；讀取失敗時保留目前的設定"""
+        try:
+            data, records = self.store.load()
+        except Exception as e:
+            print(f"重新載入群組設定時發生錯誤: {e}")
+            return False
+        with self._lock:
+            self._restore(data, records)
+        return True
+
+    def _restore(self, data, records: List[Dict]) -> None:
+        """以儲存後端的資料取代記憶體中的設定"""
+        self.settings = data or {}
+        for record in records:
+            self._apply(record)
+
+    def _apply(self, record: Dict) -> None:
+        """將一筆異動套用到記憶體中的設定"""
+        group = self.settings.setdefault(record['group_id'], {})
+        if record['action'] == 'set':
+            group[record['key']] = record['value']
+        elif record['action'] == 'unset':
+            group.pop(record['key'], None)
+            if not group:
+                del self.settings[record['group_id']]
+
+    def _commit(self, record: Dict) -> None:
+        """套用並寫入一筆異動"""
+        with self._lock:
+            self._apply(record)
+            try:
+                if self.store.append(record):
+                    self.store.compact(self.settings)
+            except Exception as e:
+                print(f"儲存群組設定時發生錯誤: {e}")
+
+    def get(self, group_id: str, key: str, default: Any = None) -> Any:
+        """取得群組設定，未設定時回傳 default"""
+        return self.settings.get(group_id, {}).get(key, default)
+
+    def set(self, group_id: str, key: str, value: Any) -> None:
+        """設定群組設定值"""
+        self._commit({'action': 'set', 'group_id': group_id, 'key': key, 'value': value})
+
+    def unset(self, group_id: str, key: str) -> None:
+        """移除群組設定值（恢復預設）"""
+        with self._lock:
+            if key in self.settings.get(group_id, {}):
+                self._commit({'action': 'unset', 'group_id': group_id, 'key': key})
+
+    def groups_with(self, key: str) -> Dict[str, Any]:
+        """取得有設定此項目的群組與其值"""
+        return {group_id: values[key] for group_id, values in self.settings.items() if key in values}
@@ -0,0 +1,124 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# 網址與 LINE 群組/帳號邀請連結
+URL_PATTERN = re.compile(r'https?://|www\.', re.IGNORECASE)
+INVITE_PATTERN = re.compile(r'line\.me/(?:R/)?ti/|lin\.ee/', re.IGNORECASE)
+
+
+def parse_window(spec: str) -> Tuple[int, float]:
+    """解析「次數/秒數」設定，例如 8/10 表示 10 秒內 8 次"""
+    count, seconds = spec.split('/')
+    return int(count), float(seconds)
+
+
+class _UserState:
+    """單一用戶在單一群組的滑動視窗（固定大小的環狀緩衝區）"""
+    __slots__ = ('times', 'position', 'links', 'link_position', 'last_hash', 'last_seen', 'repeats')
+
+    def __init__(self, flood_count: int):
+        self.times = [None] * flood_count
+        self.position = 0
+        self.links = None  # 第一次發送網址時才建立
+        self.link_position = 0
+        self.last_hash = None
+        self.last_seen = 0.0
+        self.repeats = 0
+
+
+class SpamDetector:
+    def __init__(self, flood_limit: Tuple[int, float] = (8, 10), duplicate_limit: Tuple[int, float] = (4, 60),
+                 link_limit: Tuple[int, float] = (5, 60), block_invites: bool = True, max_users: int = 50000):
+        """
+        初始化洗版偵測器
+        :param flood_limit: (訊息數, 秒數)，秒數內超過訊息數視為洗版
+        :param duplicate_limit: (次數, 秒數)，連續發送相同訊息的上限
+        :param link_limit: (次數, 秒數)，含網址訊息的上限
+        :param block_invites: 是否將 LINE 邀請連結視為違規
+        :param max_users: 最多追蹤的用戶數（LRU），限制記憶體用量
+        """
+        self.flood_count, self.flood_window = flood_limit
+        self.duplicate_count, self.duplicate_window = duplicate_limit
+        self.link_count, self.link_window = link_limit
+        self.block_invites = block_invites
+        self.max_users = max_users
+        self._users: 'OrderedDict[Tuple[str, str], _UserState]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 統計資料
+        self.messages = 0
+        self.detections: Dict[str, int] = {'flood': 0, 'duplicate': 0, 'link': 0, 'invite': 0}
+
+    def check(self, group_id: str, user_id: str, text: str, now: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """
+        記錄一則訊息並檢查是否違規，每則訊息為 O(1)（不含文字本身的正規化）
+        :return: (違規類型, 詳細資訊)，未違規時回傳 None
+        """
+        if now is None:
+            now = time.monotonic()
+        message_hash = hash(' '.join(text.split()).lower())
+        has_link = URL_PATTERN.search(text) is not None
+        is_invite = self.block_invites and INVITE_PATTERN.search(text) is not None
+
+        key = (group_id, user_id)
+        with self._lock:
+            self.messages += 1
+            state = self._users.get(key)
+            if state is None:
+                state = self._users[key] = _UserState(self.flood_count)
+                if len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(key)
+
+            verdict = None
+            if is_invite:
+                verdict = ('invite', '發送群組邀請連結')
+
+            # 訊息頻率：環狀緩衝區中最舊一筆（即將被覆寫的位置）仍在視窗內
+            times, position = state.times, state.position
+            times[position] = now
+            position = state.position = (position + 1) % self.flood_count
+            oldest = times[position]
+            if verdict is None and oldest is not None and now - oldest <= self.flood_window:
+                verdict = ('flood', f"{self.flood_window:g} 秒內發送 {self.flood_count} 則訊息")
+
+            # 重複訊息
+            if message_hash == state.last_hash and now - state.last_seen <= self.duplicate_window:
+                state.repeats += 1
+            else:
+                state.repeats = 1
+            state.last_hash = message_hash
+            state.last_seen = now
+            if verdict is None and state.repeats >= self.duplicate_count:
+                verdict = ('duplicate', f"連續發送相同訊息 {state.repeats} 次")
+
+            # 網址
+            if has_link:
+                links = state.links
+                if links is None:
+                    links = state.links = [None] * self.link_count
+                links[state.link_position] = now
+                state.link_position = (state.link_position + 1) % self.link_count
+                oldest = links[state.link_position]
+                if verdict is None and oldest is not None and now - oldest <= self.link_window:
+                    verdict = ('link', f"{self.link_window:g} 秒內發送 {self.link_count} 則含網址的訊息")
+
+            if verdict is not None:
+                # 觸發後重新計算，避免之後每則訊息都重複處罰
+                del self._users[key]
+                self.detections[verdict[0]] += 1
+            return verdict
+
+    def forget(self, group_id: str, user_id: str) -> None:
+        """移除用戶的追蹤狀態（例如成員離開時）"""
+        with self._lock:
+            self._users.pop((group_id, user_id), None)
+
+    def stats(self) -> Dict:
+        """取得偵測統計資料"""
+        with self._lock:
+            return {'tracked_users': len(self._users), 'messages': self.messages, 'detections': dict(self.detections)}
@@ -0,0 +1,714 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('sqlite_store')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blacklist (
+    user_id TEXT PRIMARY KEY,
+    reason TEXT,
+    timestamp TEXT,
+    reporter_id TEXT,
+    expires_at TEXT
+);
+CREATE TABLE IF NOT EXISTS group_blacklist (
+    group_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    reason TEXT,
+    timestamp TEXT,
+    reporter_id TEXT,
+    expires_at TEXT,
+    PRIMARY KEY (group_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS blacklist_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    action TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_user ON blacklist_history (user_id);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON blacklist_history (timestamp);
+CREATE TABLE IF NOT EXISTS warnings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    reason TEXT,
+    warned_by TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_warnings_group_user ON warnings (group_id, user_id);
+CREATE TABLE IF NOT EXISTS admins (
+    group_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS filters (
+    group_id TEXT NOT NULL,
+    term TEXT NOT NULL,
+    PRIMARY KEY (group_id, term)
+);
+CREATE TABLE IF NOT EXISTS group_settings (
+    group_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (group_id, key)
+);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    noticed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS webhook_events (
+    event_id TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS store_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class SqliteRepository:
+    def __init__(self, db_file: str = 'data/bot.db', timeout: float = 30.0):
+        """
+        初始化 SQLite 資料庫（WAL 模式，可供多個行程同時存取）
+        :param db_file: 資料庫檔案路徑
+        :param timeout: 等待其他行程釋放寫入鎖的秒數
+        """
+        self.db_file = db_file
+        self.timeout = timeout
+        self._local = threading.local()
+
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self.connection()
+        conn.executescript(SCHEMA)
+        self._upgrade_schema(conn)
+        conn.commit()
+
+    @staticmethod
+    def _upgrade_schema(conn: sqlite3.Connection) -> None:
+        """為舊版資料庫補上新增的欄位"""
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(blacklist)')}
+        if 'expires_at' not in columns:
+            conn.execute('ALTER TABLE blacklist ADD COLUMN expires_at TEXT')
+
+    def connection(self) -> sqlite3.Connection:
+        """取得目前執行緒的資料庫連線"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def version(self, name: str) -> int:
+        """資料的版本（每次寫入加一），供各 worker 判斷其他 worker 是否寫入過"""
+        row = self.connection().execute('SELECT version FROM store_versions WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def bump_version(conn: sqlite3.Connection, name: str) -> None:
+        """在寫入的交易中增加資料的版本"""
+        conn.execute(
+            'INSERT INTO store_versions (name, version) VALUES (?, 1) '
+            'ON CONFLICT (name) DO UPDATE SET version = version + 1',
+            (name,)
+        )
+
+    def close(self) -> None:
+        """關閉目前執行緒的資料庫連線"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def blacklist_store(self) -> 'SqliteBlacklistStore':
+        return SqliteBlacklistStore(self)
+
+    def warning_store(self) -> 'SqliteWarningStore':
+        return SqliteWarningStore(self)
+
+    def admin_store(self) -> 'SqliteAdminStore':
+        return SqliteAdminStore(self)
+
+    def history_store(self) -> 'SqliteHistoryStore':
+        return SqliteHistoryStore(self)
+
+    def filter_store(self) -> 'SqliteFilterStore':
+        return SqliteFilterStore(self)
+
+    def settings_store(self) -> 'SqliteSettingsStore':
+        return SqliteSettingsStore(self)
+
+    def rate_limit_backend(self) -> 'SqliteRateLimitBackend':
+        return SqliteRateLimitBackend(self)
+
+    def dedup_backend(self, ttl: float = 86400) -> 'SqliteDedupBackend':
+        return SqliteDedupBackend(self, ttl)
+
+    def lease_backend(self) -> 'SqliteLeaseBackend':
+        return SqliteLeaseBackend(self)
+
+    def migrate_from_json(self, blacklist_file: str = 'data/blacklist.json',
+                          warning_file: str = 'data/warnings.json',
+                          admin_file: str = 'data/admins.json',
+                          filter_file: str = 'data/filters.json',
+                          settings_file: str = 'data/settings.json',
+                          history_dir: str = 'data/history') -> Dict[str, int]:
+        """
+        從既有的 JSON 檔案匯入資料（會覆蓋資料庫中的同類資料）
+        :param history_dir: 分段儲存的操作歷史目錄，存在時取代資料庫中的歷史
+        :return: 各類資料匯入的筆數
+        """
+        counts = {}
+        if os.path.isdir(history_dir):
+            from utils.history import HistoryStore
+            conn = self.connection()
+            with conn:
+                conn.execute('DELETE FROM blacklist_history')
+            history = self.history_store()
+            history.extend(HistoryStore(history_dir, retention_days=0).query())
+            counts['history'] = len(history)
+        for name, path, store in (
+            ('blacklist', blacklist_file, self.blacklist_store()),
+            ('warnings', warning_file, self.warning_store()),
+            ('admins', admin_file, self.admin_store()),
+            ('filters', filter_file, self.filter_store()),
+            ('settings', settings_file, self.settings_store())
+        ):
+            if not os.path.exists(path):
+                counts[name] = 0
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            store.compact(data)
+            counts[name] = store.count()
+        return counts
+
+
+class SqliteBlacklistStore:
+    """黑名單（全域與群組）與操作歷史的 SQLite 儲存"""
+
+    name = 'blacklist'
+
+    def __init__(self, repository: SqliteRepository):
+        self.repository = repository
+
+    def load(self) -> Tuple[Optional[Any], List[dict]]:
+        conn = self.repository.connection()
+        blacklist = {}
+        for user_id, reason, timestamp, reporter_id, expires_at in conn.execute(
+            'SELECT user_id, reason, timestamp, reporter_id, expires_at FROM blacklist'
+        ):
+            blacklist[user_id] = self._entry(reason, timestamp, reporter_id, expires_at)
+        groups: Dict[str, Dict[str, dict]] = {}
+        for group_id, user_id, reason, timestamp, reporter_id, expires_at in conn.execute(
+            'SELECT group_id, user_id, reason, timestamp, reporter_id, expires_at FROM group_blacklist'
+        ):
+            info = groups.setdefault(group_id, {})[user_id] = self._entry(reason, timestamp, reporter_id, expires_at)
+            info['group_id'] = group_id
+        # 操作歷史留在資料庫中，由 SqliteHistoryStore 依需要查詢
+        return {'blacklist': blacklist, 'groups': groups}, []
+
+    def append(self, record: dict) -> bool:
+        conn = self.repository.connection()
+        group_id = record.get('group_id')
+        with conn:
+            if record['action'] == 'remove':
+                if group_id is None:
+                    sql, params = 'DELETE FROM blacklist WHERE user_id = ?', (record['user_id'],)
+                else:
+                    sql, params = ('DELETE FROM group_blacklist WHERE group_id = ? AND user_id = ?',
+                                   (group_id, record['user_id']))
+                # 到期解除只刪除同一次的暫時封鎖，期間被重新封鎖（期限不同）時保留
+                if 'expires_at' in record:
+                    sql, params = sql + ' AND expires_at = ?', params + (record['expires_at'],)
+                cursor = conn.execute(sql, params)
+                # 沒有刪除任何資料時（例如其他 worker 已先解除）不寫入歷史
+                if cursor.rowcount == 0:
+                    return False
+            elif record['action'] == 'add':
+                self._insert_entry(conn, record['user_id'], record, group_id)
+            self.repository.bump_version(conn, self.name)
+            self._insert_history(conn, record)
+        return False
+
+    def compact(self, data: Any) -> None:
+        """以完整資料取代資料庫內容（匯入時使用）"""
+        conn = self.repository.connection()
+        with conn:
+            self.repository.bump_version(conn, self.name)
+            conn.execute('DELETE FROM blacklist')
+            for user_id, info in data.get('blacklist', {}).items():
+                self._insert_entry(conn, user_id, info)
+            if 'groups' in data:
+                conn.execute('DELETE FROM group_blacklist')
+                for group_id, entries in data['groups'].items():
+                    for user_id, info in entries.items():
+                        self._insert_entry(conn, user_id, info, group_id)
+            # 快照不含歷史時保留資料庫中的歷史
+            if 'history' in data:
+                conn.execute('DELETE FROM blacklist_history')
+                for record in data['history']:
+                    self._insert_history(conn, record)
+
+    def count(self) -> int:
+        return self.repository.connection().execute('SELECT COUNT(*) FROM blacklist').fetchone()[0]
+
+    def version(self) -> int:
+        return self.repository.version(self.name)
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _entry(reason: str, timestamp: str, reporter_id: Optional[str], expires_at: Optional[str]) -> dict:
+        info = {'reason': reason, 'timestamp': timestamp, 'reporter_id': reporter_id}
+        if expires_at:
+            info['expires_at'] = expires_at
+        return info
+
+    @staticmethod
+    def _insert_entry(conn: sqlite3.Connection, user_id: str, info: dict, group_id: Optional[str] = None) -> None:
+        values = (user_id, info.get('reason'), info.get('timestamp'), info.get('reporter_id'), info.get('expires_at'))
+        if group_id is None:
+            conn.execute(
+                'INSERT OR REPLACE INTO blacklist (user_id, reason, timestamp, reporter_id, expires_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                values
+            )
+        else:
+            conn.execute(
+                'INSERT OR REPLACE INTO group_blacklist (group_id, user_id, reason, timestamp, reporter_id, expires_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (group_id,) + values
+            )
+
+    @staticmethod
+    def _insert_history(conn: sqlite3.Connection, record: dict) -> None:
+        conn.execute(
+            'INSERT INTO blacklist_history (action, user_id, timestamp, record) VALUES (?, ?, ?, ?)',
+            (record['action'], record['user_id'], record['timestamp'], json.dumps(record, ensure_ascii=False))
+        )
+
+
+class SqliteHistoryStore:
+    """黑名單操作歷史的查詢（紀錄由 SqliteBlacklistStore 在同一個交易中寫入）"""
+
+    def __init__(self, repository: SqliteRepository):
+        self.repository = repository
+
+    def __len__(self) -> int:
+        return self.repository.connection().execute('SELECT COUNT(*) FROM blacklist_history').fetchone()[0]
+
+    def append(self, record: dict) -> None:
+        pass
+
+    def extend(self, records) -> int:
+        conn = self.repository.connection()
+        count = 0
+        with conn:
+            for record in records:
+                SqliteBlacklistStore._insert_history(conn, record)
+                count += 1
+        return count
+
+    def query(self, since=None, until=None, user_id: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """依時間與用戶查詢（使用 timestamp 與 user_id 索引）"""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append('timestamp >= ?')
+            params.append(since.isoformat() if hasattr(since, 'isoformat') else since)
+        if until is not None:
+            clauses.append('timestamp < ?')
+            params.append(until.isoformat() if hasattr(until, 'isoformat') else until)
+        if user_id is not None:
+            clauses.append('user_id = ?')
+            params.append(user_id)
+        sql = 'SELECT record FROM blacklist_history'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY timestamp DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        rows = self.repository.connection().execute(sql, params).fetchall()
+        return [json.loads(record) for (record,) in reversed(rows)]
+
+    def stats(self) -> Dict[str, int]:
+        return {'records': len(self)}
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteWarningStore:
+    """群組警告的 SQLite 儲存"""
+
+    name = 'warnings'
+
+    def __init__(self, repository: SqliteRepository):
+        self.repository = repository
+
+    def load(self) -> Tuple[Optional[Any], List[dict]]:
+        warnings: Dict[str, Dict[str, List[Dict]]] = {}
+        for group_id, user_id, reason, warned_by, timestamp in self.repository.connection().execute(
+            'SELECT group_id, user_id, reason, warned_by, timestamp FROM warnings ORDER BY id'
+        ):
+            warnings.setdefault(group_id, {}).setdefault(user_id, []).append({
+                'reason': reason,
+                'warned_by': warned_by,
+                'timestamp': timestamp
+            })
+        return warnings, []
+
+    def append(self, record: dict) -> bool:
+        conn = self.repository.connection()
+        with conn:
+            self.repository.bump_version(conn, self.name)
+            if record['action'] == 'add':
+                self._insert_warning(conn, record['group_id'], record['user_id'], record['warning'])
+            elif record['action'] == 'remove':
+                conn.execute(
+                    'DELETE FROM warnings WHERE id = '
+                    '(SELECT MAX(id) FROM warnings WHERE group_id = ? AND user_id = ?)',
+                    (record['group_id'], record['user_id'])
+                )
+            elif record['action'] == 'expire':
+                conn.execute(
+                    'DELETE FROM warnings WHERE group_id = ? AND user_id = ? AND timestamp = ?',
+                    (record['group_id'], record['user_id'], record['timestamp'])
+                )
+        return False
+
+    def compact(self, data: Any) -> None:
+        conn = self.repository.connection()
+        with conn:
+            self.repository.bump_version(conn, self.name)
+            conn.execute('DELETE FROM warnings')
+            for group_id, users in data.items():
+                for user_id, warnings in users.items():
+                    for warning in warnings:
+                        self._insert_warning(conn, group_id, user_id, warning)
+
+    def count(self) -> int:
+        return self.repository.connection().execute('SELECT COUNT(*) FROM warnings').fetchone()[0]
+
+    def version(self) -> int:
+        return self.repository.version(self.name)
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _insert_warning(conn: sqlite3.Connection, group_id: str, user_id: str, warning: dict) -> None:
+        conn.execute(
+            'INSERT INTO warnings (group_id, user_id, reason, warned_by, timestamp) VALUES (?, ?, ?, ?, ?)',
+            (group_id, user_id, warning.get('reason'), warning.get('warned_by'), warning['timestamp'])
+        )
+
+
+class SqliteAdminStore:
+    """群組管理員的 SQLite 儲存"""
+
+    name = 'admins'
+
+    def __init__(self, repository: SqliteRepository):
+        self.repository = repository
+
+    def load(self) -> Tuple[Optional[Any], List[dict]]:
+        admins: Dict[str, List[str]] = {}
+        for group_id, user_id in self.repository.connection().execute('SELECT group_id, user_id FROM admins'):
+            admins.setdefault(group_id, []).append(user_id)
+        return admins, []
+
+    def append(self, record: dict) -> bool:
+        conn = self.repository.connection()
+        with conn:
+            self.repository.bump_version(conn, self.name)
+            if record['action'] == 'add':
+                conn.execute(
+                    'INSERT OR IGNORE INTO admins (group_id, user_id) VALUES (?, ?)',
+                    (record['group_id'], record['user_id'])
+                )
+            elif record['action'] == 'remove':
+                conn.execute(
+                    'DELETE FROM admins WHERE group_id = ? AND user_id = ?',
+                    (record['group_id'], record['user_id'])
+                )
+        return False
+
+    def compact(self, data: Any) -> None:
+        conn = self.repository.connection()
+        with conn:
+            self.repository.bump_version(conn, self.name)
+            conn.execute('DELETE FROM admins')
+            conn.executemany(
+                'INSERT OR IGNORE INTO admins (group_id, user_id) VALUES (?, ?)',
+                [(group_id, user_id) for group_id, users in data.items() for user_id in users]
+            )
+
+    def count(self) -> int:
+        return self.repository.connection().execute('SELECT COUNT(*) FROM admins').fetchone()[0]
+
+    def version(self) -> int:
+        return self.repository.version(self.name)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteFilterStore:
+    """群組違禁詞的 SQLite 儲存"""
+
+    name = 'filters'
+
+    def __init__(self, repository: SqliteRepository):
+        self.repository = repository
+
+    def load(self) -> Tuple[Optional[Any], List[dict]]:
+        filters: Dict[str, List[str]] = {}
+        for group_id, term in self.repository.connection().execute('SELECT group_id, term FROM filters'):
+            filters.setdefault(group_id, []).append(term)
+        return filters, []
+
+    def append(self, record: dict) -> bool:
+        conn = self.repository.connection()
+        with conn:
+            self.repository.bump_version(conn, self.name)
+            if record['action'] == 'add':
+                conn.execute(
+                    'INSERT OR IGNORE INTO filters (group_id, term) VALUES (?, ?)',
+                    (record['group_id'], record['term'])
+                )
+            elif record['action'] == 'remove':
+                conn.execute(
+                    'DELETE FROM filters WHERE group_id = ? AND term = ?',
+                    (record['group_id'], record['term'])
+                )
+        return False
+
+    def compact(self, data: Any) -> None:
+        conn = self.repository.connection()
+        with conn:
+            self.repository.bump_version(conn, self.name)
+            conn.execute('DELETE FROM filters')
+            conn.executemany(
+                'INSERT OR IGNORE INTO filters (group_id, term) VALUES (?, ?)',
+                [(group_id, term) for group_id, terms in data.items() for term in terms]
+            )
+
+    def count(self) -> int:
+        return self.repository.connection().execute('SELECT COUNT(*) FROM filters').fetchone()[0]
+
+    def version(self) -> int:
+        return self.repository.version(self.name)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteSettingsStore:
+    """群組設定的 SQLite 儲存（值以 JSON 存放）"""
+
+    name = 'settings'
+
+    def __init__(self, repository: SqliteRepository):
+        self.repository = repository
+
+    def load(self) -> Tuple[Optional[Any], List[dict]]:
+        settings: Dict[str, Dict[str, Any]] = {}
+        for group_id, key, value in self.repository.connection().execute(
+            'SELECT group_id, key, value FROM group_settings'
+        ):
+            settings.setdefault(group_id, {})[key] = json.loads(value)
+        return settings, []
+
+    def append(self, record: dict) -> bool:
+        conn = self.repository.connection()
+        with conn:
+            self.repository.bump_version(conn, self.name)
+            if record['action'] == 'set':
+                conn.execute(
+                    'INSERT OR REPLACE INTO group_settings (group_id, key, value) VALUES (?, ?, ?)',
+                    (record['group_id'], record['key'], json.dumps(record['value'], ensure_ascii=False))
+                )
+            elif record['action'] == 'unset':
+                conn.execute(
+                    'DELETE FROM group_settings WHERE group_id = ? AND key = ?',
+                    (record['group_id'], record['key'])
+                )
+        return False
+
+    def compact(self, data: Any) -> None:
+        conn = self.repository.connection()
+        with conn:
+            self.repository.bump_version(conn, self.name)
+            conn.execute('DELETE FROM group_settings')
+            conn.executemany(
+                'INSERT INTO group_settings (group_id, key, value) VALUES (?, ?, ?)',
+                [(group_id, key, json.dumps(value, ensure_ascii=False))
+                 for group_id, values in data.items() for key, value in values.items()]
+            )
+
+    def count(self) -> int:
+        return self.repository.connection().execute('SELECT COUNT(*) FROM group_settings').fetchone()[0]
+
+    def version(self) -> int:
+        return self.repository.version(self.name)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteRateLimitBackend:
+    """多個 worker 共用的權杖桶狀態（使用牆上時鐘，各行程的時間才能比較）"""
+
+    def __init__(self, repository: SqliteRepository, prune_every: int = 1000):
+        """
+        :param prune_every: 每取用多少次清除一次閒置的鍵
+        """
+        self.repository = repository
+        self.prune_every = prune_every
+        self._hits = 0
+
+    def hit_all(self, limits: List[Tuple[str, float, float]]) -> Tuple[bool, bool]:
+        """
+        同時向多個權杖桶各取用一個權杖；任一桶不足時都不取用
+        :param limits: (鍵, 每秒補充的權杖數, 桶容量) 列表
+        :return: (是否允許, 是否為這次超過限制後的第一次拒絕)
+        """
+        self._hits += 1
+        if self._hits % self.prune_every == 0:
+            self.prune()
+
+        conn = self.repository.connection()
+        now = time.time()
+        # BEGIN IMMEDIATE 先取得寫入鎖，讀取與更新之間不會被其他行程插入
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            buckets = []
+            for key, rate, capacity in limits:
+                row = conn.execute('SELECT tokens, updated, noticed FROM rate_limits WHERE key = ?', (key,)).fetchone()
+                tokens, noticed = (capacity, 0) if row is None else (
+                    min(capacity, row[0] + max(0.0, now - row[1]) * rate), row[2])
+                buckets.append((key, tokens, noticed))
+            rejected = next((bucket for bucket in buckets if bucket[1] < 1), None)
+            if rejected is None:
+                allowed, first = True, False
+                updates = [(key, tokens - 1, now, 0) for key, tokens, _ in buckets]
+            else:
+                # 只更新拒絕的桶（記錄已通知），其餘的桶維持原狀
+                key, tokens, noticed = rejected
+                allowed, first = False, not noticed
+                updates = [(key, tokens, now, 1)]
+            conn.executemany(
+                'INSERT OR REPLACE INTO rate_limits (key, tokens, updated, noticed) VALUES (?, ?, ?, ?)',
+                updates
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return allowed, first
+
+    def prune(self, max_idle: float = 3600) -> int:
+        """清除閒置已久（必定已回滿）的鍵"""
+        conn = self.repository.connection()
+        with conn:
+            return conn.execute('DELETE FROM rate_limits WHERE updated < ?', (time.time() - max_idle,)).rowcount
+
+
+class SqliteDedupBackend:
+    """多個 worker 共用的已處理事件 ID（使用牆上時鐘，各行程的時間才能比較）"""
+
+    def __init__(self, repository: SqliteRepository, ttl: float = 86400, prune_every: int = 1000):
+        """
+        :param ttl: 事件 ID 保留秒數
+        :param prune_every: 每記錄多少次清除一次已過期的事件 ID
+        """
+        self.repository = repository
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._adds = 0
+
+    def add(self, event_id: str) -> bool:
+        """
+        記錄事件 ID
+        :return: 是否為第一次出現（已記錄且尚未過期時回傳 False）
+        """
+        self._adds += 1
+        if self._adds % self.prune_every == 0:
+            self.prune()
+
+        conn = self.repository.connection()
+        now = time.time()
+        # 主鍵衝突且尚未過期時不更新，rowcount 為 0 即代表重複
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO webhook_events (event_id, expires) VALUES (?, ?) '
+                'ON CONFLICT (event_id) DO UPDATE SET expires = excluded.expires WHERE expires <= ?',
+                (event_id, now + self.ttl, now)
+            )
+        return cursor.rowcount > 0
+
+    def discard(self, event_id: str) -> None:
+        conn = self.repository.connection()
+        with conn:
+            conn.execute('DELETE FROM webhook_events WHERE event_id = ?', (event_id,))
+
+    def prune(self) -> int:
+        """清除已過期的事件 ID"""
+        conn = self.repository.connection()
+        with conn:
+            return conn.execute('DELETE FROM webhook_events WHERE expires <= ?', (time.time(),)).rowcount
+
+    def __len__(self) -> int:
+        return self.repository.connection().execute('SELECT COUNT(*) FROM webhook_events').fetchone()[0]
+
+
+class SqliteLeaseBackend:
+    """多個 worker 之間的租約（使用牆上時鐘，各行程的時間才能比較）"""
+
+    def __init__(self, repository: SqliteRepository):
+        self.repository = repository
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        取得或續約租約
+        :return: 是否持有租約（其他持有者的租約尚未過期時回傳 False）
+        """
+        conn = self.repository.connection()
+        now = time.time()
+        # 租約屬於自己或已過期時才更新，rowcount 為 0 即代表由其他 worker 持有
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires '
+                'WHERE leases.owner = excluded.owner OR leases.expires <= ?',
+                (name, owner, now + ttl, now)
+            )
+        return cursor.rowcount > 0
+
+    def release(self, name: str, owner: str) -> None:
+        """釋放自己持有的租約，讓其他 worker 立即接手"""
+        conn = self.repository.connection()
+        with conn:
+            conn.execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, owner))
@@ -0,0 +1,70 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('startup')
+
+
+class StartupLoader:
+    def __init__(self):
+        """
+        啟動時的載入工作（例如各管理器讀取資料檔），在背景執行緒中依序執行
+        必要的工作完成後才算就緒；其餘工作（例如預先載入 SDK）在就緒後繼續執行
+        """
+        self._steps: List[Tuple[str, Callable[[], Any], bool]] = []
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._created = time.monotonic()
+        self.ready_after: Optional[float] = None  # 建立到就緒的秒數
+        self.durations: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    def add(self, name: str, func: Callable[[], Any], required: bool = True) -> None:
+        """
+        加入載入工作（依加入順序執行）
+        :param required: 是否需要完成才算就緒
+        """
+        self._steps.append((name, func, required))
+
+    def _run_steps(self, required: bool) -> None:
+        for name, func, step_required in self._steps:
+            if step_required != required:
+                continue
+            started = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                self.errors[name] = str(e)
+                logger.error(f"載入 {name} 失敗: {e}")
+            self.durations[name] = time.perf_counter() - started
+
+    def run(self) -> None:
+        """執行所有載入工作（必要的工作完成後即為就緒）"""
+        self._run_steps(True)
+        self.ready_after = time.monotonic() - self._created
+        self._ready.set()
+        self._run_steps(False)
+
+    def start(self) -> None:
+        """在背景執行緒中執行所有載入工作"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name='startup', daemon=True)
+            self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待就緒，回傳是否已就緒"""
+        return self._ready.wait(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得載入統計資料"""
+        return {
+            'ready': self.ready,
+            'ready_after': self.ready_after,
+            'durations': dict(self.durations),
+            'errors': dict(self.errors)
+        }
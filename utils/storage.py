@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import time
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger('storage')
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """以暫存檔 + rename 的方式寫入 JSON，避免寫到一半時檔案損毀"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def file_version(path: str) -> Optional[Tuple[int, int]]:
+    """檔案的修改時間與大小（不存在時為 None），其他行程寫入後會改變"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class JsonFileStore:
+    """整份 JSON 檔案儲存，每次異動都重寫整個檔案"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Tuple[Optional[Any], List[dict]]:
+        """
+        載入資料
+        :return: (快照資料, 尚未併入快照的異動紀錄)
+        """
+        if not os.path.exists(self.path):
+            return None, []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f), []
+
+    def append(self, record: dict) -> bool:
+        """
+        寫入一筆異動
+        :return: 是否需要呼叫 compact 寫入完整快照
+        """
+        return True
+
+    def compact(self, data: Any) -> None:
+        """寫入完整快照"""
+        write_json_atomic(self.path, data)
+
+    def version(self) -> Any:
+        """資料的版本，與上次不同時表示其他行程寫入過"""
+        return file_version(self.path)
+
+    def close(self) -> None:
+        pass
+
+
+class JournalStore:
+    """快照 + 只附加的異動日誌，每筆異動只寫一行"""
+
+    def __init__(self, path: str, fsync: str = 'interval', fsync_interval: float = 1.0,
+                 compact_every: int = 1000):
+        """
+        :param path: 快照檔案路徑，日誌檔為 <path>.journal
+        :param fsync: 同步到磁碟的時機：always（每筆）、interval（每隔 fsync_interval 秒）、never（交給作業系統）
+        :param fsync_interval: interval 模式下兩次 fsync 的最短間隔秒數
+        :param compact_every: 日誌累積多少筆後要求寫入快照
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"未知的 fsync 設定: {fsync}")
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._pending = 0
+        self._last_fsync = 0.0
+
+    def load(self) -> Tuple[Optional[Any], List[dict]]:
+        """載入快照並重播日誌中快照之後的異動"""
+        with self._lock:
+            data = None
+            snapshot_seq = 0
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    snapshot_seq = data.pop('journal_seq', 0)
+
+            records = []
+            self._seq = snapshot_seq
+            valid_size = 0
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'rb') as f:
+                    for line in f:
+                        # 最後一行可能因當機而不完整，忽略並截斷
+                        if not line.endswith(b'\n'):
+                            break
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            break
+                        valid_size += len(line)
+                        if entry['seq'] > snapshot_seq:
+                            records.append(entry['record'])
+                            self._seq = entry['seq']
+
+                if valid_size < os.path.getsize(self.journal_path):
+                    logger.warning(f"日誌 {self.journal_path} 結尾不完整，已截斷")
+                    with open(self.journal_path, 'r+b') as f:
+                        f.truncate(valid_size)
+
+            self._pending = len(records)
+            return data, records
+
+    def append(self, record: dict) -> bool:
+        """附加一筆異動到日誌"""
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.journal_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.journal_path, 'a', encoding='utf-8')
+
+            self._seq += 1
+            self._file.write(json.dumps({'seq': self._seq, 'record': record}, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+            now = time.monotonic()
+            if self.fsync == 'always' or (self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+
+            self._pending += 1
+            return self._pending >= self.compact_every
+
+    def compact(self, data: Any) -> None:
+        """寫入快照並清空日誌"""
+        with self._lock:
+            if isinstance(data, dict):
+                data = dict(data, journal_seq=self._seq)
+            write_json_atomic(self.path, data)
+
+            # 快照已包含所有異動；即使在截斷前當機，重播時也會依序號略過
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(self.journal_path, 'w', encoding='utf-8'):
+                pass
+            self._pending = 0
+
+    def version(self) -> Any:
+        """快照與日誌的版本，與上次不同時表示其他行程寫入過"""
+        return file_version(self.path), file_version(self.journal_path)
+
+    def close(self) -> None:
+        """關閉日誌檔"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+
+def create_store(kind: str, path: str, **options):
+    """
+    依名稱建立儲存後端
+    :param kind: json 或 journal
+    :param path: 資料檔路徑
+    """
+    if kind == 'json':
+        return JsonFileStore(path)
+    if kind == 'journal':
+        return JournalStore(path, **options)
+    raise ValueError(f"未知的儲存後端: {kind}")
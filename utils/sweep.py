@@ -0,0 +1,101 @@
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger('sweep')
+
+
+class BlacklistSweeper:
+    def __init__(self, line_bot, blacklist_manager, admin_manager, membership_index):
+        """
+        初始化黑名單掃描器
+        LINE Messaging API 無法將成員移出群組，掃描只找出群組中的黑名單成員並通知管理員手動移除
+        """
+        self.line_bot = line_bot
+        self.blacklist_manager = blacklist_manager
+        self.admin_manager = admin_manager
+        self.membership_index = membership_index
+        self._lock = threading.Lock()
+        self._progress: Dict[str, Dict] = {}  # group_id -> 進行中的掃描進度
+
+    def get_progress(self, group_id: str) -> Optional[Dict]:
+        """取得群組進行中的掃描進度"""
+        with self._lock:
+            progress = self._progress.get(group_id)
+            return dict(progress) if progress else None
+
+    def _count(self, progress: Dict, user_ids: Iterable[str]) -> Iterator[str]:
+        """逐頁讀取成員時更新已讀取的人數"""
+        for user_id in user_ids:
+            progress['fetched'] += 1
+            yield user_id
+
+    def sweep_group(self, group_id: str, refresh: bool = False) -> Optional[Dict]:
+        """
+        掃描群組中的黑名單成員（管理員除外）
+        :param refresh: 是否先從 LINE 重新讀取完整成員列表
+        :return: 掃描結果，若該群組已在掃描中則回傳 None
+        """
+        with self._lock:
+            if group_id in self._progress:
+                return None
+            progress = self._progress[group_id] = {'fetched': 0}
+
+        try:
+            if refresh or not self.membership_index.is_synced(group_id):
+                self.membership_index.sync(
+                    group_id, self._count(progress, self.line_bot.iter_group_member_ids(group_id))
+                )
+
+            checked = self.membership_index.member_count(group_id)
+            # 依群組、聯盟、全域黑名單逐一檢查成員（同時解除已到期的暫時封鎖）
+            matched = self.blacklist_manager.blacklisted_members(group_id, self.membership_index.members(group_id))
+            admins = self.admin_manager.get_admins(group_id)
+            return {
+                'group_id': group_id,
+                'checked': checked,
+                'matched': sorted(user_id for user_id in matched if user_id not in admins),
+                'timestamp': datetime.now().isoformat()
+            }
+        except Exception as e:
+            logger.error(f"掃描群組 {group_id} 失敗: {e}")
+            return {
+                'group_id': group_id,
+                'error': str(e),
+                'timestamp': datetime.now().isoformat()
+            }
+        finally:
+            with self._lock:
+                self._progress.pop(group_id, None)
+
+    def sweep_all(self, refresh: bool = False) -> List[Dict]:
+        """掃描所有已知群組，有黑名單成員的群組各發送一則摘要通知管理員"""
+        groups = set(self.admin_manager.admins) | self.membership_index.groups()
+        results = []
+        for group_id in sorted(groups):
+            result = self.sweep_group(group_id, refresh)
+            if result is None:
+                continue
+            results.append(result)
+            if result.get('matched') or result.get('error'):
+                self.line_bot.send_message(group_id, format_sweep_summary(result))
+        return results
+
+
+def format_sweep_summary(result: Dict) -> str:
+    """產生掃描結果摘要"""
+    if result.get('error'):
+        return f"❌ 黑名單掃描失敗：{result['error']}"
+
+    message = f"""
+🔍 黑名單掃描完成
+-------------------
+檢查成員: {result['checked']}
+黑名單成員: {len(result['matched'])}
+時間: {datetime.fromisoformat(result['timestamp']).strftime('%Y-%m-%d %H:%M:%S')}
+"""
+    if result['matched']:
+        message += ("\n機器人無法將成員移出群組，請管理員手動移除：\n"
+                    + "\n".join(f"- {user_id}" for user_id in result['matched']))
+    return message
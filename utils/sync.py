@@ -0,0 +1,180 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Hashable, List
+
+logger = logging.getLogger('sync')
+
+
+class StateSync:
+    def __init__(self, scheduler, interval: float = 2.0):
+        """
+        多個 worker 共用同一份資料時，定期檢查各儲存後端的版本，
+        其他 worker 寫入後重新載入對應管理器的記憶體資料（最多延遲 interval 秒）
+        :param scheduler: 排程器，用於定期檢查
+        :param interval: 檢查間隔秒數
+        """
+        self.scheduler = scheduler
+        self.interval = interval
+        self._sources: List[dict] = []
+        self._lock = threading.Lock()
+
+        # 統計資料
+        self.checks = 0
+        self.reloads = 0
+        self.errors = 0
+
+    def register(self, name: str, store, reload: Callable[[], bool]) -> None:
+        """
+        登記需要同步的資料
+        :param store: 儲存後端，需提供 version()
+        :param reload: 版本改變時呼叫的重新載入函式（例如 manager.reload）
+        """
+        self._sources.append({
+            'name': name,
+            'store': store,
+            'reload': reload,
+            'version': store.version(),
+            'reloads': 0
+        })
+
+    def check(self) -> List[str]:
+        """
+        檢查所有資料的版本，重新載入有變更的部分
+        先記錄版本再載入：載入期間的寫入會在下一次檢查時再載入一次，不會遺漏
+        :return: 重新載入的資料名稱
+        """
+        reloaded = []
+        with self._lock:
+            self.checks += 1
+            for source in self._sources:
+                try:
+                    version = source['store'].version()
+                    if version == source['version']:
+                        continue
+                    if source['reload']():
+                        source['version'] = version
+                        source['reloads'] += 1
+                        self.reloads += 1
+                        reloaded.append(source['name'])
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"同步 {source['name']} 失敗: {e}")
+        return reloaded
+
+    def start(self) -> None:
+        """開始定期檢查（排程器需另外啟動）"""
+        self.scheduler.schedule_every('state-sync', self.interval, self.check)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得同步統計資料"""
+        return {
+            'interval': self.interval,
+            'checks': self.checks,
+            'reloads': self.reloads,
+            'errors': self.errors,
+            'sources': {source['name']: source['reloads'] for source in self._sources}
+        }
+
+
+class LeaderLease:
+    def __init__(self, backend, scheduler, ttl: float = 15.0, name: str = 'scheduler'):
+        """
+        多個 worker 之間選出一個 worker 執行到期解除與定期掃描
+        每個 worker 每隔 ttl / 3 秒嘗試取得或續約，持有者停止續約（例如結束）後最多 ttl 秒由其他 worker 接手
+        :param backend: 租約後端，需提供 acquire(name, owner, ttl) 與 release(name, owner)
+        :param scheduler: 排程器，用於定期續約
+        :param ttl: 租約有效秒數
+        """
+        self.backend = backend
+        self.scheduler = scheduler
+        self.ttl = ttl
+        self.name = name
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._valid_until = 0.0  # 本地認定仍持有租約的期限
+        self._callbacks: List[Callable[[], None]] = []
+
+        # 統計資料
+        self.acquired = 0
+        self.errors = 0
+
+    def on_acquire(self, callback: Callable[[], None]) -> None:
+        """登記取得租約（成為執行者）時呼叫的函式，例如重新排定前任持有者未執行的到期"""
+        self._callbacks.append(callback)
+
+    def is_leader(self) -> bool:
+        return time.time() < self._valid_until
+
+    def renew(self) -> bool:
+        """取得或續約租約"""
+        started = time.time()
+        try:
+            held = self.backend.acquire(self.name, self.owner, self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"續約排程租約失敗: {e}")
+            held = False
+        acquired = held and not self.is_leader()
+        # 以送出前的時間計算，本地期限不會晚於資料庫中的期限，不會有兩個 worker 同時認定自己持有
+        self._valid_until = started + self.ttl if held else 0.0
+        if acquired:
+            self.acquired += 1
+            logger.info(f"取得排程租約（{self.owner}）")
+            for callback in self._callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"取得排程租約後的處理失敗: {e}")
+        return held
+
+    def start(self) -> None:
+        """立即嘗試取得租約並開始定期續約（排程器需另外啟動）"""
+        self.renew()
+        self.scheduler.schedule_every('leader-lease', self.ttl / 3, self.renew)
+
+    def release(self) -> None:
+        """釋放租約（結束時呼叫），讓其他 worker 立即接手"""
+        if not self.is_leader():
+            return
+        self._valid_until = 0.0
+        try:
+            self.backend.release(self.name, self.owner)
+        except Exception as e:
+            logger.error(f"釋放排程租約失敗: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """取得租約統計資料"""
+        return {
+            'owner': self.owner,
+            'leader': self.is_leader(),
+            'acquired': self.acquired,
+            'errors': self.errors
+        }
+
+
+class LeaderScheduler:
+    def __init__(self, scheduler, lease: LeaderLease):
+        """
+        只在持有租約的 worker 執行工作的排程器（介面與 Scheduler 相同，可直接交給各管理器）
+        其他 worker 照常排定，到期時略過；接手的 worker 在 on_acquire 中重新排定尚未執行的工作
+        """
+        self.scheduler = scheduler
+        self.lease = lease
+
+    def _guard(self, func: Callable[[], None]) -> Callable[[], None]:
+        def run():
+            if self.lease.is_leader():
+                func()
+        return run
+
+    def schedule(self, key: Hashable, when: float, func: Callable[[], None]) -> None:
+        self.scheduler.schedule(key, when, self._guard(func))
+
+    def schedule_every(self, key: Hashable, interval: float, func: Callable[[], None]) -> None:
+        self.scheduler.schedule_every(key, interval, self._guard(func))
+
+    def cancel(self, key: Hashable) -> bool:
+        return self.scheduler.cancel(key)
@@ -1,60 +1,219 @@
 from typing import Dict, List, Optional
-import json
-import os
+import threading
+import time
 from datetime import datetime
+from utils.storage import JsonFileStore
+
+# 群組設定中警告有效天數的名稱
+EXPIRY_SETTING = 'warning_expiry_days'
+
 
 class WarningManager:
-    def __init__(self, blacklist_manager):
+    def __init__(self, blacklist_manager, store=None, settings=None, scheduler=None, default_expiry_days: float = 0,
+                 autoload: bool = True):
+        """
+        初始化警告管理器
+        :param store: 儲存後端（可選），預設為 data/warnings.json
+        :param settings: 群組設定（可選），用於各群組的警告有效天數
+        :param scheduler: 排程器（可選），設定後警告會在到期時自動移除
+        :param default_expiry_days: 預設的警告有效天數，0 表示永久有效
+        :param autoload: 是否在建立時載入警告資料（否則需另外呼叫 load）
+        """
         self.warning_file = "data/warnings.json"
+        self.store = store or JsonFileStore(self.warning_file)
         self.warnings: Dict[str, Dict[str, List[Dict]]] = {}  # group_id -> user_id -> list of warnings
         self.blacklist_manager = blacklist_manager
+        self.settings = settings
+        self.scheduler = scheduler
+        self.default_expiry_days = default_expiry_days
         self.max_warnings = 3
-        self._load_warnings()
+        self._lock = threading.RLock()
+        if autoload:
+            self.load()
+
+    def load(self) -> None:
+        """載入警告資料並排定到期"""
+        with self._lock:
+            self._load_warnings()
+            self._schedule_all()
 
     def _load_warnings(self) -> None:
-        """從檔案載入警告資料"""
+        """從儲存後端載入警告資料"""
         try:
-            if os.path.exists(self.warning_file):
-                with open(self.warning_file, 'r', encoding='utf-8') as f:
-                    self.warnings = json.load(f)
+            self._restore(*self.store.load())
         except Exception as e:
             print(f"載入警告資料時發生錯誤: {e}")
             self.warnings = {}
 
+    def reload(self) -> bool:
+        """重新載入其他 worker 寫入的異動並重新排定到期；讀取失敗時保留目前的資料"""
+        try:
+            data, records = self.store.load()
+        except Exception as e:
+            print(f"重新載入警告資料時發生錯誤: {e}")
+            return False
+        with self._lock:
+            self._restore(data, records)
+            self._schedule_all()
+        return True
+
+    def _restore(self, data, records: List[Dict]) -> None:
+        """以儲存後端的資料取代記憶體中的警告資料"""
+        self.warnings = data or {}
+        for record in records:
+            self._apply(record)
+
     def _save_warnings(self) -> None:
-        """儲存警告資料到檔案"""
+        """儲存完整警告資料"""
         try:
-            os.makedirs(os.path.dirname(self.warning_file), exist_ok=True)
-            with open(self.warning_file, 'w', encoding='utf-8') as f:
-                json.dump(self.warnings, f, ensure_ascii=False, indent=2)
+            self.store.compact(self.warnings)
         except Exception as e:
             print(f"儲存警告資料時發生錯誤: {e}")
 
-    def add_warning(self, group_id: str, user_id: str, reason: str, warned_by: str) -> Dict:
-        """新增警告"""
-        if group_id not in self.warnings:
-            self.warnings[group_id] = {}
-        
-        if user_id not in self.warnings[group_id]:
-            self.warnings[group_id][user_id] = []
+    def _apply(self, record: Dict) -> None:
+        """將一筆異動套用到記憶體中的警告資料"""
+        group_id = record['group_id']
+        user_id = record['user_id']
+        if record['action'] == 'add':
+            self.warnings.setdefault(group_id, {}).setdefault(user_id, []).append(record['warning'])
+        elif record['action'] == 'remove':
+            self.warnings[group_id][user_id].pop()
+        elif record['action'] == 'expire':
+            warnings = self.warnings.get(group_id, {}).get(user_id, [])
+            for i, warning in enumerate(warnings):
+                if warning['timestamp'] == record['timestamp']:
+                    del warnings[i]
+                    break
+
+        if record['action'] in ('remove', 'expire') and user_id in self.warnings.get(group_id, {}):
+            # 如果沒有警告了，清理資料結構
+            if not self.warnings[group_id][user_id]:
+                del self.warnings[group_id][user_id]
+                if not self.warnings[group_id]:
+                    del self.warnings[group_id]
+
+    def _commit(self, record: Dict) -> None:
+        """套用並寫入一筆異動"""
+        with self._lock:
+            self._apply(record)
+            try:
+                if self.store.append(record):
+                    self._save_warnings()
+            except Exception as e:
+                print(f"儲存警告資料時發生錯誤: {e}")
+
+    def get_expiry_days(self, group_id: str) -> float:
+        """取得群組的警告有效天數（0 表示永久有效）"""
+        if self.settings is None:
+            return self.default_expiry_days
+        return self.settings.get(group_id, EXPIRY_SETTING, self.default_expiry_days)
 
+    def set_expiry_days(self, group_id: str, days: Optional[float]) -> None:
+        """
+        設定群組的警告有效天數，並依新的期限重新排定該群組所有警告
+        :param days: 有效天數，0 表示永久有效，None 表示恢復預設
+        """
+        if self.settings is None:
+            return
+        if days is None:
+            self.settings.unset(group_id, EXPIRY_SETTING)
+        else:
+            self.settings.set(group_id, EXPIRY_SETTING, days)
+        with self._lock:
+            for user_id, warnings in list(self.warnings.get(group_id, {}).items()):
+                for warning in list(warnings):
+                    self._schedule(group_id, user_id, warning)
+
+    def _deadline(self, group_id: str, warning: Dict) -> Optional[float]:
+        """警告的到期時間（epoch 秒），由持久化的時間戳記推算；永久有效時回傳 None"""
+        days = self.get_expiry_days(group_id)
+        if not days:
+            return None
+        return datetime.fromisoformat(warning['timestamp']).timestamp() + days * 86400
+
+    def _schedule(self, group_id: str, user_id: str, warning: Dict) -> None:
+        """排定單一警告的到期移除（取代同一警告先前的排程）"""
+        if self.scheduler is None:
+            return
+        key = ('warning', group_id, user_id, warning['timestamp'])
+        deadline = self._deadline(group_id, warning)
+        if deadline is None:
+            self.scheduler.cancel(key)
+        else:
+            timestamp = warning['timestamp']
+            self.scheduler.schedule(key, deadline, lambda: self.expire_warning(group_id, user_id, timestamp))
+
+    def reschedule(self) -> None:
+        """群組設定重新載入後（例如其他 worker 變更 !warnexpiry），依新的有效天數重新排定所有警告"""
+        self._schedule_all()
+
+    def _schedule_all(self) -> None:
+        """啟動時依持久化的時間戳記排定所有警告（已過期的會立即移除）"""
+        if self.scheduler is None:
+            return
+        with self._lock:
+            for group_id, users in self.warnings.items():
+                for user_id, warnings in users.items():
+                    for warning in warnings:
+                        self._schedule(group_id, user_id, warning)
+
+    def expire_warning(self, group_id: str, user_id: str, timestamp: str) -> bool:
+        """
+        移除已到期的警告；執行時重新依目前的有效天數檢查
+        （例如其他 worker 以 !warnexpiry 延長期限後，本 worker 舊的排程才觸發）
+        """
+        with self._lock:
+            warnings = self.warnings.get(group_id, {}).get(user_id, [])
+            warning = next((warning for warning in warnings if warning['timestamp'] == timestamp), None)
+            if warning is None:
+                return False
+            deadline = self._deadline(group_id, warning)
+            if deadline is None or deadline > time.time():
+                # 期限已延長或改為永久有效，依新的期限重新排定
+                self._schedule(group_id, user_id, warning)
+                return False
+            self._commit({
+                'action': 'expire',
+                'group_id': group_id,
+                'user_id': user_id,
+                'timestamp': timestamp
+            })
+        return True
+
+    def _purge_expired(self, group_id: str, user_id: str) -> None:
+        """移除用戶已到期但排程尚未處理的警告（需持有鎖）"""
+        now = time.time()
+        for warning in list(self.warnings.get(group_id, {}).get(user_id, [])):
+            deadline = self._deadline(group_id, warning)
+            if deadline is not None and deadline <= now:
+                self.expire_warning(group_id, user_id, warning['timestamp'])
+
+    def add_warning(self, group_id: str, user_id: str, reason: str, warned_by: str) -> Dict:
+        """新增警告（只計算尚未到期的警告）"""
         warning = {
             'reason': reason,
             'warned_by': warned_by,
             'timestamp': datetime.now().isoformat()
         }
         
-        self.warnings[group_id][user_id].append(warning)
-        self._save_warnings()
-
-        warning_count = len(self.warnings[group_id][user_id])
+        with self._lock:
+            self._purge_expired(group_id, user_id)
+            self._commit({
+                'action': 'add',
+                'group_id': group_id,
+                'user_id': user_id,
+                'warning': warning
+            })
+            self._schedule(group_id, user_id, warning)
+            warning_count = len(self.warnings[group_id][user_id])
         
         # 檢查是否達到最大警告次數
         if warning_count >= self.max_warnings:
             self.blacklist_manager.add_to_blacklist(
                 user_id,
                 f"達到最大警告次數 ({self.max_warnings} 次)",
-                None
+                None,
+                group_id=group_id
             )
             return {
                 'status': 'blacklisted',
@@ -70,20 +229,20 @@ class WarningManager:
 
     def remove_warning(self, group_id: str, user_id: str) -> bool:
         """移除最後一次警告"""
-        if (group_id not in self.warnings or 
-            user_id not in self.warnings[group_id] or 
-            not self.warnings[group_id][user_id]):
-            return False
+        with self._lock:
+            if (group_id not in self.warnings or 
+                user_id not in self.warnings[group_id] or 
+                not self.warnings[group_id][user_id]):
+                return False
 
-        self.warnings[group_id][user_id].pop()
-        
-        # 如果沒有警告了，清理資料結構
-        if not self.warnings[group_id][user_id]:
-            del self.warnings[group_id][user_id]
-            if not self.warnings[group_id]:
-                del self.warnings[group_id]
-        
-        self._save_warnings()
+            if self.scheduler is not None:
+                timestamp = self.warnings[group_id][user_id][-1]['timestamp']
+                self.scheduler.cancel(('warning', group_id, user_id, timestamp))
+            self._commit({
+                'action': 'remove',
+                'group_id': group_id,
+                'user_id': user_id
+            })
         return True
 
     def get_warnings(self, group_id: str, user_id: str) -> List[Dict]:
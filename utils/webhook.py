@@ -0,0 +1,141 @@
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from linebot.v3.exceptions import InvalidSignatureError
+from linebot.v3.webhook import WebhookHandler
+from linebot.v3.models.events import UnknownEvent
+from linebot.v3.webhooks import Event, MessageEvent
+
+logger = logging.getLogger('webhook')
+
+# 指令前綴；以此開頭的文字訊息一律走完整的事件模型
+COMMAND_PREFIX = '!'
+
+
+def get_event_key(event) -> Optional[str]:
+    """取得事件的排序鍵（群組 > 聊天室 > 用戶）"""
+    source = getattr(event, 'source', None)
+    if source is None:
+        return None
+    return (getattr(source, 'group_id', None)
+            or getattr(source, 'room_id', None)
+            or getattr(source, 'user_id', None))
+
+
+def get_raw_event_key(event: Dict) -> Optional[str]:
+    """取得原始 JSON 事件的排序鍵，與 get_event_key 相同"""
+    source = event.get('source')
+    if not source:
+        return None
+    return source.get('groupId') or source.get('roomId') or source.get('userId')
+
+
+def is_chatter(event: Dict) -> bool:
+    """是否為一般聊天（非指令的文字訊息），只檢查原始 JSON 不建立模型"""
+    if event.get('type') != 'message':
+        return False
+    message = event.get('message')
+    return (message is not None and message.get('type') == 'text'
+            and not message.get('text', '').startswith(COMMAND_PREFIX))
+
+
+class QueuedWebhookHandler(WebhookHandler):
+    def __init__(self, channel_secret: str, dispatcher=None, deduplicator=None):
+        """
+        初始化 Webhook 處理器
+        :param channel_secret: Channel 密鑰
+        :param dispatcher: 事件分派器（可選），未設定時於請求中直接處理事件
+        :param deduplicator: 事件去重（可選），略過 LINE 重送且已處理過的事件
+        """
+        super().__init__(channel_secret)
+        self.dispatcher = dispatcher
+        self.deduplicator = deduplicator
+        self._chatter: Optional[Callable[[Dict], None]] = None
+
+        # 統計資料
+        self.events = 0
+        self.fast_path = 0
+
+    def chatter(self, func: Callable[[Dict], None]) -> Callable[[Dict], None]:
+        """
+        註冊一般聊天的處理函式（裝飾器）
+        處理函式收到的是原始 JSON 事件（dict），不會建立 SDK 的事件模型
+        """
+        self._chatter = func
+        return func
+
+    def handle(self, body: str, signature: str) -> None:
+        """
+        驗證簽章後處理事件；有分派器時將整個請求的事件一次排入佇列即返回
+        （佇列容量不足時一個都不排入，LINE 重送整個請求時不會重複處理）
+        一般聊天直接交給 chatter 處理函式，其餘事件才建立完整的事件模型
+        已處理過的事件（以 webhookEventId 判斷）在建立模型前就略過
+        """
+        if not self.parser.signature_validator.validate(body, signature):
+            raise InvalidSignatureError('Invalid signature. signature=' + signature)
+
+        body_json = json.loads(body)
+        destination = body_json.get('destination')
+        deduplicator = self.deduplicator
+        pending = []
+        for raw in body_json['events']:
+            self.events += 1
+            if deduplicator is not None and deduplicator.is_duplicate(raw):
+                continue
+            pending.append(raw)
+
+        if self.dispatcher is not None:
+            try:
+                self.dispatcher.submit_all([self._prepare(raw, destination) for raw in pending])
+            except Exception:
+                # 未能排入佇列時 LINE 會重送，重送的事件需要再次處理
+                self._forget(pending)
+                raise
+            return
+
+        for index, raw in enumerate(pending):
+            try:
+                key, func, args = self._prepare(raw, destination)
+                func(*args)
+            except Exception:
+                # 處理失敗時 LINE 會重送，此事件與之後尚未處理的事件需要再次處理
+                self._forget(pending[index:])
+                raise
+
+    def _prepare(self, raw: Dict, destination: Optional[str]) -> Tuple[Optional[str], Callable, tuple]:
+        """將單一原始 JSON 事件轉為 (排序鍵, 處理函式, 參數)"""
+        if self._chatter is not None and is_chatter(raw):
+            self.fast_path += 1
+            return get_raw_event_key(raw), self._chatter, (raw,)
+
+        try:
+            event = Event.from_dict(raw)
+        except ValueError:
+            logger.info(f"未知的事件類型：{raw.get('type')}")
+            event = UnknownEvent.new_from_json_dict(raw)
+        return get_event_key(event), self.dispatch, (event, destination)
+
+    def _forget(self, events: List[Dict]) -> None:
+        """移除未處理事件的去重記錄"""
+        if self.deduplicator is not None:
+            for raw in events:
+                self.deduplicator.forget(raw)
+
+    def dispatch(self, event, destination: Optional[str] = None) -> None:
+        """將單一事件交給對應的處理函式"""
+        func = None
+        if isinstance(event, MessageEvent):
+            func = self._handlers.get(f"{event.__class__.__name__}_{event.message.__class__.__name__}")
+        if func is None:
+            func = self._handlers.get(event.__class__.__name__, self._default)
+        if func is None:
+            logger.info(f"沒有 {event.__class__.__name__} 的處理函式")
+            return
+        func(event)
+
+    def stats(self) -> Dict:
+        """取得事件統計資料"""
+        stats = {'events': self.events, 'fast_path': self.fast_path}
+        if self.deduplicator is not None:
+            stats['dedup'] = self.deduplicator.stats()
+        return stats
@@ -0,0 +1,180 @@
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+from utils.storage import JsonFileStore
+
+# 單一群組最多可設定的違禁詞數量
+MAX_TERMS_PER_GROUP = 5000
+
+
+def normalize(text: str) -> str:
+    """比對前的正規化（不分大小寫）"""
+    return text.casefold()
+
+
+class AhoCorasick:
+    def __init__(self, terms: Iterable[str]):
+        """
+        將多個詞編譯成 Aho-Corasick 自動機，一次掃描即可找出任一詞
+        :param terms: 已正規化的詞
+        """
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Optional[str]] = [None]  # 以此狀態結尾（含失敗鏈）的詞
+        for term in terms:
+            if term:
+                self._insert(term)
+        self._build_failure_links()
+
+    def _insert(self, term: str) -> None:
+        state = 0
+        for ch in term:
+            next_state = self.goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.goto[state][ch] = next_state
+            state = next_state
+        self.output[state] = term
+
+    def _build_failure_links(self) -> None:
+        goto, fail, output = self.goto, self.fail, self.output
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in goto[state].items():
+                queue.append(child)
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                fail[child] = goto[link].get(ch, 0)
+                if output[child] is None:
+                    output[child] = output[fail[child]]
+
+    def search(self, text: str) -> Optional[str]:
+        """回傳文字中第一個出現的詞，沒有則回傳 None"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.goto)
+
+
+class WordFilterManager:
+    def __init__(self, store=None, autoload: bool = True):
+        self.filter_file = "data/filters.json"
+        self.store = store or JsonFileStore(self.filter_file)
+        self.filters: Dict[str, Set[str]] = {}  # group_id -> set of terms
+        self._automata: Dict[str, AhoCorasick] = {}  # group_id -> 編譯後的自動機
+        self._lock = threading.RLock()
+        if autoload:
+            self.load()
+
+    def load(self) -> None:
+        """載入違禁詞資料（未在建立時載入時呼叫）"""
+        with self._lock:
+            self._load_filters()
+
+    def _load_filters(self) -> None:
+        """從儲存後端載入違禁詞資料"""
+        try:
+            self._restore(*self.store.load())
+        except Exception as e:
+            print(f"載入違禁詞資料時發生錯誤: {e}")
+            self.filters = {}
+
+    def reload(self) -> bool:
+        """重新載入其他 worker 寫入的異動；讀取失敗時保留目前的資料"""
+        try:
+            data, records = self.store.load()
+        except Exception as e:
+            print(f"重新載入違禁詞資料時發生錯誤: {e}")
+            return False
+        with self._lock:
+            self._restore(data, records)
+        return True
+
+    def _restore(self, data, records: List[Dict]) -> None:
+        """以儲存後端的資料取代記憶體中的違禁詞，自動機在下次比對時重建"""
+        self.filters = {group_id: set(terms) for group_id, terms in (data or {}).items()}
+        self._automata = {}
+        for record in records:
+            self._apply(record)
+
+    def _save_filters(self) -> None:
+        """儲存完整違禁詞資料"""
+        try:
+            data = {group_id: sorted(terms) for group_id, terms in self.filters.items()}
+            self.store.compact(data)
+        except Exception as e:
+            print(f"儲存違禁詞資料時發生錯誤: {e}")
+
+    def _apply(self, record: Dict) -> None:
+        """將一筆異動套用到記憶體中的違禁詞資料；只有該群組的自動機需要重建"""
+        group_id = record['group_id']
+        if record['action'] == 'add':
+            self.filters.setdefault(group_id, set()).add(record['term'])
+        elif record['action'] == 'remove':
+            terms = self.filters.get(group_id, set())
+            terms.discard(record['term'])
+            if not terms:
+                self.filters.pop(group_id, None)
+        self._automata.pop(group_id, None)
+
+    def _commit(self, record: Dict) -> None:
+        """套用並寫入一筆異動"""
+        with self._lock:
+            self._apply(record)
+            try:
+                if self.store.append(record):
+                    self._save_filters()
+            except Exception as e:
+                print(f"儲存違禁詞資料時發生錯誤: {e}")
+
+    def add_term(self, group_id: str, term: str) -> bool:
+        """新增違禁詞，已存在或超過上限時回傳 False"""
+        term = normalize(term.strip())
+        with self._lock:
+            terms = self.filters.get(group_id, set())
+            if not term or term in terms or len(terms) >= MAX_TERMS_PER_GROUP:
+                return False
+            self._commit({'action': 'add', 'group_id': group_id, 'term': term})
+        return True
+
+    def remove_term(self, group_id: str, term: str) -> bool:
+        """移除違禁詞"""
+        term = normalize(term.strip())
+        with self._lock:
+            if term not in self.filters.get(group_id, set()):
+                return False
+            self._commit({'action': 'remove', 'group_id': group_id, 'term': term})
+        return True
+
+    def get_terms(self, group_id: str) -> List[str]:
+        """取得群組的違禁詞列表"""
+        return sorted(self.filters.get(group_id, set()))
+
+    def check(self, group_id: str, text: str) -> Optional[str]:
+        """
+        檢查訊息是否包含違禁詞
+        :return: 第一個符合的違禁詞，沒有則回傳 None
+        """
+        automaton = self._automata.get(group_id)
+        if automaton is None:
+            if group_id not in self.filters:
+                return None
+            with self._lock:
+                automaton = self._automata.get(group_id)
+                if automaton is None:
+                    automaton = self._automata[group_id] = AhoCorasick(self.filters.get(group_id, ()))
+        return automaton.search(normalize(text))
+